@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: worst-case analysis time of large clips
+
+Times ContentAnalyzer.analyze() on inputs that are slow for regular
+expressions: long single lines, runs of brackets, e-mail-like and
+link-like text, symbol-heavy lines, plus ordinary prose and code.
+Clips above the exact limit are analyzed from samples within the time
+budget; the benchmark exits non-zero if any analysis takes longer than
+--max-ms. Usage:
+    python benchmarks/bench_analysis.py [--sizes 65536,1000000,10000000] [--max-ms 60]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.content_analyzer import ContentAnalyzer
+
+
+def repeat(unit: str, size: int) -> str:
+    """unit repeated to size characters"""
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+INPUTS = {
+    'prose': lambda n: repeat("The history window lists recent clips. ", n),
+    'code': lambda n: repeat("    value = self.lookup(key, default=None)\n", n),
+    'single line': lambda n: repeat("key:12,value:abc,", n),
+    'brackets': lambda n: '(' * n,
+    'email-like': lambda n: repeat("a.", n - 1) + '@',
+    'link-like': lambda n: repeat("[" + "a" * 30, n - 2) + "](",
+    'password lines': lambda n: repeat("Ab1!x\n", n),
+    'digits': lambda n: '1' * n,
+    'url': lambda n: 'http://' + 'a' * (n - 7),
+    'markdown': lambda n: repeat("- item with *emphasis* and [a link](x)\n", n),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark worst-case content analysis")
+    parser.add_argument('--sizes', default='65536,1000000,10000000',
+                        help="comma-separated clip sizes in characters")
+    parser.add_argument('--max-ms', type=float, default=60.0,
+                        help="upper bound on a single analysis")
+    args = parser.parse_args()
+
+    analyzer = ContentAnalyzer(cache_size=0)
+    print(f"exact up to {analyzer.exact_limit} characters, "
+          f"budget {analyzer.time_budget * 1000:.0f}ms")
+    print(f"{'input':<16} {'size':>9} {'type':<10} {'ms':>8} {'approximate':>12}")
+    slowest = 0.0
+    for size in (int(size) for size in args.sizes.split(',')):
+        for name, make in INPUTS.items():
+            content = make(size)
+            start = time.perf_counter()
+            result = analyzer.analyze(content)
+            elapsed = (time.perf_counter() - start) * 1000
+            slowest = max(slowest, elapsed)
+            approximate = result['metadata'].get('approximate', False)
+            print(f"{name:<16} {size:>9} {result['content_type']:<10} "
+                  f"{elapsed:>8.1f} {str(approximate):>12}")
+
+    print(f"Slowest analysis {slowest:.1f}ms, bound {args.max_ms}ms")
+    if slowest > args.max_ms:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
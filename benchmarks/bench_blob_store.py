@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: database size and history latency with the blob store
+
+Builds the same corpus twice, once with every clip inline and once with
+clips over the blob threshold moved to compressed chunks, and reports the
+database size and get_history() latency of each. Usage:
+    python benchmarks/bench_blob_store.py [--clips N] [--large-ratio R]
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.storage import BLOB_THRESHOLD, ClipboardStorage
+
+
+LEVELS = ('DEBUG', 'INFO', 'INFO', 'INFO', 'WARNING', 'ERROR')
+
+
+def make_log(rng: random.Random, size: int) -> str:
+    """Generate roughly `size` characters of application log"""
+    lines = []
+    total = 0
+    while total < size:
+        line = (f"2024-03-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:"
+                f"{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}.{rng.randint(0, 999):03d} "
+                f"{rng.choice(LEVELS)} [worker-{rng.randint(1, 16)}] "
+                f"request id={rng.getrandbits(64):016x} path=/api/v1/items/{rng.randint(1, 99999)} "
+                f"status={rng.choice((200, 200, 200, 201, 404, 500))} "
+                f"duration={rng.random() * 250:.2f}ms\n")
+        lines.append(line)
+        total += len(line)
+    return "".join(lines)
+
+
+def make_corpus(clips: int, large_ratio: float, seed: int = 1):
+    """Generate short clips mixed with 200K-1M character logs"""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(clips):
+        if rng.random() < large_ratio:
+            corpus.append(make_log(rng, rng.randint(200_000, 1_000_000)))
+        else:
+            corpus.append(f"clip {i}: " + " ".join(
+                rng.choice(("alpha", "beta", "gamma", "delta", "https://example.com",
+                            "def main():", "user@example.com", "TODO"))
+                for _ in range(rng.randint(3, 40))
+            ))
+    return corpus
+
+
+def run(path: Path, corpus, blob_threshold: int, repeats: int):
+    """Store the corpus and time history reads
+
+    Returns:
+        Tuple of (database size in bytes, ingest seconds,
+        median get_history(100) ms, median get_history(1000) ms)
+    """
+    storage = ClipboardStorage(str(path), write_behind=True,
+                               blob_threshold=blob_threshold)
+    start = time.perf_counter()
+    for content in corpus:
+        storage.save_clip(content, 'text')
+    storage.flush()
+    ingest = time.perf_counter() - start
+    storage.close()
+
+    storage = ClipboardStorage(str(path))
+    timings = {}
+    for limit in (100, 1000):
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            storage.get_history(limit=limit)
+            samples.append((time.perf_counter() - start) * 1000)
+        timings[limit] = statistics.median(samples)
+    storage.close()
+
+    return path.stat().st_size, ingest, timings[100], timings[1000]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the blob store")
+    parser.add_argument('--clips', type=int, default=2000,
+                        help="number of clips in the corpus")
+    parser.add_argument('--large-ratio', type=float, default=0.05,
+                        help="fraction of clips that are large logs")
+    parser.add_argument('--repeats', type=int, default=20,
+                        help="get_history() calls per measurement")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.clips, args.large_ratio)
+    large = sum(1 for content in corpus if len(content) > BLOB_THRESHOLD)
+    total = sum(len(content) for content in corpus)
+    print(f"Corpus: {len(corpus)} clips, {large} large, "
+          f"{total / 1e6:.1f}M characters")
+    print(f"{'layout':<8} {'db size':>10} {'ingest':>9} "
+          f"{'history(100)':>13} {'history(1000)':>14}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, threshold in (('inline', 1 << 62), ('blob', BLOB_THRESHOLD)):
+            size, ingest, first_page, full = run(
+                Path(tmp) / f"{name}.db", corpus, threshold, args.repeats
+            )
+            print(f"{name:<8} {size / 2**20:>8.1f}MB {ingest:>8.2f}s "
+                  f"{first_page:>11.2f}ms {full:>12.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
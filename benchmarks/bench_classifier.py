@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: content classification throughput
+
+Compares the reference classifier kept by tests/test_classifier.py
+with the precompiled ContentClassifier on prose, code, a log dump, a
+minified single line and markdown, at several sizes. The reference
+password regex is quadratic in the line length, so it is skipped for
+clips with longer lines than --max-reference-line. Usage:
+    python benchmarks/bench_classifier.py [--sizes 1000,100000,1000000]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.classifier import ContentClassifier
+from tests.test_classifier import ReferenceClassifier
+
+
+WORDS = ("the of and to in is for on with as that this from by at be are "
+         "config server request user history storage index window query "
+         "result value error module update import function return class").split()
+
+
+def _prose(rng):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(5, 15))).capitalize() + '.\n'
+
+
+def _code(rng):
+    return (f"    {rng.choice(WORDS)}_{rng.choice(WORDS)} = "
+            f"self.{rng.choice(WORDS)}({rng.choice(WORDS)}, {rng.randint(0, 99)})\n")
+
+
+def _log(rng):
+    return (f"2024-05-0{rng.randint(1, 9)} 12:{rng.randint(10, 59)}:00 INFO "
+            f"{rng.choice(WORDS)} {rng.choice(WORDS)} id={rng.randint(0, 9999)}\n")
+
+
+def _minified(rng):
+    return f"{rng.choice(WORDS)}:{rng.randint(0, 99)},"
+
+
+def _markdown(rng):
+    return f"- {rng.choice(WORDS)} {rng.choice(WORDS)} *{rng.choice(WORDS)}*\n"
+
+
+KINDS = {
+    'prose': _prose,
+    'code': _code,
+    'log': _log,
+    'minified': _minified,
+    'markdown': _markdown,
+}
+
+
+def generate(kind: str, size: int, seed: int = 1) -> str:
+    """About `size` characters of one kind of clip"""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        part = KINDS[kind](rng)
+        parts.append(part)
+        length += len(part)
+    return ''.join(parts)[:size]
+
+
+def throughput(func, content: str) -> float:
+    """Classify content repeatedly for ~0.3s (at least once)
+
+    Returns:
+        Throughput in MB/s
+    """
+    runs = 0
+    start = time.perf_counter()
+    while runs == 0 or time.perf_counter() - start < 0.3:
+        func(content)
+        runs += 1
+    return len(content) * runs / (time.perf_counter() - start) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark content classification")
+    parser.add_argument('--sizes', default='1000,100000,1000000',
+                        help="comma-separated clip sizes in characters")
+    parser.add_argument('--max-reference-line', type=int, default=10000,
+                        help="longest line to run the reference implementation on")
+    args = parser.parse_args()
+
+    oracle = ReferenceClassifier()
+    classifier = ContentClassifier()
+
+    def reference(content):
+        return oracle.determine_type(content), oracle.is_sensitive(content)
+
+    print(f"{'kind':<10} {'size':>9} {'type':<10} {'old MB/s':>10} {'new MB/s':>10} {'speedup':>8}")
+    for size in (int(size) for size in args.sizes.split(',')):
+        for kind in KINDS:
+            content = generate(kind, size)
+            result = classifier.classify(content)
+            new = throughput(classifier.classify, content)
+            longest = max(len(line) for line in content.split('\n'))
+            if longest > args.max_reference_line:
+                print(f"{kind:<10} {size:>9} {result[0]:<10} {'skipped':>10} {new:>10.1f}")
+                continue
+            if result != reference(content):
+                sys.exit(f"{kind} {size}: classifier gives {result}, "
+                         f"reference {reference(content)}")
+            old = throughput(reference, content)
+            print(f"{kind:<10} {size:>9} {result[0]:<10} {old:>10.1f} {new:>10.1f} "
+                  f"{new / old:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
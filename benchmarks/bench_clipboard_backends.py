@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: per-read clipboard latency for each backend
+
+Needs an X display. Usage:
+    python benchmarks/bench_clipboard_backends.py [--reads N] [--size BYTES]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.clipboard_backends import PyperclipBackend, XlibBackend
+
+
+def bench_backend(backend, reads: int):
+    """Time repeated paste() calls
+
+    Returns:
+        List of per-read latencies in microseconds
+    """
+    timings = []
+    for _ in range(reads):
+        start = time.perf_counter()
+        backend.paste()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reads', type=int, default=200)
+    parser.add_argument('--size', type=int, default=1024,
+                        help='Size of the clipboard payload in bytes')
+    args = parser.parse_args()
+
+    payload = 'x' * args.size
+
+    # The payload is owned by a pyperclip helper process, so every
+    # backend has to fetch it from another client
+    try:
+        PyperclipBackend().copy(payload)
+    except Exception as e:
+        print(f"Cannot set clipboard: {e}")
+        return 1
+
+    print(f"{'backend':<10} {'mean us':>10} {'p50 us':>10} {'p95 us':>10}")
+    for factory in (XlibBackend, PyperclipBackend):
+        try:
+            backend = factory()
+        except Exception as e:
+            print(f"{factory.name:<10} unavailable: {e}")
+            continue
+
+        try:
+            if backend.paste() != payload:
+                print(f"{backend.name:<10} returned unexpected content")
+                continue
+
+            timings = sorted(bench_backend(backend, args.reads))
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{backend.name:<10} {statistics.mean(timings):>10.0f} "
+                  f"{statistics.median(timings):>10.0f} {p95:>10.0f}")
+        finally:
+            backend.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: content fingerprint throughput and dedup index size
+
+Compares the old MD5 hex TEXT key (UNIQUE constraint plus the duplicate
+idx_content_hash index) with the 64-bit INTEGER fingerprint. Usage:
+    python benchmarks/bench_fingerprint.py [--rows N]
+"""
+import argparse
+import hashlib
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import storage
+from src.storage import FINGERPRINT_SCHEME, fingerprint
+
+
+def md5_hex(content: str) -> str:
+    """The fingerprint used before integer keys"""
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+def sha1_64(content: str) -> int:
+    """The fallback fingerprint, used when xxhash is not installed"""
+    data = content.encode('utf-8')
+    return int.from_bytes(hashlib.sha1(data).digest()[:8], 'big', signed=True)
+
+
+def throughput(func, content: str) -> float:
+    """Hash content repeatedly for ~0.3s
+
+    Returns:
+        Throughput in MB/s
+    """
+    runs = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < 0.3:
+        func(content)
+        runs += 1
+    return len(content) * runs / (time.perf_counter() - start) / 1e6
+
+
+def index_bytes(rows: int, legacy: bool) -> int:
+    """Build a table of `rows` keys and measure its dedup index size"""
+    with tempfile.TemporaryDirectory() as workdir:
+        conn = sqlite3.connect(str(Path(workdir) / "index.db"))
+        if legacy:
+            conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, "
+                         "content_hash TEXT UNIQUE NOT NULL)")
+            conn.execute("CREATE INDEX idx_content_hash ON t(content_hash)")
+            keys = (md5_hex(f"clip {i}") for i in range(rows))
+        else:
+            conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, "
+                         "content_fp INTEGER UNIQUE NOT NULL)")
+            keys = (fingerprint(f"clip {i}") for i in range(rows))
+
+        conn.executemany("INSERT INTO t (content_hash) VALUES (?)" if legacy
+                         else "INSERT INTO t (content_fp) VALUES (?)",
+                         ((key,) for key in keys))
+        conn.commit()
+        size = conn.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name != 't'"
+        ).fetchone()[0]
+        conn.close()
+        return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    hashers = [('md5 hex', md5_hex), ('sha1_64', sha1_64)]
+    if storage.xxhash is not None:
+        hashers.append(('xxh3_64', fingerprint))
+    print(f"Active scheme: {FINGERPRINT_SCHEME}\n")
+
+    print(f"{'size':>8} " + " ".join(f"{name + ' MB/s':>14}" for name, _ in hashers))
+    for size in (1024, 100 * 1024, 1024 * 1024):
+        content = ("clipboard text " * (size // 15 + 1))[:size]
+        rates = [throughput(func, content) for _, func in hashers]
+        print(f"{size:>8} " + " ".join(f"{rate:>14.0f}" for rate in rates))
+
+    legacy = index_bytes(args.rows, legacy=True)
+    current = index_bytes(args.rows, legacy=False)
+    print(f"\nDedup index size for {args.rows} rows:")
+    print(f"  md5 TEXT UNIQUE + idx_content_hash: {legacy / 1024:>8.0f} KiB")
+    print(f"  INTEGER UNIQUE fingerprint:         {current / 1024:>8.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
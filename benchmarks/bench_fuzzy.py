@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fuzzy search latency over recent clip previews
+
+Fills a FuzzyIndex with synthetic previews (shell commands, URLs, code
+and prose) and times search() for exact words, typos with dropped
+characters, out-of-order terms and fragments. Also times a full
+storage.fuzzy_search() including the row fetch, and incremental
+updates. Exits non-zero if the median over all queries exceeds the
+budget. Usage:
+    python benchmarks/bench_fuzzy.py [--entries 50000] [--budget-ms 10]
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.fuzzy import FuzzyIndex
+from src.storage import ClipboardStorage, make_preview
+
+
+QUERIES = {
+    'exact word': 'checkout',
+    'dropped chars': 'gtcmt',
+    'out of order': 'main origin',
+    'url fragment': 'gthbissues',
+    'identifier': 'getusrbyid',
+    'no match': 'qqqzzzxxj',
+}
+
+WORDS = ("the of and to in is for on with as that this from by at be are "
+         "config server request user history storage index window query "
+         "result value error module update import function return class "
+         "account message clipboard release version branch commit build").split()
+
+TEMPLATES = (
+    lambda r, i: f"git commit -m \"{' '.join(r.choices(WORDS, k=r.randint(2, 6)))}\"",
+    lambda r, i: f"git checkout -b feature/{r.choice(WORDS)}-{i}",
+    lambda r, i: f"git push origin {r.choice(WORDS)}-{i}",
+    lambda r, i: f"https://github.com/{r.choice(WORDS)}/{r.choice(WORDS)}/issues/{i}",
+    lambda r, i: f"https://example.com/api/v2/{r.choice(WORDS)}?id={i}",
+    lambda r, i: f"def get_{r.choice(WORDS)}_by_{r.choice(WORDS)}(self, {r.choice(WORDS)}_id):",
+    lambda r, i: f"SELECT * FROM {r.choice(WORDS)} WHERE id = {i} ORDER BY {r.choice(WORDS)}",
+    lambda r, i: f"{r.choice(WORDS)}.{r.choice(WORDS)}@example.org",
+    lambda r, i: ' '.join(r.choices(WORDS, k=r.randint(8, 40))).capitalize() + '.',
+)
+
+
+def generate_previews(count: int, seed: int = 1):
+    """Synthetic single-line previews, oldest first"""
+    rng = random.Random(seed)
+    return [make_preview(rng.choice(TEMPLATES)(rng, i)) for i in range(count)]
+
+
+def measure(search, query: str, repeats: int):
+    """Median and worst latency in milliseconds, and the number of results
+
+    A first, untimed search builds the masks of characters not queried
+    before.
+    """
+    search(query)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        results = search(query)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples), len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fuzzy search")
+    parser.add_argument('--entries', type=int, default=50000,
+                        help="number of previews in the index")
+    parser.add_argument('--limit', type=int, default=50,
+                        help="results per search")
+    parser.add_argument('--repeats', type=int, default=20,
+                        help="searches per measurement")
+    parser.add_argument('--budget-ms', type=float, default=10.0,
+                        help="maximum median latency of an index query")
+    args = parser.parse_args()
+
+    previews = generate_previews(args.entries)
+    index = FuzzyIndex(max_entries=args.entries)
+    start = time.perf_counter()
+    index.load(enumerate(previews))
+    print(f"Loaded {len(index)} previews in "
+          f"{(time.perf_counter() - start) * 1000:.0f}ms")
+
+    print(f"{'query':<16} {'text':<14} {'median':>9} {'worst':>9} {'results':>8}")
+    medians = []
+    for name, query in QUERIES.items():
+        median, worst, found = measure(
+            lambda q: index.search(q, args.limit), query, args.repeats
+        )
+        print(f"{name:<16} {query:<14} {median:>7.2f}ms {worst:>7.2f}ms {found:>8}")
+        medians.append(median)
+
+    # Incremental updates: a new clip, a re-copied clip, an eviction.
+    # The next query rebuilds only the segments that changed.
+    start = time.perf_counter()
+    for i in range(1000):
+        index.add(args.entries + i, previews[i])
+    add_us = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    index.search('gtcmt', args.limit)
+    print(f"add: {add_us:.2f}us per entry, next query "
+          f"{(time.perf_counter() - start) * 1000:.2f}ms (rebuilds the changed segments)")
+
+    start = time.perf_counter()
+    for i in range(1000, 2000):
+        index.touch(i)
+    print(f"touch: {(time.perf_counter() - start) * 1000:.2f}us per entry")
+
+    start = time.perf_counter()
+    index.remove(range(2000, 3000))
+    print(f"remove: {(time.perf_counter() - start) * 1000:.2f}us per entry")
+
+    # End to end through storage, including fetching the matched rows
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = ClipboardStorage(str(Path(tmp) / "fuzzy.db"),
+                                   fuzzy_index_size=args.entries)
+        storage.conn.executemany("""
+            INSERT INTO clipboard_history (content_fp, content, preview, content_length)
+            VALUES (?, ?, ?, ?)
+        """, ((-i - 1, text, text, len(text)) for i, text in enumerate(previews)))
+        storage.conn.commit()
+
+        start = time.perf_counter()
+        storage.fuzzy_search('warm up')
+        print(f"storage: first query loads the index in "
+              f"{(time.perf_counter() - start) * 1000:.0f}ms")
+        for name in ('dropped chars', 'out of order'):
+            median, worst, found = measure(
+                lambda q: storage.fuzzy_search(q, args.limit, preview_only=True),
+                QUERIES[name], args.repeats
+            )
+            print(f"storage {name:<12} {median:>7.2f}ms median, {worst:.2f}ms worst")
+        storage.close()
+
+    typical = statistics.median(medians)
+    print(f"Median query {typical:.2f}ms, slowest {max(medians):.2f}ms, "
+          f"budget {args.budget_ms}ms")
+    if typical > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of rejecting a clip during ingest
+
+Times ClipboardManager from the clipboard change to the rejection, with
+the pipeline stages run on the calling thread and app detection stubbed
+out. For oversized and unchanged clips it also times the path they took
+before the early checks: oversized clips were analyzed before the size
+limit was applied, and a repeat of the newest clip was analyzed (from
+the cache) and saved again. Usage:
+    python benchmarks/bench_ingest.py [--size 10000000] [--limit 1048576]
+"""
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.clipboard_backends import ClipboardBackend
+from src.clipboard_monitor import ClipboardManager
+from src.config import Config
+from src.content_analyzer import ContentAnalyzer
+from src.storage import ClipboardStorage, fingerprint
+
+
+class NullBackend(ClipboardBackend):
+    """Clipboard backend that is never read"""
+
+    name = 'null'
+
+    def paste(self):
+        return ""
+
+    def copy(self, content):
+        pass
+
+
+def per_call_ms(func, *args) -> float:
+    """Run func repeatedly for ~0.3s (at least 3 times)
+
+    Returns:
+        Average time per call in milliseconds
+    """
+    runs = 0
+    start = time.perf_counter()
+    while runs < 3 or time.perf_counter() - start < 0.3:
+        func(*args)
+        runs += 1
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingest rejections")
+    parser.add_argument('--size', type=int, default=10_000_000,
+                        help="characters in the oversized paste")
+    parser.add_argument('--limit', type=int, default=1_048_576,
+                        help="max_content_size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Config(str(Path(tmp) / "config.json"))
+        config.config['max_content_size'] = args.limit
+        config.config['excluded_apps'] = ['keepassxc']
+        storage = ClipboardStorage(str(Path(tmp) / "clipboard.db"))
+        analyzer = ContentAnalyzer()
+        manager = ClipboardManager(storage, analyzer, config, backend=NullBackend())
+        app = ['editor']
+        manager.app_detector.get_active_app = lambda: app[0]
+
+        def ingest(content):
+            # The monitor callback, then the stages on this thread
+            manager.pipeline.submit = run_stages
+            manager._on_clipboard_change(content)
+
+        def run_stages(item):
+            for stage in manager.pipeline.stages:
+                item = stage.func(item)
+                if item is None:
+                    break
+            return True
+
+        def ingest_excluded(content):
+            app[0] = 'keepassxc'
+            ingest(content)
+            app[0] = 'editor'
+
+        def old_too_large(content):
+            # Analysis ran before the size check, with a cold cache for
+            # every new paste
+            analyzer._cache.clear()
+            manager.app_detector.get_active_app()
+            analysis = analyzer.analyze(content, content_fp=fingerprint(content))
+            return analysis['is_sensitive'] or len(content) > args.limit
+
+        def old_unchanged(content):
+            manager.app_detector.get_active_app()
+            content_fp = fingerprint(content)
+            analysis = analyzer.analyze(content, content_fp=content_fp)
+            storage.save_clip(content, analysis['content_type'], metadata=analysis['metadata'],
+                              content_fp=content_fp)
+
+        oversized = ("lorem ipsum dolor sit amet, consectetur adipiscing elit\n"
+                     * (args.size // 56 + 1))[:args.size]
+        clip = oversized[:args.limit]
+        # Leave out the manager's per-clip messages
+        with contextlib.redirect_stdout(io.StringIO()):
+            ingest(clip)
+            rows = [
+                ('empty', 0, None, per_call_ms(ingest, "")),
+                ('too_large', len(oversized), per_call_ms(old_too_large, oversized),
+                 per_call_ms(ingest, oversized)),
+                ('excluded_app', len(clip), None, per_call_ms(ingest_excluded, clip)),
+                ('unchanged', len(clip), per_call_ms(old_unchanged, clip),
+                 per_call_ms(ingest, clip)),
+            ]
+        storage.close()
+
+    print(f"{'reason':<14} {'chars':>10} {'old ms':>10} {'new ms':>10}")
+    for reason, chars, old, new in rows:
+        old_text = f"{old:>10.3f}" if old is not None else f"{'-':>10}"
+        print(f"{reason:<14} {chars:>10} {old_text} {new:>10.3f}")
+    print(f"rejected: {manager.get_stats()['rejected']}")
+
+
+if __name__ == '__main__':
+    main()
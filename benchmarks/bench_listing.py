@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: history listing with full rows vs the preview-only projection
+
+Fills a history with large clips and compares get_history(limit=100)
+returning full rows with preview_only=True, measuring latency and the
+peak Python memory allocated while building the result. Usage:
+    python benchmarks/bench_listing.py [--clips N] [--size CHARS]
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.storage import BLOB_THRESHOLD, ClipboardStorage
+
+
+def build_history(path: Path, clips: int, size: int, blob_threshold: int):
+    """Store `clips` distinct clips of about `size` characters each"""
+    rng = random.Random(1)
+    storage = ClipboardStorage(str(path), write_behind=True,
+                               blob_threshold=blob_threshold)
+    for i in range(clips):
+        line = f"clip {i} line {{}} value={rng.getrandbits(32):08x}\n"
+        content = "".join(line.format(n) for n in range(size // len(line)))
+        storage.save_clip(content, 'text')
+    storage.close()
+
+
+def measure(storage: ClipboardStorage, preview_only: bool, repeats: int):
+    """Time get_history(100) and record its peak allocation
+
+    Returns:
+        Tuple of (median ms, peak KiB)
+    """
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        storage.get_history(limit=100, preview_only=preview_only)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    storage.get_history(limit=100, preview_only=preview_only)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return statistics.median(samples), peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark history listing")
+    parser.add_argument('--clips', type=int, default=200,
+                        help="number of large clips in the history")
+    parser.add_argument('--size', type=int, default=1_000_000,
+                        help="characters per clip")
+    parser.add_argument('--repeats', type=int, default=10,
+                        help="get_history() calls per measurement")
+    args = parser.parse_args()
+
+    print(f"History: {args.clips} clips of {args.size} characters, "
+          f"listing 100")
+    print(f"{'storage':<8} {'rows':<8} {'latency':>10} {'peak memory':>13}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, threshold in (('inline', 1 << 62), ('blob', BLOB_THRESHOLD)):
+            path = Path(tmp) / f"{name}.db"
+            build_history(path, args.clips, args.size, threshold)
+            storage = ClipboardStorage(str(path))
+            for preview_only in (False, True):
+                latency, peak = measure(storage, preview_only, args.repeats)
+                rows = 'preview' if preview_only else 'full'
+                print(f"{name:<8} {rows:<8} {latency:>8.2f}ms {peak:>10.0f}KiB")
+            storage.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: deep history pages by OFFSET vs by (timestamp, id) cursor
+
+Fills a history with short clips, a few per second so that timestamps
+repeat, then reads a page of 100 preview rows at several depths, once
+with get_history(offset=...) and once with get_history(before=...) from
+the cursor of the entry just above the page. Usage:
+    python benchmarks/bench_pagination.py [--rows 510000] [--offsets 10,10000,500000]
+"""
+import argparse
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.storage import ClipboardStorage
+
+
+def build_history(path: Path, rows: int):
+    """Store `rows` distinct clips, ten per second of timestamps"""
+    storage = ClipboardStorage(str(path), write_behind=True, flush_batch_size=1000)
+    for i in range(rows):
+        storage.save_clip(f"clip {i} " + "lorem ipsum dolor sit amet " * 3,
+                          'url' if i % 4 == 0 else 'text')
+    storage.close()
+
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        "UPDATE clipboard_history SET timestamp = datetime('2024-01-01', (id / 10) || ' seconds')"
+    )
+    conn.commit()
+    conn.close()
+
+
+def median_ms(call, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark deep history pages")
+    parser.add_argument('--rows', type=int, default=510_000,
+                        help="clips in the history")
+    parser.add_argument('--offsets', default="10,10000,500000",
+                        help="comma-separated page depths")
+    parser.add_argument('--repeats', type=int, default=5,
+                        help="reads per measurement")
+    args = parser.parse_args()
+
+    offsets = [int(offset) for offset in args.offsets.split(',')]
+    print(f"{args.rows} clips, pages of 100 preview rows")
+    print(f"{'filter':<7} {'offset':>8} {'OFFSET':>10} {'cursor':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "clipboard.db"
+        build_history(path, args.rows)
+        storage = ClipboardStorage(str(path))
+
+        for content_type in (None, 'url'):
+            for offset in offsets:
+                def by_offset():
+                    return storage.get_history(limit=100, offset=offset,
+                                               content_type=content_type,
+                                               preview_only=True)
+
+                above = storage.get_history(limit=1, offset=offset - 1,
+                                            content_type=content_type,
+                                            preview_only=True)
+                if not above:
+                    continue
+                before = storage.history_cursor(above[0])
+
+                def by_cursor():
+                    return storage.get_history(limit=100, content_type=content_type,
+                                               preview_only=True, before=before)
+
+                assert by_offset() == by_cursor()
+                print(f"{content_type or 'all':<7} {offset:>8} "
+                      f"{median_ms(by_offset, args.repeats):>8.2f}ms "
+                      f"{median_ms(by_cursor, args.repeats):>8.2f}ms")
+
+        storage.close()
+
+
+if __name__ == '__main__':
+    main()
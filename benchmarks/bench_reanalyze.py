@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: reanalysis throughput by number of worker processes
+
+Fills a history with a mix of short prose, code, log, markdown and URL
+clips, then times a full reanalyze() of it with each worker count.
+Reading and writing stay in the main process, so the speedup levels off
+once the workers analyze faster than SQLite reads and writes. Usage:
+    python benchmarks/bench_reanalyze.py [--rows 500000] [--workers 1,2,4,8]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bench_classifier import KINDS, generate
+from src.reanalyze import reanalyze
+from src.storage import ClipboardStorage
+
+
+def build_history(path: Path, rows: int):
+    """Store `rows` distinct clips of 50-500 characters"""
+    rng = random.Random(1)
+    kinds = list(KINDS)
+    storage = ClipboardStorage(str(path), write_behind=True, flush_batch_size=1000)
+    for i in range(rows):
+        if i % 10 == 0:
+            content = f"https://example.com/page/{i}?ref={rng.getrandbits(32):08x}"
+        else:
+            content = f"{i} " + generate(rng.choice(kinds), rng.randint(50, 500), seed=i)
+        storage.save_clip(content, 'text')
+    storage.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reanalysis")
+    parser.add_argument('--rows', type=int, default=500_000,
+                        help="clips in the history")
+    parser.add_argument('--workers', default=f"1,2,4,{os.cpu_count()}",
+                        help="comma-separated worker process counts")
+    args = parser.parse_args()
+
+    worker_counts = sorted({int(count) for count in args.workers.split(',')})
+    print(f"{args.rows} clips, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'seconds':>9} {'clips/s':>9} {'speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "clipboard.db"
+        build_history(path, args.rows)
+        baseline = None
+        for workers in worker_counts:
+            # Start every run from scratch, with every analysis outdated
+            conn = sqlite3.connect(str(path))
+            conn.execute("UPDATE clipboard_history SET content_type = 'text', metadata = NULL")
+            conn.execute("DELETE FROM storage_meta WHERE key LIKE 'reanalyze_%'")
+            conn.commit()
+            conn.close()
+
+            storage = ClipboardStorage(str(path), write_behind=True)
+            stats = reanalyze(storage, workers=workers)
+            storage.close()
+
+            rate = stats['analyzed'] / stats['seconds']
+            baseline = baseline or rate
+            print(f"{workers:>7} {stats['seconds']:>9.2f} {rate:>9.0f} "
+                  f"{rate / baseline:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: retention cost per ingested clip
+
+Compares the full-table cleanup_old_entries() with the incremental
+enforce_retention() on histories already at their size limit. The
+incremental run ingests enough clips to cross the high-water mark, so its
+figure includes the amortized eviction cost. Usage:
+    python benchmarks/bench_retention.py [--sizes 10000 100000 1000000] [--clips N]
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.storage import ClipboardStorage
+
+
+def build_database(path: Path, rows: int):
+    """Create a history of `rows` distinct clips with increasing timestamps"""
+    storage = ClipboardStorage(str(path))
+    batch = 10000
+    for start in range(0, rows, batch):
+        storage.conn.executemany("""
+            INSERT INTO clipboard_history 
+            (content_fp, content, content_type, timestamp, is_favorite)
+            VALUES (?, ?, 'text', datetime('2024-01-01', ? || ' seconds'), ?)
+        """, [
+            (-i - 1, f"seed clip number {i} with some words", i, int(i % 500 == 0))
+            for i in range(start, min(start + batch, rows))
+        ])
+        storage.conn.commit()
+    storage.close()
+
+
+def run(path: Path, rows: int, clips: int, incremental: bool) -> float:
+    """Ingest clips with retention after each one
+
+    Returns:
+        Mean retention cost per clip in milliseconds
+    """
+    storage = ClipboardStorage(str(path))
+    max_entries = storage.live_count if incremental else rows
+    if incremental:
+        # One full eviction cycle: the default high-water slack is 5%
+        clips = max(clips, max_entries // 20 + 1)
+    elapsed = 0.0
+
+    for i in range(clips):
+        storage.save_clip(f"new clip {i}", 'text')
+        start = time.perf_counter()
+        if incremental:
+            storage.enforce_retention(max_entries)
+        else:
+            storage.cleanup_old_entries(max_entries)
+        elapsed += time.perf_counter() - start
+
+    storage.close()
+    return elapsed / clips * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 100000, 1000000])
+    parser.add_argument('--clips', type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        print(f"{'rows':>9} {'cleanup ms/clip':>16} {'incremental ms/clip':>20}")
+        for rows in args.sizes:
+            seed = workdir / f"seed-{rows}.db"
+            build_database(seed, rows)
+
+            results = []
+            for incremental in (False, True):
+                path = workdir / "run.db"
+                shutil.copy(seed, path)
+                results.append(run(path, rows, args.clips, incremental))
+                path.unlink()
+
+            print(f"{rows:>9} {results[0]:>16.3f} {results[1]:>20.3f}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full-text search latency by ranking mode
+
+Builds a history of synthetic clips with a Zipf-like vocabulary, spread
+over 90 days with varying use counts, and times search() with
+rank='recent' and rank='relevance' for common, rare, multi-term and
+prefix queries. Usage:
+    python benchmarks/bench_search.py [--clips 100000] [--limit 50]
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.storage import ClipboardStorage
+
+
+QUERIES = {
+    'common term': 'w1',
+    'rare term': 'w3000',
+    'two terms': 'w5 w40',
+    'prefix': 'w12*',
+}
+
+
+def build_history(path: Path, clips: int, seed: int = 1):
+    """Insert synthetic clips directly, the FTS trigger indexes them"""
+    rng = random.Random(seed)
+    # Zipf-like: word k is drawn with weight 1/k
+    vocabulary = [f"w{k}" for k in range(1, 5001)]
+    weights = [1 / k for k in range(1, 5001)]
+
+    storage = ClipboardStorage(str(path))
+    batch = 10000
+    for start in range(0, clips, batch):
+        rows = []
+        for i in range(start, min(start + batch, clips)):
+            words = rng.choices(vocabulary, weights, k=rng.randint(5, 60))
+            content = f"clip{i} " + " ".join(words)
+            rows.append((-i - 1, content, content[:256], len(content),
+                         f"-{rng.randint(0, 90 * 86400)} seconds",
+                         min(int(rng.expovariate(0.5)), 50)))
+        storage.conn.executemany("""
+            INSERT INTO clipboard_history 
+            (content_fp, content, preview, content_length, timestamp, use_count)
+            VALUES (?, ?, ?, ?, datetime('now', ?), ?)
+        """, rows)
+        storage.conn.commit()
+    storage.close()
+
+
+def measure(storage: ClipboardStorage, query: str, repeats: int, **kwargs):
+    """Median search() latency in milliseconds, and the number of results"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        results = storage.search(query, **kwargs)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ranked search")
+    parser.add_argument('--clips', type=int, default=100000,
+                        help="number of clips in the history")
+    parser.add_argument('--limit', type=int, default=50,
+                        help="results per search")
+    parser.add_argument('--repeats', type=int, default=10,
+                        help="searches per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "search.db"
+        start = time.perf_counter()
+        build_history(path, args.clips)
+        print(f"Built {args.clips} clips in {time.perf_counter() - start:.1f}s")
+
+        storage = ClipboardStorage(str(path))
+        matches = storage.conn.cursor()
+        print(f"{'query':<12} {'matches':>8} {'recent':>10} {'relevance':>10} "
+              f"{'relevance (preview)':>20}")
+        for name, query in QUERIES.items():
+            matches.execute(
+                "SELECT COUNT(*) FROM clipboard_fts WHERE clipboard_fts MATCH ?",
+                (query,)
+            )
+            count = matches.fetchone()[0]
+            recent, _ = measure(storage, query, args.repeats,
+                                limit=args.limit, rank='recent')
+            relevance, _ = measure(storage, query, args.repeats,
+                                   limit=args.limit, rank='relevance')
+            preview, _ = measure(storage, query, args.repeats, limit=args.limit,
+                                 rank='relevance', preview_only=True)
+            print(f"{name:<12} {count:>8} {recent:>8.2f}ms {relevance:>8.2f}ms "
+                  f"{preview:>18.2f}ms")
+        storage.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: search-as-you-type latency
+
+Types a 10-character query one keystroke at a time against a history of
+synthetic clips (see bench_search.py), first running a synchronous
+search per keystroke as the UI used to, then through SearchEngine.
+Reports how long the UI thread is blocked and how long after the last
+keystroke the final results are available. Usage:
+    python benchmarks/bench_search_typing.py [--clips 100000] [--interval 0.1]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bench_search import build_history
+from src.search_engine import SearchEngine
+from src.storage import ClipboardStorage
+
+
+def type_synchronously(storage: ClipboardStorage, query: str, interval: float):
+    """Search on every keystroke on the calling (UI) thread
+
+    Returns:
+        Tuple of (list of per-keystroke blocking ms, final result latency ms)
+    """
+    blocked = []
+    for i in range(1, len(query) + 1):
+        start = time.perf_counter()
+        storage.search(query[:i], preview_only=True, prefix=True)
+        blocked.append((time.perf_counter() - start) * 1000)
+        # The next keystroke cannot be handled before the search returns
+        time.sleep(max(0.0, interval - blocked[-1] / 1000))
+    return blocked, blocked[-1]
+
+
+def type_with_engine(engine: SearchEngine, query: str, interval: float):
+    """Submit every keystroke to the engine, polling like the UI does
+
+    Returns:
+        Tuple of (list of per-keystroke blocking ms, final result latency ms)
+    """
+    blocked = []
+    for i in range(1, len(query) + 1):
+        start = time.perf_counter()
+        engine.submit(query[:i])
+        result = engine.get_result()
+        blocked.append((time.perf_counter() - start) * 1000)
+        if i < len(query):
+            time.sleep(interval)
+
+    # A cached final result may already have been delivered above
+    last_keystroke = time.perf_counter()
+    while result is None or result.query != query.strip():
+        time.sleep(0.001)
+        result = engine.get_result() or result
+    return blocked, (time.perf_counter() - last_keystroke) * 1000
+
+
+def report(name: str, blocked, latency: float):
+    """Print one result line"""
+    print(f"{name:<22} {max(blocked):>9.2f}ms {sum(blocked):>9.2f}ms {latency:>9.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark search while typing")
+    parser.add_argument('--clips', type=int, default=100000,
+                        help="number of clips in the history")
+    parser.add_argument('--query', default="w173 w2503",
+                        help="text to type")
+    parser.add_argument('--interval', type=float, default=0.1,
+                        help="seconds between keystrokes")
+    parser.add_argument('--debounce', type=float, default=0.15,
+                        help="engine debounce in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "typing.db"
+        build_history(path, args.clips)
+        storage = ClipboardStorage(str(path))
+
+        print(f"Typing {args.query!r} at {args.interval * 1000:.0f}ms per key, "
+              f"{args.clips} clips")
+        print(f"{'mode':<22} {'max block':>11} {'total block':>11} {'final':>11}")
+
+        blocked, latency = type_synchronously(storage, args.query, args.interval)
+        report("synchronous", blocked, latency)
+
+        for debounce in (0.0, args.debounce):
+            engine = SearchEngine(storage, debounce=debounce)
+            engine.start()
+            blocked, latency = type_with_engine(engine, args.query, args.interval)
+            report(f"engine, debounce {debounce * 1000:.0f}ms", blocked, latency)
+            stats = engine.get_stats()
+
+            # Retyping the same query is answered from the cache
+            blocked, latency = type_with_engine(engine, args.query, args.interval)
+            report("  retyped (cache)", blocked, latency)
+            engine.stop()
+            print(f"  queries run {stats['executed']}, cancelled {stats['cancelled']}, "
+                  f"refined {stats['refined']}")
+
+        storage.close()
+
+
+if __name__ == '__main__':
+    main()
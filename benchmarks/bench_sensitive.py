@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sensitive keyword search
+
+Compares the search ContentClassifier used before KeywordScanner (one
+`in` per keyword over content.lower()) with KeywordScanner, on clips
+without a keyword (the whole clip is searched), in time per clip and
+peak memory allocated. --extra adds that many user keywords. The
+non-ascii row is prose with one 'é' per line, which takes str.lower()
+off its ASCII fast path. Usage:
+    python benchmarks/bench_sensitive.py [--sizes 1000,100000,1000000] [--extra 20]
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bench_classifier import KINDS, generate
+from src.classifier import SENSITIVE_KEYWORDS, KeywordScanner
+
+
+def lowercase_search(keywords, content: str) -> bool:
+    """The keyword search used before KeywordScanner"""
+    content_lower = content.lower()
+    return any(keyword in content_lower for keyword in keywords)
+
+
+def per_call_ms(func, content: str) -> float:
+    """Run func repeatedly for ~0.3s (at least 3 times)
+
+    Returns:
+        Average time per call in milliseconds
+    """
+    runs = 0
+    start = time.perf_counter()
+    while runs < 3 or time.perf_counter() - start < 0.3:
+        func(content)
+        runs += 1
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def peak_kb(func, content: str) -> float:
+    """Peak memory allocated by one call, in KB"""
+    tracemalloc.start()
+    func(content)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sensitive keyword search")
+    parser.add_argument('--sizes', default='1000,100000,1000000',
+                        help="comma-separated clip sizes in characters")
+    parser.add_argument('--extra', type=int, default=0,
+                        help="number of extra user keywords")
+    args = parser.parse_args()
+
+    keywords = SENSITIVE_KEYWORDS + tuple(f"codename{i}" for i in range(args.extra))
+    scanner = KeywordScanner(keywords)
+
+    def old(content):
+        return lowercase_search(keywords, content)
+
+    print(f"{len(keywords)} keywords, {len(scanner.groups)} scans per chunk")
+    print(f"{'kind':<10} {'size':>9} {'old ms':>9} {'new ms':>9} {'speedup':>8} "
+          f"{'old KB':>9} {'new KB':>9}")
+    for size in (int(size) for size in args.sizes.split(',')):
+        kinds = {kind: generate(kind, size) for kind in KINDS}
+        kinds['non-ascii'] = kinds['prose'].replace('\n', 'é\n')[:size]
+        for kind, content in kinds.items():
+            if old(content) or scanner.search(content):
+                sys.exit(f"{kind} {size}: generated clip contains a keyword")
+            old_ms = per_call_ms(old, content)
+            new_ms = per_call_ms(scanner.search, content)
+            print(f"{kind:<10} {size:>9} {old_ms:>9.3f} {new_ms:>9.3f} "
+                  f"{old_ms / new_ms:>7.2f}x {peak_kb(old, content):>9.1f} "
+                  f"{peak_kb(scanner.search, content):>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: import time of the daemon's entry point, with a budget
+
+Runs `python -X importtime -c "import src.__main__"` in fresh processes
+and sums the time spent importing the src package, which is what the
+daemon pays before it can start monitoring. For comparison it also
+imports the modules that are now loaded only when needed (the Tk UI,
+the pynput hotkey handler and the multiprocessing-based reanalysis), as
+the entry point used to. Exits with status 1 if the median import time
+is over the budget, or if a deferred module is imported up front. Usage:
+    python benchmarks/bench_startup.py [--runs 7] [--budget-ms 80]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Modules the entry point must not import before monitoring starts
+DEFERRED = ('tkinter', 'pynput', 'pyperclip', 'multiprocessing',
+            'src.ui', 'src.hotkey_handler', 'src.reanalyze')
+
+
+def import_times(statement: str):
+    """Run statement under -X importtime
+
+    Returns:
+        Tuple of (milliseconds spent in top-level src imports, names of
+        all imported modules)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=str(ROOT), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.add(name.strip())
+        # Top-level entries are not indented; nested ones are included in them
+        if not name.startswith('  ') and name.strip().split('.')[0] == 'src':
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def median_ms(statement: str, runs: int):
+    """Median import time of statement, and the modules it imported"""
+    samples = []
+    modules = set()
+    for _ in range(runs):
+        elapsed, modules = import_times(statement)
+        samples.append(elapsed)
+    return statistics.median(samples), modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark startup imports")
+    parser.add_argument('--runs', type=int, default=7,
+                        help="processes per measurement")
+    parser.add_argument('--budget-ms', type=float, default=80.0,
+                        help="maximum median import time of the entry point")
+    args = parser.parse_args()
+
+    # Compile the bytecode first, so no run pays for it
+    import_times("import src.__main__, src.ui, src.reanalyze")
+
+    lazy, modules = median_ms("import src.__main__", args.runs)
+    print(f"entry point            {lazy:8.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    eager_modules = ['src.ui', 'src.reanalyze', 'src.hotkey_handler']
+    try:
+        eager, _ = median_ms(f"import src.__main__, {', '.join(eager_modules)}", args.runs)
+    except RuntimeError as e:
+        # pynput is missing or has no display to talk to
+        print(f"(src.hotkey_handler not importable here: {e})")
+        eager_modules.remove('src.hotkey_handler')
+        eager, _ = median_ms(f"import src.__main__, {', '.join(eager_modules)}", args.runs)
+    print(f"with {', '.join(eager_modules):<17} {eager:8.1f} ms")
+
+    early = sorted(name for name in modules
+                   if name.split('.')[0] in DEFERRED or name in DEFERRED)
+    if early:
+        print(f"FAIL: imported before monitoring starts: {', '.join(early)}")
+    if lazy > args.budget_ms:
+        print(f"FAIL: {lazy:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+    if early or lazy > args.budget_ms:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
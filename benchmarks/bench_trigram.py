@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark: trigram index size and substring query latency
+
+Builds a history of URLs, code snippets, commit hashes and prose, then
+reports the size of the word and trigram indexes and times fragment
+queries through the trigram index against a LIKE '%...%' table scan.
+Usage:
+    python benchmarks/bench_trigram.py [--clips 100000]
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.storage import ClipboardStorage
+
+
+WORDS = ("alpha beta gamma delta release build deploy config server client "
+         "review history page user account token cache index query").split()
+
+QUERIES = {
+    'url path': 'api/v3/acc',
+    'camelCase': 'HistoryPage',
+    'hash piece': None,  # filled in from the corpus
+    'word': 'deploy',
+    'partial word': 'ploy',
+}
+
+
+def make_clip(rng: random.Random, i: int) -> str:
+    """Generate one clip of a random kind"""
+    kind = i % 4
+    if kind == 0:
+        return (f"https://{rng.choice(WORDS)}.example.com/api/v{rng.randint(1, 3)}/"
+                f"{rng.choice(WORDS)}s/{rng.randint(1, 99999)}?ref={i}")
+    if kind == 1:
+        a, b, c = (rng.choice(WORDS).capitalize() for _ in range(3))
+        return f"const render{a}{b} = use{c}Hook(props.{rng.choice(WORDS)}Id, {i});"
+    if kind == 2:
+        return f"commit {rng.getrandbits(160):040x} {' '.join(rng.choices(WORDS, k=6))}"
+    return f"note {i}: " + " ".join(rng.choices(WORDS, k=rng.randint(8, 40)))
+
+
+def build_history(path: Path, clips: int, trigram: bool, seed: int = 1):
+    """Insert synthetic clips directly
+
+    Returns:
+        Seconds spent inserting and indexing
+    """
+    rng = random.Random(seed)
+    storage = ClipboardStorage(str(path), trigram_index=trigram)
+    start = time.perf_counter()
+    batch = 10000
+    for first in range(0, clips, batch):
+        rows = []
+        for i in range(first, min(first + batch, clips)):
+            content = make_clip(rng, i)
+            rows.append((-i - 1, content, content[:256], len(content)))
+        storage.conn.executemany("""
+            INSERT INTO clipboard_history 
+            (content_fp, content, preview, content_length)
+            VALUES (?, ?, ?, ?)
+        """, rows)
+        storage.conn.commit()
+    elapsed = time.perf_counter() - start
+    storage.close()
+    return elapsed
+
+
+def table_sizes(storage: ClipboardStorage):
+    """Bytes used by the history table and each full-text index"""
+    groups = {'history': 'clipboard_history', 'word index': 'clipboard_fts',
+              'trigram index': 'clipboard_trigram'}
+    sizes = {}
+    for label, prefix in groups.items():
+        row = storage.conn.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name = ? OR name LIKE ? ESCAPE '\\'",
+            (prefix, prefix + '\\_%')
+        ).fetchone()
+        sizes[label] = row[0] or 0
+    return sizes
+
+
+def median_ms(func, repeats: int) -> float:
+    """Median runtime of func() in milliseconds"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the trigram index")
+    parser.add_argument('--clips', type=int, default=100000,
+                        help="number of clips in the history")
+    parser.add_argument('--repeats', type=int, default=10,
+                        help="queries per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "trigram.db"
+        plain = build_history(Path(tmp) / "plain.db", args.clips, trigram=False)
+        with_trigram = build_history(path, args.clips, trigram=True)
+        print(f"Insert {args.clips} clips: {plain:.1f}s word index only, "
+              f"{with_trigram:.1f}s with trigram index")
+
+        storage = ClipboardStorage(str(path), trigram_index=True)
+        for label, size in table_sizes(storage).items():
+            print(f"  {label:<14} {size / 2**20:>7.1f}MB")
+
+        commit = storage.conn.execute(
+            "SELECT content FROM clipboard_history WHERE content LIKE 'commit %' LIMIT 1"
+        ).fetchone()[0]
+        QUERIES['hash piece'] = commit[15:23]
+
+        print(f"{'query':<13} {'text':<12} {'matches':>8} {'search()':>10} {'LIKE scan':>10}")
+        for name, query in QUERIES.items():
+            results = storage.search(query, limit=50)
+            search = median_ms(lambda: storage.search(query, limit=50), args.repeats)
+            like = median_ms(lambda: storage.conn.execute(
+                "SELECT id FROM clipboard_history WHERE content LIKE ? "
+                "ORDER BY timestamp DESC LIMIT 50", (f"%{query}%",)
+            ).fetchall(), args.repeats)
+            print(f"{name:<13} {query:<12} {len(results):>8} {search:>8.2f}ms "
+                  f"{like:>8.2f}ms")
+        storage.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to first paint and scroll latency of the clip list
+
+Compares loading and formatting the whole history (what the list used to
+do) with the virtualized list, which fetches one page and formats the
+visible rows. Scroll latency is the time to show rows at a position that
+is not cached yet, which grows with depth while pages are read by OFFSET.
+With a display the rows go into a real Listbox; without one only the
+fetching and formatting are timed. Usage:
+    python benchmarks/bench_ui_list.py [--rows 100000] [--visible 15]
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tkinter as tk
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.storage import ClipboardStorage
+from src.virtual_list import ClipPager, VirtualClipList
+
+
+def format_row(clip):
+    """Row text, as the UI formats it"""
+    preview = clip['preview'][:100]
+    if (clip['content_length'] or 0) > len(clip['preview']):
+        preview += '...'
+    return f"{'*' if clip.get('is_favorite') else ' '} {clip['content_type']} {preview}"
+
+
+def build_history(path: Path, rows: int):
+    """Store `rows` distinct clips of about 200 characters"""
+    storage = ClipboardStorage(str(path), write_behind=True, flush_batch_size=1000)
+    for i in range(rows):
+        storage.save_clip(f"clip {i} " + "lorem ipsum dolor sit amet " * 7, 'text')
+    storage.close()
+
+
+def history_pager(storage):
+    return ClipPager(
+        lambda offset, limit: storage.get_history(limit=limit, offset=offset,
+                                                  preview_only=True),
+        lambda: storage.count_history()
+    )
+
+
+def ms(seconds):
+    return f"{seconds * 1000:9.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the clip list")
+    parser.add_argument('--rows', type=int, default=100_000,
+                        help="clips in the history")
+    parser.add_argument('--visible', type=int, default=15,
+                        help="rows that fit on screen")
+    args = parser.parse_args()
+
+    try:
+        root = tk.Tk()
+        root.withdraw()
+    except tk.TclError:
+        root = None
+    print(f"{args.rows} clips, {args.visible} visible rows, "
+          f"{'Tk listbox' if root else 'no display: fetch and format only'}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "clipboard.db"
+        build_history(path, args.rows)
+        storage = ClipboardStorage(str(path))
+
+        # Everything, as the list used to load it
+        start = time.perf_counter()
+        rows = [format_row(clip) for clip in
+                storage.get_history(limit=args.rows, preview_only=True)]
+        if root:
+            listbox = tk.Listbox(root)
+            listbox.insert(tk.END, *rows)
+            root.update_idletasks()
+        print(f"eager first paint      {ms(time.perf_counter() - start)}")
+
+        start = time.perf_counter()
+        pager = history_pager(storage)
+        if root:
+            clip_list = VirtualClipList(tk.Frame(root), format_row, height=args.visible)
+            clip_list.set_pager(pager)
+            root.update_idletasks()
+        else:
+            [format_row(clip) for clip in pager.rows(0, args.visible)]
+        print(f"virtual first paint    {ms(time.perf_counter() - start)}")
+
+        for fraction in (0.1, 0.5, 0.99):
+            top = int(args.rows * fraction)
+            start = time.perf_counter()
+            if root:
+                clip_list.yview('moveto', fraction)
+                root.update_idletasks()
+            else:
+                [format_row(clip) for clip in pager.rows(top, top + args.visible)]
+            print(f"scroll to row {top:<8} {ms(time.perf_counter() - start)}")
+
+        storage.close()
+    if root:
+        root.destroy()
+
+
+if __name__ == '__main__':
+    main()
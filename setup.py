@@ -53,6 +53,9 @@ setup(
             "black>=22.0.0",
             "isort>=5.10.0",
         ],
+        "performance": [
+            "xxhash>=3.0.0",
+        ],
         "windows": [
             "pywin32>=305",
             "psutil>=5.9.0",
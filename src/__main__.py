@@ -5,68 +5,73 @@ Smart Clipboard Manager - Main Entry Point
 import sys
 import signal
 import argparse
+import threading
 from pathlib import Path
 
+# Only what monitoring needs is imported up front. Tk (ui), pynput
+# (hotkey_handler) and multiprocessing (reanalyze) are imported where
+# they are used, once clipboard changes are already being captured.
 from .config import Config
 from .storage import ClipboardStorage
 from .content_analyzer import ContentAnalyzer
 from .clipboard_monitor import ClipboardManager
-from .ui import ClipboardUI
-from .hotkey_handler import HotkeyHandler
+
+
+def create_storage(config: Config) -> ClipboardStorage:
+    """Open the clipboard database with the configured storage options"""
+    return ClipboardStorage(
+        str(config.get_database_path()),
+        write_behind=config.get('storage.write_behind', True),
+        flush_interval=config.get('storage.flush_interval', 1.0),
+        flush_batch_size=config.get('storage.flush_batch_size', 50),
+        blob_threshold=config.get('storage.blob_threshold', 65536),
+        trigram_index=config.get('storage.trigram_index', False),
+        fuzzy_index_size=config.get('storage.fuzzy_index_size', 50000)
+    )
 
 
 class SmartClipboardApp:
     """Main application class"""
     
     def __init__(self):
-        """Initialize the application"""
+        """Initialize the application
+        
+        Only sets up what monitoring needs; the UI and the hotkey are
+        set up by start().
+        """
         print("Starting Smart Clipboard Manager...")
         
         # Initialize components
         self.config = Config()
         print(f"Config loaded from: {self.config.config_path}")
         
-        db_path = self.config.get_database_path()
-        self.storage = ClipboardStorage(str(db_path))
-        print(f"Database: {db_path}")
-        
-        self.analyzer = ContentAnalyzer()
+        self.storage = create_storage(self.config)
+        print(f"Database: {self.storage.db_path}")
         
-        self.clipboard_manager = ClipboardManager(
-            self.storage,
-            self.analyzer,
-            self.config
+        self.analyzer = ContentAnalyzer(
+            cache_size=self.config.get('analysis.cache_size', 4096),
+            sensitive_keywords=self.config.get('analysis.sensitive_keywords', [])
         )
         
-        self.ui = ClipboardUI(
+        self.clipboard_manager = ClipboardManager(
             self.storage,
             self.analyzer,
-            self.clipboard_manager,
             self.config
         )
         
-        # Create UI window
-        self.root = self.ui.create_window()
-        
-        # Setup hotkey
-        hotkey = self.config.get('hotkey', '<ctrl>+<shift>+v')
-        self.hotkey_handler = HotkeyHandler(
-            callback=self.toggle_ui,
-            hotkey=hotkey
-        )
+        self.ui = None
+        self.root = None
+        self.hotkey = self.config.get('hotkey', '<ctrl>+<shift>+v')
+        self.hotkey_handler = None
         
         # Setup signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
-        
-        print(f"Hotkey: {hotkey}")
-        print("Smart Clipboard Manager is ready!")
-        print(f"Press {hotkey.replace('<', '').replace('>', '').replace('+', '+')} to open the clipboard manager")
-        print("Press Ctrl+C to exit")
     
     def toggle_ui(self):
         """Toggle UI visibility"""
         print(f"Hotkey pressed! Window visible: {self.root.winfo_viewable()}")
+        self.clipboard_manager.notify_activity()
         try:
             if self.root.winfo_viewable():
                 self.ui.hide()
@@ -81,11 +86,26 @@ class SmartClipboardApp:
     
     def start(self):
         """Start the application"""
-        # Start clipboard monitoring
+        # Start clipboard monitoring before loading anything else
         self.clipboard_manager.start()
         
-        # Start hotkey handler
-        self.hotkey_handler.start()
+        # The window's widgets are built once the event loop is idle, or
+        # on the first hotkey press if that comes first
+        from .ui import ClipboardUI
+        self.ui = ClipboardUI(
+            self.storage,
+            self.analyzer,
+            self.clipboard_manager,
+            self.config
+        )
+        self.root = self.ui.create_window(build=False)
+        
+        # pynput is slow to import; the hotkey comes up in the background
+        threading.Thread(target=self._start_hotkey, name="hotkey-setup",
+                         daemon=True).start()
+        
+        print("Smart Clipboard Manager is ready!")
+        print("Press Ctrl+C to exit")
         
         # Start UI event loop
         try:
@@ -94,17 +114,40 @@ class SmartClipboardApp:
             print("\nShutting down...")
             self.stop()
     
+    def _start_hotkey(self):
+        """Import pynput and start listening for the hotkey"""
+        try:
+            from .hotkey_handler import HotkeyHandler
+        except ImportError as e:
+            print(f"Hotkey unavailable ({e}); clipboard history is still recorded")
+            return
+        
+        self.hotkey_handler = HotkeyHandler(
+            callback=self.toggle_ui,
+            hotkey=self.hotkey
+        )
+        self.hotkey_handler.start()
+        
+        print(f"Hotkey: {self.hotkey}")
+        print(f"Press {self.hotkey.replace('<', '').replace('>', '').replace('+', '+')} to open the clipboard manager")
+    
     def stop(self):
         """Stop the application"""
         print("Stopping Smart Clipboard Manager...")
         
         # Stop hotkey handler
-        self.hotkey_handler.stop()
+        if self.hotkey_handler:
+            self.hotkey_handler.stop()
         
         # Stop clipboard monitoring
         self.clipboard_manager.stop()
         
-        # Close storage
+        # Stop background searches before the database closes
+        if self.ui:
+            self.ui.close()
+        
+        # Commit pending write-behind saves and close storage
+        self.storage.flush()
         self.storage.close()
         
         print("Goodbye!")
@@ -118,18 +161,29 @@ class SmartClipboardApp:
 
 def show_ui_only():
     """Show the UI without starting background monitoring"""
+    from .clipboard_backends import PyperclipBackend
+    from .ui import ClipboardUI
+    
     try:
         config = Config()
-        db_path = config.get_database_path()
-        storage = ClipboardStorage(str(db_path))
+        storage = create_storage(config)
         analyzer = ContentAnalyzer()
         
         # Create a minimal clipboard manager for UI operations
         class MinimalManager:
             def __init__(self):
-                pass
+                # pyperclip's helper processes keep copied content
+                # available after this short-lived process exits
+                self.backend = PyperclipBackend()
             def add_refresh_callback(self, callback):
                 pass
+            def copy_to_clipboard(self, content):
+                try:
+                    self.backend.copy(content)
+                except Exception as e:
+                    print(f"Error copying to clipboard: {e}")
+                    return False
+                return True
         
         clipboard_manager = MinimalManager()
         
@@ -144,14 +198,68 @@ def show_ui_only():
         traceback.print_exc()
         sys.exit(1)
 
+
+def rebuild_index():
+    """Rebuild the search indexes of the clipboard database"""
+    storage = create_storage(Config())
+    print(f"Rebuilding search indexes in {storage.db_path}...")
+    storage.rebuild_search_index()
+    storage.close()
+    print("Done")
+
+
+def reanalyze_history(workers: int = None):
+    """Re-classify stored clips with the current analyzer rules"""
+    from .reanalyze import reanalyze
+    
+    config = Config()
+    storage = create_storage(config)
+    print(f"Reanalyzing clips in {storage.db_path}...")
+    
+    def report(done, total):
+        print(f"\r  {done}/{total} clips", end='', flush=True)
+    
+    try:
+        stats = reanalyze(
+            storage,
+            sensitive_keywords=config.get('analysis.sensitive_keywords', []),
+            workers=workers,
+            progress=report
+        )
+    except KeyboardInterrupt:
+        print("\nInterrupted; run --reanalyze again to continue where it stopped")
+        return
+    finally:
+        storage.close()
+    
+    print(f"\nDone: {stats['analyzed']} clips in {stats['seconds']:.1f}s, "
+          f"{stats['changed']} changed type")
+    if stats['sensitive']:
+        print(f"{stats['sensitive']} stored clips now look sensitive; they were kept")
+
+
 def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description='Smart Clipboard Manager')
     parser.add_argument('--show-ui', action='store_true', 
                        help='Show the clipboard manager UI only')
+    parser.add_argument('--rebuild-index', action='store_true',
+                       help='Rebuild the search indexes and exit')
+    parser.add_argument('--reanalyze', action='store_true',
+                       help='Re-classify stored clips with the current rules and exit')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Worker processes for --reanalyze (default: CPU count)')
     
     args = parser.parse_args()
     
+    if args.rebuild_index:
+        rebuild_index()
+        return
+    
+    if args.reanalyze:
+        reanalyze_history(args.workers)
+        return
+    
     if args.show_ui:
         show_ui_only()
         return
@@ -0,0 +1,396 @@
+"""
+Precompiled classifier for content type and sensitivity
+"""
+import re
+from typing import Iterable, List, Optional, Tuple
+
+
+# Characters whose density marks text as code
+CODE_SPECIAL_CHARS = '{}[]();=<>+-*/%&|'
+
+# Share of CODE_SPECIAL_CHARS above which text counts as code
+CODE_SPECIAL_DENSITY = 0.1
+
+# Substrings that mark content as sensitive
+SENSITIVE_KEYWORDS = (
+    'password', 'passwd', 'pwd', 'secret', 'token', 'api_key',
+    'apikey', 'private_key', 'privatekey', 'ssn', 'social security'
+)
+
+# Languages in detection order, with the patterns that identify them
+LANGUAGE_PATTERNS = {
+    'python': [r'\bdef\s+\w+\s*\(', r'\bimport\s+\w+', r'\bclass\s+\w+:'],
+    'javascript': [r'\bfunction\s+\w+\s*\(', r'\bconst\s+\w+\s*=', r'=>'],
+    'java': [r'\bpublic\s+class\s+\w+', r'\bprivate\s+\w+\s+\w+'],
+    'cpp': [r'#include\s*<', r'\bstd::', r'\bnamespace\s+\w+'],
+    'go': [r'\bfunc\s+\w+\s*\(', r'\bpackage\s+\w+'],
+    'rust': [r'\bfn\s+\w+\s*\(', r'\blet\s+mut\s+\w+'],
+    'ruby': [r'\bdef\s+\w+', r'\bend\b', r'@\w+'],
+    'php': [r'<\?php', r'\$\w+\s*='],
+}
+
+# Characters lowercased at a time by KeywordScanner
+KEYWORD_CHUNK_CHARS = 16384
+
+# Keywords sharing a prefix this long are looked for with one scan
+KEYWORD_GROUP_PREFIX = 3
+
+_BRACKETS = r'{}\[\]();'
+
+
+def _literal_first(pattern: str) -> str:
+    """Rewrite `\\bword...` as `word(?<!\\wword)...`
+
+    Same matches, but the pattern starts with a literal, which the
+    regex engine finds with a fast scan instead of trying the word
+    boundary at every position.
+    """
+    match = re.match(r'\\b([a-z]+)(.*)', pattern)
+    if match is None:
+        return pattern
+    word, rest = match.groups()
+    return f'{word}(?<!\\w{word}){rest}'
+
+
+class KeywordScanner:
+    """Case-insensitive search for any of a set of keywords
+
+    Same result as `any(keyword in content.lower() ...)`, without the
+    lowercased copy of the whole content:
+    - The content is lowercased one chunk at a time (chunks overlap by
+      the longest keyword), and the search stops at the first chunk
+      with a keyword.
+    - Keywords that contain another keyword are dropped, and keywords
+      sharing a prefix ('password', 'passwd') are found with one scan
+      for the prefix. Only chunks with the prefix are searched for the
+      keywords themselves.
+
+    A single regex alternation would scan the content once, but the
+    regex engine is several times slower than the substring searches
+    of str `in`, one per keyword.
+    """
+
+    def __init__(self, keywords: Iterable[str],
+                 chunk_size: int = KEYWORD_CHUNK_CHARS):
+        """Initialize the scanner
+
+        Args:
+            keywords: Keywords, in any case
+            chunk_size: Characters lowercased at a time
+        """
+        keywords = {keyword.lower() for keyword in keywords if keyword}
+        # Wherever a keyword is found, so is any keyword it contains
+        self.keywords = sorted(
+            keyword for keyword in keywords
+            if not any(other != keyword and other in keyword for other in keywords)
+        )
+        self.groups = self._group(self.keywords)
+        self.chunk_size = chunk_size
+        self.overlap = max((len(keyword) for keyword in self.keywords), default=1) - 1
+
+    @staticmethod
+    def _group(keywords: List[str]) -> List[Tuple[str, List[str]]]:
+        """Group sorted keywords by a shared prefix
+
+        Returns:
+            List of (prefix, keywords starting with it)
+        """
+        groups: List[Tuple[str, List[str]]] = []
+        for keyword in keywords:
+            if groups:
+                prefix, members = groups[-1]
+                shared = len(prefix)
+                while prefix[:shared] != keyword[:shared]:
+                    shared -= 1
+                if shared >= KEYWORD_GROUP_PREFIX:
+                    members.append(keyword)
+                    groups[-1] = (prefix[:shared], members)
+                    continue
+            groups.append((keyword, [keyword]))
+        return groups
+
+    def search(self, content: str) -> bool:
+        """Whether content contains any keyword, ignoring case"""
+        if not self.keywords:
+            return False
+        step = self.chunk_size
+        for start in range(0, len(content), step):
+            chunk = content[start:start + step + self.overlap].lower()
+            for prefix, members in self.groups:
+                if prefix in chunk and (len(members) == 1 or
+                                        any(keyword in chunk for keyword in members)):
+                    return True
+        return False
+
+
+class ContentClassifier:
+    """Content type and sensitivity of a clip, with every pattern compiled once
+
+    Gives exactly the results of the rules ContentAnalyzer first had,
+    which tests/test_classifier.py keeps as ReferenceClassifier, but
+    scans less:
+    - Patterns that need a literal ('://', '@', a path separator) are
+      skipped when the literal is absent, which str `in` finds at
+      memchr speed.
+    - Patterns built on a greedy `.*` that backtracks per start position
+      are rewritten into forms that match exactly when the original
+      does, in one forward scan.
+    - The password, e-mail and markdown link checks, which are
+      quadratic as regexes on some input, are linear scans instead.
+    - Keywords are found by a KeywordScanner, which needs no lowercased
+      copy of the content.
+    - The special-character density is counted with str.translate
+      rather than a Python loop over the characters.
+    - Patterns are arranged to start with a literal or a character
+      class, which the regex engine skips ahead to instead of trying
+      every position.
+    """
+
+    URL_PATTERN = re.compile(
+        r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
+    )
+
+    # EMAIL_PATTERN retries its local part from every word boundary in
+    # front of an '@', which is quadratic on input like 'a.a.a.a...'.
+    # Instead, find each '@' with a valid domain, then read the local
+    # part backwards from the '@' in the reversed text.
+    EMAIL_DOMAIN = re.compile(r'@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+    EMAIL_LOCAL_REVERSED = re.compile(r'[A-Za-z0-9._%+-]+\b')
+
+    CODE_KEYWORD = re.compile(r'(?:def|class|function|var|let|const|import|from)\s+\w+')
+
+    # Two brackets on one line; `[..].*[..]` matches exactly when some
+    # bracket is followed by another with no newline or bracket between
+    CODE_BRACKETS = re.compile(f'[{_BRACKETS}][^\\n{_BRACKETS}]*[{_BRACKETS}]')
+
+    CODE_CONTROL = re.compile(r'(?:if|for|while|switch|try|catch)\s*\(')
+
+    CODE_OPERATORS = ('=>', '->', '||', '&&')
+
+    # The original is `(?:[a-zA-Z]:\\|/)?(?:[\w\-]+[/\\])+[\w\-\.]+\.\w+`.
+    # Its prefix is optional, and any match contains one that starts at
+    # its last separator, so this finds the same clips. Starting from the
+    # separator lets the scan skip ahead to the next slash.
+    FILE_PATH = re.compile(r'[/\\](?<=[\w\-][/\\])[\w\-\.]+\.\w+')
+
+    # Markdown bold or italic (`\*\*.*\*\*` is covered by `\*.*\*`);
+    # links are found by _has_markdown_link
+    MARKDOWN_EMPHASIS = re.compile(r'\*[^\n*]*\*')
+
+    # Markdown headers, lists and numbered lists, at the start of the
+    # text or after a newline. Whitespace before a list marker may only
+    # come from the marker's own line; `^\s*` reaching back over newlines
+    # always has a later line start that matches too.
+    _MARKDOWN_LINE = r'(?:#{1,6}\s|[^\S\n]*(?:[-*+]|\d+\.)\s)'
+    MARKDOWN_FIRST_LINE = re.compile(_MARKDOWN_LINE)
+    MARKDOWN_LINE = re.compile('\n' + _MARKDOWN_LINE)
+
+    # `\b\d{4}...`, with the word boundary checked after the first
+    # digit so the scan can skip to digits; [0-9] is quicker still and
+    # the same as \d on ASCII text
+    CREDIT_CARD = re.compile(r'\d(?<!\w\d)\d{3}[\s\-]?\d{4}[\s\-]?\d{4}[\s\-]?\d{4}\b')
+    CREDIT_CARD_ASCII = re.compile(
+        r'[0-9](?<!\w[0-9])[0-9]{3}[\s\-]?[0-9]{4}[\s\-]?[0-9]{4}[\s\-]?[0-9]{4}\b'
+    )
+
+    # PASSWORD_PATTERN is eight or more of these characters, starting
+    # where the rest of the line has a lowercase letter, an uppercase
+    # letter, a digit and a symbol
+    PASSWORD_RUN = re.compile(r'[A-Za-z\d@$!%*?&]{8}')
+    PASSWORD_SYMBOL = re.compile(r'[@$!%*?&]')
+    # Whether there is a symbol at all is quicker to ask str `in`
+    PASSWORD_SYMBOLS = '@$!%*?&'
+    PASSWORD_CLASSES = (re.compile(r'[a-z]'), re.compile(r'[A-Z]'), re.compile(r'\d'))
+    # password_traits() of text with a symbol and every class
+    PASSWORD_TRAITS = 0b1111
+
+    LANGUAGES = [
+        (language, [re.compile(_literal_first(pattern)) for pattern in patterns])
+        for language, patterns in LANGUAGE_PATTERNS.items()
+    ]
+
+    _DELETE_SPECIALS = str.maketrans('', '', CODE_SPECIAL_CHARS)
+
+    def __init__(self, extra_keywords: Iterable[str] = ()):
+        """Initialize the classifier
+
+        Args:
+            extra_keywords: Keywords that mark content as sensitive, in
+                addition to SENSITIVE_KEYWORDS
+        """
+        self.keywords = KeywordScanner(SENSITIVE_KEYWORDS + tuple(extra_keywords))
+
+    def classify(self, content: str) -> Tuple[str, bool]:
+        """Classify non-empty content
+
+        Returns:
+            Tuple of (content type, whether it looks sensitive)
+        """
+        return self.content_type(content), self.is_sensitive(content)
+
+    def content_type(self, content: str) -> str:
+        """Content type, as ReferenceClassifier.determine_type"""
+        if '://' in content and self.URL_PATTERN.search(content):
+            return 'url'
+
+        if '@' in content and self.find_email(content) is not None:
+            return 'email'
+
+        if self.is_code(content):
+            return 'code'
+
+        if (('/' in content or '\\' in content) and '.' in content and
+                self.FILE_PATH.search(content)):
+            return 'file_path'
+
+        if content.strip().replace('-', '').replace(' ', '').isdigit():
+            return 'number'
+
+        stripped = content.strip()
+        if ((stripped.startswith('{') and stripped.endswith('}')) or
+                (stripped.startswith('[') and stripped.endswith(']'))) and '"' in stripped:
+            return 'json'
+
+        if (self.MARKDOWN_FIRST_LINE.match(content) or
+                ('\n' in content and self.MARKDOWN_LINE.search(content)) or
+                ('*' in content and self.MARKDOWN_EMPHASIS.search(content)) or
+                ('](' in content and self._has_markdown_link(content))):
+            return 'markdown'
+
+        return 'text'
+
+    def find_email(self, content: str) -> Optional[str]:
+        """First match of ReferenceClassifier.EMAIL_PATTERN, or None"""
+        reversed_content = None
+        for domain in self.EMAIL_DOMAIN.finditer(content):
+            if reversed_content is None:
+                reversed_content = content[::-1]
+            # Reversed, the local part ends at its word boundary; the
+            # longest one is where the forward search would start
+            local = self.EMAIL_LOCAL_REVERSED.match(reversed_content, len(content) - domain.start())
+            if local is not None:
+                return content[len(content) - local.end():domain.end()]
+        return None
+
+    @staticmethod
+    def _has_markdown_link(content: str) -> bool:
+        """Whether the markdown link pattern `[.*](.*)` matches, in one
+        pass over the lines
+
+        The regex retries from every '[' on a line. It is enough to take
+        the first '[' of a line, the first '](' after it and look for a
+        ')' after that.
+        """
+        position = content.find('](')
+        while position >= 0:
+            line_start = content.rfind('\n', 0, position) + 1
+            line_end = content.find('\n', position)
+            if line_end < 0:
+                line_end = len(content)
+            # position is the first '](' on its line
+            link = position
+            if content.find('[', line_start, position) < 0:
+                bracket = content.find('[', position, line_end)
+                link = content.find('](', bracket + 1, line_end) if bracket >= 0 else -1
+            if link >= 0 and content.find(')', link + 2, line_end) >= 0:
+                return True
+            position = content.find('](', line_end)
+        return False
+
+    def is_code(self, content: str) -> bool:
+        """Whether content looks like code, as ReferenceClassifier.is_code"""
+        # Cheapest checks first; two matching patterns decide
+        matches = 0
+        if any(operator in content for operator in self.CODE_OPERATORS):
+            matches += 1
+        if self.CODE_BRACKETS.search(content):
+            matches += 1
+            if matches >= 2:
+                return True
+        if '(' in content and self.CODE_CONTROL.search(content):
+            matches += 1
+            if matches >= 2:
+                return True
+        if matches == 1 and self.CODE_KEYWORD.search(content):
+            return True
+
+        if not content:
+            return False
+        special_chars = len(content) - len(content.translate(self._DELETE_SPECIALS))
+        return special_chars / len(content) > CODE_SPECIAL_DENSITY
+
+    def is_sensitive(self, content: str) -> bool:
+        """Whether content looks sensitive, as ReferenceClassifier.is_sensitive
+        (plus any extra keywords)"""
+        if self.keywords.search(content):
+            return True
+
+        credit_card = self.CREDIT_CARD_ASCII if content.isascii() else self.CREDIT_CARD
+        if credit_card.search(content):
+            return True
+
+        return self._has_password(content)
+
+    def _has_password(self, content: str) -> bool:
+        """Whether ReferenceClassifier.PASSWORD_PATTERN matches
+
+        Only lines with a run of eight can match, so those are the lines
+        visited, found by one regex scan rather than line by line. The
+        first run of eight on a line sees the longest rest of the line,
+        so it is the only start that needs checking.
+        """
+        if not self._has_symbol(content):
+            return False
+        if not all(pattern.search(content) for pattern in self.PASSWORD_CLASSES):
+            return False
+        position = 0
+        while True:
+            # position is always at the start of a line
+            run = self.PASSWORD_RUN.search(content, position)
+            if run is None:
+                return False
+            start = run.start()
+            line_end = content.find('\n', run.end())
+            if line_end < 0:
+                line_end = len(content)
+            if (self.PASSWORD_SYMBOL.search(content, start, line_end) and
+                    all(pattern.search(content, start, line_end)
+                        for pattern in self.PASSWORD_CLASSES)):
+                return True
+            position = line_end + 1
+
+    def _has_symbol(self, content: str) -> bool:
+        """Whether content has any of PASSWORD_SYMBOLS"""
+        return any(symbol in content for symbol in self.PASSWORD_SYMBOLS)
+
+    def password_traits(self, content: str, found: int = 0) -> int:
+        """Which characters of a password content has, in any order
+
+        These are a symbol and one character of each of
+        PASSWORD_CLASSES. A line can only match the password pattern if it
+        has all four, and a long line that does nearly always matches:
+        it only also needs a run of eight ahead of them. Characters
+        missing from one piece of a line may be looked for in the next.
+
+        Args:
+            content: Text to look in
+            found: Bits of the characters already found, which are not
+                looked for again
+
+        Returns:
+            Bit mask of the characters found, PASSWORD_TRAITS when all are
+        """
+        patterns = (None,) + self.PASSWORD_CLASSES
+        for bit, pattern in enumerate(patterns):
+            if found & 1 << bit:
+                continue
+            if self._has_symbol(content) if pattern is None else pattern.search(content):
+                found |= 1 << bit
+        return found
+
+    def detect_language(self, content: str) -> Optional[str]:
+        """Programming language of code, or None if not recognized"""
+        for language, patterns in self.LANGUAGES:
+            if any(pattern.search(content) for pattern in patterns):
+                return language
+        return None
@@ -0,0 +1,343 @@
+"""
+Clipboard access backends used by the clipboard monitor
+"""
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+# Supported values for the 'clipboard_backend' config option
+BACKENDS = ('auto', 'xlib', 'pyperclip')
+
+
+class ClipboardBackend:
+    """Base class for clipboard read/write backends"""
+
+    name = 'base'
+
+    def paste(self) -> str:
+        """Read text from the clipboard
+
+        Returns:
+            Clipboard text, or an empty string if the clipboard holds no text
+        """
+        raise NotImplementedError
+
+    def copy(self, content: str):
+        """Write text to the clipboard
+
+        Args:
+            content: Text to put on the clipboard
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the backend"""
+        pass
+
+
+class PyperclipBackend(ClipboardBackend):
+    """Clipboard access through pyperclip
+
+    On Linux pyperclip runs xclip/xsel for every call, so each read or write
+    costs a fork/exec. Content copied this way outlives the process, which
+    makes it the right choice for short-lived callers such as --show-ui.
+    """
+
+    name = 'pyperclip'
+
+    def __init__(self):
+        """Initialize pyperclip backend"""
+        import pyperclip
+        self._pyperclip = pyperclip
+
+    def paste(self) -> str:
+        """Read text from the clipboard"""
+        return self._pyperclip.paste()
+
+    def copy(self, content: str):
+        """Write text to the clipboard"""
+        self._pyperclip.copy(content)
+
+
+class XlibBackend(ClipboardBackend):
+    """In-process X11 clipboard access over one persistent connection
+
+    Reads convert the CLIPBOARD selection into a property on a private
+    window. Writes take ownership of the selection and a background thread
+    answers other clients' requests, so neither path spawns a process.
+    Content copied through this backend is only available while the
+    process is running.
+    """
+
+    name = 'xlib'
+
+    def __init__(self, selection: str = 'CLIPBOARD',
+                 display_name: Optional[str] = None,
+                 timeout: float = 1.0):
+        """Initialize Xlib backend
+
+        Args:
+            selection: Name of the selection to read and write
+            display_name: X display to connect to. If None, uses $DISPLAY.
+            timeout: Seconds to wait for the selection owner to respond
+
+        Raises:
+            ImportError: If python-xlib is not installed
+        """
+        # Must be imported before the display is opened to get real locks
+        import Xlib.threaded  # noqa: F401
+        from Xlib import X, Xatom, display
+
+        self.X = X
+        self.timeout = timeout
+        self.display = display.Display(display_name)
+        self.window = self.display.screen().root.create_window(
+            0, 0, 1, 1, 0, X.CopyFromParent,
+            event_mask=X.PropertyChangeMask
+        )
+
+        self.selection = self.display.intern_atom(selection)
+        self.utf8_string = self.display.intern_atom('UTF8_STRING')
+        self.targets = self.display.intern_atom('TARGETS')
+        self.incr = self.display.intern_atom('INCR')
+        self.property = self.display.intern_atom('SMART_CLIPBOARD')
+        self.text_targets = (self.utf8_string, Xatom.STRING)
+        self.atom_type = Xatom.ATOM
+
+        # Largest payload that fits in a single ChangeProperty request
+        self.max_write_size = (self.display.info.max_request_length - 64) * 4
+
+        self._owned: Optional[bytes] = None
+        self._events: List = []
+        self._cond = threading.Condition()
+        self._read_lock = threading.Lock()
+        self._fallback: Optional[ClipboardBackend] = None
+
+        self.running = True
+        self._thread = threading.Thread(target=self._event_loop, daemon=True)
+        self._thread.start()
+
+    def paste(self) -> str:
+        """Read text from the clipboard"""
+        with self._cond:
+            if self._owned is not None:
+                return self._owned.decode('utf-8', errors='replace')
+
+        X = self.X
+        with self._read_lock:
+            with self._cond:
+                self._events = []
+
+            self.window.convert_selection(
+                self.selection, self.utf8_string, self.property, X.CurrentTime
+            )
+            self.display.flush()
+
+            notify = self._wait_event(lambda e: e.type == X.SelectionNotify)
+            if notify is None or notify.property == X.NONE:
+                return ""
+
+            # Property changes queued so far predate this transfer
+            with self._cond:
+                self._events = [e for e in self._events
+                                if e.type != X.PropertyNotify]
+
+            data, property_type = self._take_property()
+            if property_type == self.incr:
+                data = self._read_incr()
+
+            return data.decode('utf-8', errors='replace')
+
+    def copy(self, content: str):
+        """Write text to the clipboard
+
+        Content too large for a single property write is handed to
+        pyperclip instead, after giving up any selection we own so that
+        neither paste() nor other clients see the previous copy.
+        """
+        data = content.encode('utf-8')
+        if len(data) > self.max_write_size:
+            with self._cond:
+                owned, self._owned = self._owned, None
+            if owned is not None:
+                from Xlib.protocol import request
+                request.SetSelectionOwner(
+                    display=self.display.display, window=self.X.NONE,
+                    selection=self.selection, time=self.X.CurrentTime
+                )
+                self.display.flush()
+            if self._fallback is None:
+                self._fallback = PyperclipBackend()
+            self._fallback.copy(content)
+            return
+
+        with self._cond:
+            self._owned = data
+
+        self.window.set_selection_owner(self.selection, self.X.CurrentTime)
+        self.display.flush()
+
+        if self.display.get_selection_owner(self.selection) != self.window:
+            with self._cond:
+                self._owned = None
+            raise RuntimeError("Could not take ownership of the clipboard")
+
+    def close(self):
+        """Stop the event thread and close the X connection"""
+        from Xlib.protocol import event as xevent
+
+        self.running = False
+
+        # Wake the event thread with a message to our own window
+        wakeup = xevent.ClientMessage(
+            window=self.window, client_type=self.property,
+            data=(32, [0, 0, 0, 0, 0])
+        )
+        self.window.send_event(wakeup, event_mask=0)
+        self.display.flush()
+        self._thread.join(timeout=1.0)
+        self.display.close()
+
+    def _event_loop(self):
+        """Dispatch X events until the backend is closed"""
+        X = self.X
+        while self.running:
+            try:
+                event = self.display.next_event()
+            except Exception as e:
+                if self.running:
+                    print(f"Error reading X events: {e}")
+                return
+
+            if event.type == X.SelectionRequest:
+                self._serve_request(event)
+            elif event.type == X.SelectionClear:
+                with self._cond:
+                    self._owned = None
+            elif event.type in (X.SelectionNotify, X.PropertyNotify):
+                with self._cond:
+                    self._events.append(event)
+                    self._cond.notify_all()
+
+    def _serve_request(self, request):
+        """Answer another client's request for our selection"""
+        from Xlib.protocol import event as xevent
+
+        X = self.X
+        with self._cond:
+            data = self._owned
+
+        # Obsolete clients may leave the property unset
+        prop = request.property if request.property != X.NONE else request.target
+
+        if data is None or request.selection != self.selection:
+            prop = X.NONE
+        elif request.target == self.targets:
+            request.requestor.change_property(
+                prop, self.atom_type, 32,
+                [self.targets, self.utf8_string, self.text_targets[1]]
+            )
+        elif request.target == self.utf8_string:
+            request.requestor.change_property(prop, request.target, 8, data)
+        elif request.target in self.text_targets:
+            # STRING is Latin-1
+            text = data.decode('utf-8', errors='replace')
+            request.requestor.change_property(
+                prop, request.target, 8, text.encode('latin-1', errors='replace')
+            )
+        else:
+            prop = X.NONE
+
+        notify = xevent.SelectionNotify(
+            time=request.time,
+            requestor=request.requestor,
+            selection=request.selection,
+            target=request.target,
+            property=prop
+        )
+        request.requestor.send_event(notify, event_mask=0)
+        self.display.flush()
+
+    def _wait_event(self, predicate: Callable) -> Optional[object]:
+        """Wait for a queued event matching predicate
+
+        Returns:
+            Matching event, or None on timeout
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                for index, event in enumerate(self._events):
+                    if predicate(event):
+                        return self._events.pop(index)
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def _take_property(self):
+        """Read and delete the transfer property on our window
+
+        Returns:
+            Tuple of (data bytes, property type atom)
+        """
+        prop = self.window.get_full_property(self.property, self.X.AnyPropertyType)
+        self.window.delete_property(self.property)
+        self.display.flush()
+
+        if prop is None:
+            return b"", self.X.NONE
+
+        value = prop.value
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        elif not isinstance(value, bytes):
+            value = b""
+        return value, prop.property_type
+
+    def _read_incr(self) -> bytes:
+        """Receive a selection sent with the INCR protocol"""
+        X = self.X
+        chunks = []
+
+        while True:
+            event = self._wait_event(
+                lambda e: (e.type == X.PropertyNotify and
+                           e.atom == self.property and
+                           e.state == X.PropertyNewValue)
+            )
+            if event is None:
+                break
+
+            data, _ = self._take_property()
+            if not data:
+                break
+            chunks.append(data)
+
+        return b"".join(chunks)
+
+
+def create_backend(name: str = 'auto') -> ClipboardBackend:
+    """Create a clipboard backend
+
+    Args:
+        name: 'xlib', 'pyperclip', or 'auto' to prefer xlib when an X
+            display is reachable
+
+    Returns:
+        ClipboardBackend instance
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown clipboard backend: {name}")
+
+    if name in ('auto', 'xlib'):
+        try:
+            return XlibBackend()
+        except Exception as e:
+            if name == 'xlib':
+                print(f"Xlib clipboard backend unavailable ({e}), "
+                      f"falling back to pyperclip")
+
+    return PyperclipBackend()
@@ -1,33 +1,205 @@
 """
 Background clipboard monitoring service
 """
+import os
+import select
 import threading
 import time
-import pyperclip
-from typing import Callable, Optional
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
 from datetime import datetime
 
+from .clipboard_backends import ClipboardBackend, create_backend
+from .ingest_pipeline import IngestPipeline
+from .storage import fingerprint
+
+
+# Supported values for the 'monitor_mode' config option
+MONITOR_MODES = ('auto', 'event', 'poll')
+
+# Reasons ClipboardManager turns a clip away, in the order they are checked
+REJECT_REASONS = ('empty', 'too_large', 'excluded_app', 'unchanged', 'sensitive')
+
+# Seconds a clipboard change waits for the active app on the monitor
+# thread; a slower detection is finished by the first ingest stage
+APP_DETECTION_WAIT = 0.05
+
+
+class ClipDelta(NamedTuple):
+    """One change the ingest pipeline made to the history"""
+    kind: str  # 'added', 'bumped' or 'evicted'
+    clip_id: int
+    row: Optional[Dict]  # Listing row (see storage.LISTING_COLUMNS), None if evicted
+
+
+class SelectionWatcher:
+    """Waits for X11 selection ownership changes using the XFixes extension
+    
+    Every copy in an X11 application makes that application the new owner
+    of the CLIPBOARD selection, so watching ownership lets the monitor read
+    the clipboard only when it can actually have changed.
+    """
+    
+    def __init__(self, selection: str = 'CLIPBOARD',
+                 display_name: Optional[str] = None):
+        """Initialize selection watcher
+        
+        Args:
+            selection: Name of the selection to watch
+            display_name: X display to connect to. If None, uses $DISPLAY.
+            
+        Raises:
+            ImportError: If python-xlib is not installed
+            RuntimeError: If the X server does not support XFixes
+        """
+        from Xlib import display
+        from Xlib.ext import xfixes
+        
+        self.display = display.Display(display_name)
+        if not self.display.has_extension('XFIXES'):
+            self.display.close()
+            raise RuntimeError("X server does not support the XFIXES extension")
+        
+        self.display.xfixes_query_version()
+        self.selection = self.display.intern_atom(selection)
+        self._event_type = self.display.extension_event.SetSelectionOwnerNotify[0]
+        
+        mask = (xfixes.XFixesSetSelectionOwnerNotifyMask |
+                xfixes.XFixesSelectionWindowDestroyNotifyMask |
+                xfixes.XFixesSelectionClientCloseNotifyMask)
+        self.display.xfixes_select_selection_input(
+            self.display.screen().root, self.selection, mask
+        )
+        self.display.flush()
+        
+        # Self-pipe so stop() can interrupt a blocking wait()
+        self._wake_r, self._wake_w = os.pipe()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the selection owner changes
+        
+        Args:
+            timeout: Maximum time to wait in seconds. If None, waits forever.
+            
+        Returns:
+            True if the owner changed, False on timeout or wake()
+        """
+        if self._drain_events():
+            return True
+        
+        readable, _, _ = select.select(
+            [self.display, self._wake_r], [], [], timeout
+        )
+        if self._wake_r in readable:
+            os.read(self._wake_r, 64)
+        
+        return self._drain_events()
+    
+    def wake(self):
+        """Interrupt a pending wait() from another thread"""
+        os.write(self._wake_w, b'x')
+    
+    def close(self):
+        """Close the X connection and wake pipe"""
+        self.display.close()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+    
+    def _drain_events(self) -> bool:
+        """Consume queued X events
+        
+        Returns:
+            True if any of them was a selection owner notification
+        """
+        changed = False
+        while self.display.pending_events():
+            event = self.display.next_event()
+            if event.type == self._event_type:
+                changed = True
+        return changed
+
+
+class AdaptivePollScheduler:
+    """Chooses the delay before the next clipboard poll
+    
+    Copies tend to arrive in bursts, so the interval drops to its minimum
+    right after a change and then grows exponentially while the clipboard
+    stays idle, up to a ceiling.
+    """
+    
+    def __init__(self, base_interval: float = 0.5,
+                 min_interval: float = 0.1,
+                 max_interval: float = 5.0,
+                 backoff: float = 1.5):
+        """Initialize scheduler
+        
+        Args:
+            base_interval: Interval used at start and after user activity
+            min_interval: Interval used right after a clipboard change
+            max_interval: Ceiling for the idle back-off
+            backoff: Factor the interval grows by after each idle poll
+        """
+        self.base_interval = base_interval
+        self.min_interval = min(min_interval, base_interval)
+        self.max_interval = max(max_interval, base_interval)
+        self.backoff = backoff
+        self.interval = base_interval
+    
+    def on_change(self):
+        """Tighten the interval after the clipboard changed"""
+        self.interval = self.min_interval
+    
+    def on_idle(self):
+        """Back off after a poll that found no change"""
+        self.interval = min(self.interval * self.backoff, self.max_interval)
+    
+    def reset(self):
+        """Return to the base interval, e.g. after hotkey or UI activity"""
+        self.interval = self.base_interval
+
 
 class ClipboardMonitor:
     """Monitors clipboard for changes and triggers callbacks"""
     
     def __init__(self, callback: Callable[[str], None], 
                  interval: float = 0.5,
-                 ignore_empty: bool = True):
+                 ignore_empty: bool = True,
+                 mode: str = 'auto',
+                 backend: Optional[ClipboardBackend] = None,
+                 scheduler: Optional[AdaptivePollScheduler] = None):
         """Initialize clipboard monitor
         
         Args:
             callback: Function to call when clipboard changes
             interval: Polling interval in seconds
             ignore_empty: Whether to ignore empty clipboard content
+            mode: 'event' to wait for X11 selection changes, 'poll' to read
+                the clipboard every interval, or 'auto' to use events when
+                available and fall back to polling otherwise
+            backend: Clipboard backend used for reads and writes. If None,
+                one is created on first use.
+            scheduler: Adaptive scheduler for poll mode. If None, polls
+                every interval seconds.
         """
+        if mode not in MONITOR_MODES:
+            raise ValueError(f"Unknown monitor mode: {mode}")
+        
         self.callback = callback
         self.interval = interval
         self.ignore_empty = ignore_empty
+        self.mode = mode
+        self.backend = backend
+        self.scheduler = scheduler
+        self.active_mode: Optional[str] = None
         self.last_content = ""
         self.running = False
         self.thread: Optional[threading.Thread] = None
+        self.watcher: Optional[SelectionWatcher] = None
         self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.wakeups = 0
+        self.changes = 0
+        self.started_at: Optional[float] = None
     
     def start(self):
         """Start monitoring clipboard"""
@@ -35,10 +207,16 @@ class ClipboardMonitor:
             print("Clipboard monitor already running")
             return
         
+        self._get_backend()
+        self.watcher = self._create_watcher()
+        self.active_mode = 'event' if self.watcher else 'poll'
+        
         self.running = True
+        self.started_at = time.monotonic()
+        self._wake.clear()
         self.thread = threading.Thread(target=self._monitor_loop, daemon=True)
         self.thread.start()
-        print("Clipboard monitor started")
+        print(f"Clipboard monitor started ({self.active_mode} mode)")
     
     def stop(self):
         """Stop monitoring clipboard"""
@@ -46,45 +224,157 @@ class ClipboardMonitor:
             return
         
         self.running = False
+        self._wake.set()
+        if self.watcher:
+            self.watcher.wake()
         if self.thread:
             self.thread.join(timeout=2.0)
+        if self.watcher:
+            self.watcher.close()
+            self.watcher = None
         print("Clipboard monitor stopped")
     
+    def _get_backend(self) -> ClipboardBackend:
+        """Get the clipboard backend, creating the default one if needed"""
+        if self.backend is None:
+            self.backend = create_backend()
+        return self.backend
+    
+    def _create_watcher(self) -> Optional[SelectionWatcher]:
+        """Create a selection watcher if event mode is requested and available
+        
+        Returns:
+            SelectionWatcher instance, or None to use polling
+        """
+        if self.mode == 'poll':
+            return None
+        
+        try:
+            return SelectionWatcher()
+        except Exception as e:
+            if self.mode == 'event':
+                print(f"Event-driven clipboard monitoring unavailable ({e}), "
+                      f"falling back to polling")
+            return None
+    
     def _monitor_loop(self):
         """Main monitoring loop"""
         # Initialize with current clipboard content
         try:
-            self.last_content = pyperclip.paste()
+            self.last_content = self.backend.paste()
         except Exception as e:
             print(f"Error reading initial clipboard: {e}")
             self.last_content = ""
         
         while self.running:
+            if self.watcher:
+                # Only read the clipboard once its owner has changed
+                try:
+                    owner_changed = self.watcher.wait()
+                except Exception as e:
+                    print(f"Error waiting for clipboard events ({e}), "
+                          f"falling back to polling")
+                    self._fall_back_to_polling()
+                    continue
+                if not owner_changed:
+                    continue
+            
+            self.wakeups += 1
+            if not self.watcher:
+                # Clear before reading, so activity from here on cuts the
+                # next sleep short instead of being cleared after it
+                self._wake.clear()
+            changed = False
             try:
-                current_content = pyperclip.paste()
-                
-                # Check if content has changed
-                if current_content != self.last_content:
-                    # Ignore empty content if configured
-                    if self.ignore_empty and not current_content.strip():
-                        self.last_content = current_content
-                        continue
-                    
-                    # Update last content
-                    with self._lock:
-                        self.last_content = current_content
-                    
-                    # Trigger callback
-                    try:
-                        self.callback(current_content)
-                    except Exception as e:
-                        print(f"Error in clipboard callback: {e}")
-                
+                changed = self._check_clipboard()
             except Exception as e:
                 print(f"Error monitoring clipboard: {e}")
             
-            # Sleep for interval
-            time.sleep(self.interval)
+            if not self.watcher and self.running:
+                # Sleep until the next poll, or until activity wakes us
+                self._wake.wait(self._next_interval(changed))
+    
+    def _fall_back_to_polling(self):
+        """Drop a failed selection watcher and poll from now on"""
+        watcher = self.watcher
+        self.watcher = None
+        self.active_mode = 'poll'
+        try:
+            watcher.close()
+        except Exception as e:
+            print(f"Error closing selection watcher: {e}")
+    
+    def _next_interval(self, changed: bool) -> float:
+        """Get the delay before the next poll
+        
+        Args:
+            changed: Whether the last poll found new content
+        """
+        if self.scheduler is None:
+            return self.interval
+        
+        if changed:
+            self.scheduler.on_change()
+        else:
+            self.scheduler.on_idle()
+        return self.scheduler.interval
+    
+    def _check_clipboard(self) -> bool:
+        """Read the clipboard and trigger the callback if it changed
+        
+        Returns:
+            True if the clipboard content changed
+        """
+        current_content = self.backend.paste()
+        
+        # Check if content has changed
+        if current_content == self.last_content:
+            return False
+        
+        # Ignore empty content if configured (isspace() stops at the
+        # first visible character, strip() would copy the content)
+        if self.ignore_empty and (not current_content or current_content.isspace()):
+            self.last_content = current_content
+            return True
+        
+        # Update last content
+        with self._lock:
+            self.last_content = current_content
+        self.changes += 1
+        
+        # Trigger callback
+        try:
+            self.callback(current_content)
+        except Exception as e:
+            print(f"Error in clipboard callback: {e}")
+        return True
+    
+    def notify_activity(self):
+        """Poll again soon because the user is interacting with the app"""
+        if self.scheduler:
+            self.scheduler.reset()
+        self._wake.set()
+    
+    def get_stats(self) -> Dict:
+        """Get monitoring statistics
+        
+        Returns:
+            Dict with the active mode, current poll interval and wakeup
+            counts
+        """
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        if self.active_mode == 'poll':
+            interval = self.scheduler.interval if self.scheduler else self.interval
+        else:
+            interval = None
+        
+        return {
+            'mode': self.active_mode,
+            'interval': interval,
+            'wakeups': self.wakeups,
+            'changes': self.changes,
+            'wakeups_per_minute': self.wakeups * 60.0 / elapsed if elapsed else 0.0
+        }
     
     def get_current_content(self) -> str:
         """Get current clipboard content
@@ -102,7 +392,7 @@ class ClipboardMonitor:
             content: Content to set
         """
         try:
-            pyperclip.copy(content)
+            self._get_backend().copy(content)
             with self._lock:
                 self.last_content = content
         except Exception as e:
@@ -112,40 +402,119 @@ class ClipboardMonitor:
 class ClipboardManager:
     """High-level clipboard manager that integrates monitoring and storage"""
     
-    def __init__(self, storage, analyzer, config):
+    def __init__(self, storage, analyzer, config,
+                 backend: Optional[ClipboardBackend] = None):
         """Initialize clipboard manager
         
         Args:
             storage: ClipboardStorage instance
             analyzer: ContentAnalyzer instance
             config: Config instance
+            backend: Clipboard backend. If None, one is created from the
+                clipboard_backend option.
         """
         self.storage = storage
         self.analyzer = analyzer
         self.config = config
         
-        # Get active window/app name (platform-specific)
+        # Get active window/app name (platform-specific). Detection can
+        # run a subprocess, so it happens on a thread of its own
         self.app_detector = AppDetector()
+        self._app_detection = ThreadPoolExecutor(max_workers=1)
         
         # Refresh callbacks for UI updates
         self.refresh_callbacks = []
+        # Called with a ClipDelta for every history change, on the ingest thread
+        self.delta_callbacks = []
         
         # Create monitor with callback
         interval = config.get('monitor_interval', 0.5)
+        self.backend = backend or create_backend(config.get('clipboard_backend', 'auto'))
+        scheduler = None
+        if config.get('polling.adaptive', True):
+            scheduler = AdaptivePollScheduler(
+                base_interval=interval,
+                min_interval=config.get('polling.min_interval', 0.1),
+                max_interval=config.get('polling.max_interval', 5.0),
+                backoff=config.get('polling.backoff', 1.5)
+            )
         self.monitor = ClipboardMonitor(
             callback=self._on_clipboard_change,
-            interval=interval
+            interval=interval,
+            mode=config.get('monitor_mode', 'auto'),
+            backend=self.backend,
+            scheduler=scheduler
         )
         
         self.excluded_apps = set(config.get('excluded_apps', []))
+        self.max_content_size = config.get('max_content_size', 1048576)
+        
+        # Clips turned away before storage, by reason. Cheap checks run
+        # first, so a rejected clip skips every stage after its check.
+        self.rejected = {reason: 0 for reason in REJECT_REASONS}
+        # Newest clip this manager stored, as (fingerprint, clip ID)
+        self._last_saved: Optional[Tuple[int, int]] = None
+        
+        # Clipboard changes are processed off the monitor thread
+        self.pipeline = IngestPipeline(
+            [
+                ('dedupe', self._dedupe_stage),
+                ('analyze', self._analyze_stage),
+                ('store', self._store_stage),
+            ],
+            max_queue=config.get('ingest.max_queue', 64),
+            policy=config.get('ingest.overflow_policy', 'coalesce')
+        )
     
     def start(self):
         """Start clipboard monitoring"""
+        # Repeat copies of recent clips skip analysis from the start
+        self.analyzer.warm_cache(
+            self.storage.load_analyses(self.analyzer.rules_version, self.analyzer.cache_size)
+        )
+        self.pipeline.start()
         self.monitor.start()
     
     def stop(self):
         """Stop clipboard monitoring"""
         self.monitor.stop()
+        # Finish clips that were already captured
+        self.pipeline.stop()
+        self._app_detection.shutdown(wait=False)
+        self.backend.close()
+    
+    def copy_to_clipboard(self, content: str) -> bool:
+        """Put content on the clipboard
+        
+        Unlike paste_clip, the monitor still sees this as a clipboard
+        change, so the clip is bumped to the top of the history.
+        
+        Args:
+            content: Content to copy
+            
+        Returns:
+            True if copied, False if the backend failed
+        """
+        try:
+            self.backend.copy(content)
+        except Exception as e:
+            print(f"Error copying to clipboard: {e}")
+            return False
+        self.monitor.notify_activity()
+        return True
+    
+    def notify_activity(self):
+        """Tell the monitor the user is active (hotkey or UI use)"""
+        self.monitor.notify_activity()
+    
+    def get_stats(self) -> Dict:
+        """Get clipboard manager statistics"""
+        return {
+            'monitor': self.monitor.get_stats(),
+            'ingest': self.pipeline.get_stats(),
+            'rejected': dict(self.rejected),
+            'analysis': self.analyzer.get_stats()
+        }
     
     def add_refresh_callback(self, callback):
         """Add a callback to be called when clipboard is updated
@@ -155,6 +524,25 @@ class ClipboardManager:
         """
         self.refresh_callbacks.append(callback)
     
+    def add_delta_callback(self, callback: Callable[[ClipDelta], None]):
+        """Add a callback to be told what each stored clip changed
+        
+        The callback runs on the ingest thread and should only hand the
+        delta over, e.g. to a queue.Queue read by the UI thread.
+        
+        Args:
+            callback: Function called with a ClipDelta
+        """
+        self.delta_callbacks.append(callback)
+    
+    def _post_delta(self, delta: ClipDelta):
+        """Pass a history change to the delta callbacks"""
+        for callback in self.delta_callbacks:
+            try:
+                callback(delta)
+            except Exception as e:
+                print(f"Error in delta callback: {e}")
+    
     def _trigger_refresh_callbacks(self):
         """Trigger all refresh callbacks"""
         for callback in self.refresh_callbacks:
@@ -166,47 +554,121 @@ class ClipboardManager:
     def _on_clipboard_change(self, content: str):
         """Handle clipboard change event
         
+        Runs on the monitor thread, so it only applies the checks that
+        take constant time, starts reading the active app and queues the
+        content; the pipeline stages below do the actual work. It waits
+        for the app for at most APP_DETECTION_WAIT seconds.
+        
         Args:
             content: New clipboard content
         """
-        # Get current app name
-        app_name = self.app_detector.get_active_app()
+        if not content or content.isspace():
+            self._reject('empty')
+            return
         
-        # Check if app is excluded
-        if app_name in self.excluded_apps:
-            print(f"Ignoring clipboard from excluded app: {app_name}")
+        # Before anything reads the content, so an oversized paste costs
+        # nothing beyond the clipboard read itself
+        if len(content) > self.max_content_size:
+            self._reject('too_large', f"Content too large ({len(content)} characters), skipping")
             return
         
-        # Analyze content
-        analysis = self.analyzer.analyze(content)
+        # The app that owns the clip is the one focused now; by the time
+        # a backlogged stage ran, the user may have switched windows
+        item = {'content': content, 'captured_at': time.time()}
+        app = self._app_detection.submit(self.app_detector.get_active_app)
+        try:
+            item['app_name'] = app.result(timeout=APP_DETECTION_WAIT)
+        except FutureTimeout:
+            # Still detecting; the dedupe stage waits for the answer
+            item['app_detection'] = app
+        else:
+            if self._is_excluded(item['app_name']):
+                return
+        
+        self.pipeline.submit(item)
+    
+    def _is_excluded(self, app_name: Optional[str]) -> bool:
+        """Reject the clip if it comes from an excluded app"""
+        if app_name in self.excluded_apps:
+            self._reject('excluded_app', f"Ignoring clipboard from excluded app: {app_name}")
+            return True
+        return False
+    
+    def _reject(self, reason: str, message: Optional[str] = None) -> None:
+        """Count a clip turned away before storage"""
+        self.rejected[reason] += 1
+        if message:
+            print(message)
+    
+    def _dedupe_stage(self, item: Dict) -> Optional[Dict]:
+        """Ingest stage: finish app detection, fingerprint the content and
+        drop a repeat of the newest clip"""
+        app = item.pop('app_detection', None)
+        if app is not None:
+            item['app_name'] = app.result()
+            if self._is_excluded(item['app_name']):
+                return None
+        
+        # The clipboard changed back to the clip stored last (e.g. after
+        # an ignored copy in between): it is still the newest entry, so
+        # there is nothing to analyze or store
+        item['content_fp'] = fingerprint(item['content'])
+        if self._last_saved is not None and item['content_fp'] == self._last_saved[0]:
+            newest = self.storage.get_history(limit=1, preview_only=True)
+            if newest and newest[0]['id'] == self._last_saved[1]:
+                self._reject('unchanged')
+                return None
+        return item
+    
+    def _analyze_stage(self, item: Dict) -> Optional[Dict]:
+        """Ingest stage: classify content and apply content filters"""
+        content = item['content']
+        
+        # Analyze content; a repeat copy is answered from the cache
+        analysis = self.analyzer.analyze(content, content_fp=item['content_fp'])
         
         # Skip sensitive content if configured
         if analysis['is_sensitive']:
-            print("Skipping sensitive content")
-            return
+            self._reject('sensitive', "Skipping sensitive content")
+            return None
         
-        # Check content size limit
-        max_size = self.config.get('max_content_size', 1048576)
-        if len(content) > max_size:
-            print(f"Content too large ({len(content)} bytes), skipping")
-            return
+        item['analysis'] = analysis
+        return item
+    
+    def _store_stage(self, item: Dict) -> None:
+        """Ingest stage: save the clip, notify listeners and apply retention"""
+        analysis = item['analysis']
         
         # Save to storage
         clip_id = self.storage.save_clip(
-            content=content,
+            content=item['content'],
             content_type=analysis['content_type'],
-            app_name=app_name,
-            metadata=analysis['metadata']
+            app_name=item['app_name'],
+            metadata=analysis['metadata'],
+            content_fp=item['content_fp']
         )
         
         if clip_id:
+            self._last_saved = (item['content_fp'], clip_id)
             print(f"Saved clipboard entry {clip_id} ({analysis['content_type']})")
+            if self.delta_callbacks:
+                row = self.storage.get_saved_entry(clip_id)
+                if row:
+                    kind = 'added' if row.pop('use_count') == 0 else 'bumped'
+                    self._post_delta(ClipDelta(kind, clip_id, row))
             # Trigger UI refresh callbacks
             self._trigger_refresh_callbacks()
         
-        # Cleanup old entries
+        # Evict old entries once the history overflows
         max_history = self.config.get('max_history', 1000)
-        self.storage.cleanup_old_entries(max_history)
+        for evicted_id in self.storage.enforce_retention(max_history):
+            self._post_delta(ClipDelta('evicted', evicted_id, None))
+        
+        # Group commit: a burst shares one transaction, but readers see
+        # the clips as soon as the burst is over
+        if self.pipeline.stages[-1].depth == 0:
+            self.storage.flush()
+        return None
     
     def paste_clip(self, clip_id: int):
         """Paste a clip from history
@@ -214,8 +676,7 @@ class ClipboardManager:
         Args:
             clip_id: Clipboard entry ID
         """
-        clips = self.storage.get_history(limit=1000)
-        clip = next((c for c in clips if c['id'] == clip_id), None)
+        clip = self.storage.get_clip(clip_id)
         
         if clip:
             self.monitor.set_clipboard(clip['content'])
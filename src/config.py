@@ -13,6 +13,32 @@ class Config:
     DEFAULT_CONFIG = {
         "max_history": 1000,
         "monitor_interval": 0.5,  # seconds
+        "monitor_mode": "auto",  # auto, event (X11 XFixes) or poll
+        "clipboard_backend": "auto",  # auto, xlib or pyperclip
+        "polling": {
+            "adaptive": True,
+            "min_interval": 0.1,  # seconds, right after a change
+            "max_interval": 5.0,  # seconds, ceiling while idle
+            "backoff": 1.5
+        },
+        "storage": {
+            "write_behind": True,
+            "flush_interval": 1.0,  # seconds
+            "flush_batch_size": 50,
+            "blob_threshold": 65536,  # characters
+            "trigram_index": False,
+            "fuzzy_index_size": 50000  # recent previews, 0 disables
+        },
+        "analysis": {
+            "cache_size": 4096,  # analyses of recent clips, 0 disables
+            # Added to the built-in keywords that mark a clip sensitive
+            "sensitive_keywords": []
+        },
+        "ingest": {
+            "max_queue": 64,
+            # coalesce, drop_oldest, drop_newest or block
+            "overflow_policy": "coalesce"
+        },
         "hotkey": "<ctrl>+<alt>+v",
         "database_path": "clipboard.db",
         "max_content_size": 1048576,  # 1MB
@@ -28,7 +54,9 @@ class Config:
             "max_preview_length": 100,
             "window_width": 600,
             "window_height": 400,
-            "theme": "light"
+            "theme": "light",
+            "search_debounce_ms": 150,
+            "fuzzy_search": False
         }
     }
     
@@ -1,55 +1,96 @@
 """
 Content analyzer for categorizing clipboard content
 """
+import hashlib
 import re
-from typing import Optional, Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from urllib.parse import urlparse
 
+from .classifier import ContentClassifier
+
+
+# Number of analyses kept by the analyze() cache
+ANALYSIS_CACHE_ENTRIES = 4096
+
+# Clips up to this many characters are always analyzed in full
+EXACT_ANALYSIS_CHARS = 65536
+
+# The type of larger clips is guessed from windows of this many
+# characters, for at most ANALYSIS_TIME_BUDGET seconds
+SAMPLE_WINDOW_CHARS = 4096
+ANALYSIS_TIME_BUDGET = 0.02
+
+# Within the same budget, larger clips are checked for sensitive content
+# this many characters at a time; chunks end on a line break and overlap
+# by at least the length of a card number (16 digits, 3 separators)
+SENSITIVE_CHUNK_CHARS = 65536
+CREDIT_CARD_CHARS = 19
+
+# Content types in the order ContentClassifier.content_type checks them
+TYPE_PRECEDENCE = ('url', 'email', 'code', 'file_path', 'number', 'json', 'markdown', 'text')
+
 
 class ContentAnalyzer:
     """Analyzes and categorizes clipboard content"""
     
-    # Regex patterns for content detection
+    # Bumped whenever analyze() can give a different result for the same
+    # content, so analyses stored by an older version are not reused
+    VERSION = 2
+    
+    # Finds the URL whose domain and scheme go in the metadata
     URL_PATTERN = re.compile(
         r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
     )
     
-    EMAIL_PATTERN = re.compile(
-        r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    )
-    
-    # Common code patterns
-    CODE_PATTERNS = [
-        re.compile(r'(def|class|function|var|let|const|import|from)\s+\w+'),
-        re.compile(r'[{}\[\]();].*[{}\[\]();]'),  # Multiple brackets/braces
-        re.compile(r'(if|for|while|switch|try|catch)\s*\('),
-        re.compile(r'=>|->|\|\||&&'),  # Arrow functions, logical operators
-    ]
-    
-    # File path patterns
-    FILE_PATH_PATTERN = re.compile(
-        r'(?:[a-zA-Z]:\\|/)?(?:[\w\-]+[/\\])+[\w\-\.]+\.\w+'
-    )
-    
-    # Credit card pattern (basic)
-    CREDIT_CARD_PATTERN = re.compile(
-        r'\b\d{4}[\s\-]?\d{4}[\s\-]?\d{4}[\s\-]?\d{4}\b'
-    )
-    
-    # Password-like patterns
-    PASSWORD_PATTERN = re.compile(
-        r'(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[@$!%*?&])[A-Za-z\d@$!%*?&]{8,}'
-    )
-    
-    def __init__(self):
-        """Initialize content analyzer"""
-        pass
+    def __init__(self, cache_size: int = ANALYSIS_CACHE_ENTRIES,
+                 exact_limit: int = EXACT_ANALYSIS_CHARS,
+                 time_budget: float = ANALYSIS_TIME_BUDGET,
+                 sensitive_keywords: Iterable[str] = ()):
+        """Initialize content analyzer
+        
+        Args:
+            cache_size: Number of analyses kept for repeat copies; 0
+                disables the cache
+            exact_limit: The type and metadata of clips longer than this
+                many characters are guessed from samples, and their
+                metadata is marked approximate
+            time_budget: Seconds a sampled analysis may spend checking
+                the whole clip for sensitive content, then on windows
+                after the first and last one. A clip not checked in
+                time counts as sensitive.
+            sensitive_keywords: Keywords that mark content as sensitive,
+                in addition to the built-in ones
+        """
+        self.classifier = ContentClassifier(sensitive_keywords)
+        
+        # Identifies the rules analyses were made with: VERSION, plus the
+        # extra keywords, since adding one can make a stored clip sensitive
+        extra = sorted({keyword.lower() for keyword in sensitive_keywords if keyword})
+        self.rules_version = str(self.VERSION)
+        if extra:
+            digest = hashlib.sha1('\n'.join(extra).encode('utf-8')).hexdigest()
+            self.rules_version += f"-{digest[:8]}"
+        self.exact_limit = exact_limit
+        self.time_budget = time_budget
+        
+        # LRU of content fingerprint -> (content type, sensitive, metadata)
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[int, Tuple[str, bool, Dict]]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
     
-    def analyze(self, content: str) -> Dict[str, Any]:
+    def analyze(self, content: str, content_fp: Optional[int] = None) -> Dict[str, Any]:
         """Analyze content and return categorization
         
         Args:
             content: Content to analyze
+            content_fp: Fingerprint of content (storage.fingerprint). If
+                given, a repeat of recently analyzed content is answered
+                from the cache.
             
         Returns:
             Dict with content_type, is_sensitive, and metadata
@@ -61,85 +102,181 @@ class ContentAnalyzer:
                 'metadata': {}
             }
         
-        # Check for sensitive content first
-        is_sensitive = self._is_sensitive(content)
+        if content_fp is not None and self.cache_size > 0:
+            with self._cache_lock:
+                cached = self._cache.get(content_fp)
+                if cached is not None:
+                    self._cache.move_to_end(content_fp)
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+            if cached is not None:
+                return self._analysis(*cached)
+        
+        if len(content) > self.exact_limit:
+            content_type, is_sensitive, metadata = self._analyze_sampled(content)
+        else:
+            content_type, is_sensitive = self.classifier.classify(content)
+            
+            # Extract metadata
+            metadata = self._extract_metadata(content, content_type)
         
-        # Determine content type
-        content_type = self._determine_type(content)
+        if content_fp is not None and self.cache_size > 0:
+            self._cache_analysis(content_fp, (content_type, is_sensitive, metadata))
+        return self._analysis(content_type, is_sensitive, metadata)
+    
+    def warm_cache(self, analyses: Iterable[Tuple[int, str, Dict]]):
+        """Seed the cache with analyses stored earlier under rules_version
         
-        # Extract metadata
-        metadata = self._extract_metadata(content, content_type)
+        Only clips that were not sensitive are stored, so these are
+        cached as not sensitive.
         
+        Args:
+            analyses: (content fingerprint, content type, metadata),
+                most recent first
+        """
+        analyses = list(analyses)[:self.cache_size]
+        # Oldest first, so the most recent end up least likely to be evicted
+        for content_fp, content_type, metadata in reversed(analyses):
+            self._cache_analysis(content_fp, (content_type, False, metadata))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get analysis cache statistics"""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'size': len(self._cache),
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': self.cache_hits / lookups if lookups else 0.0
+        }
+    
+    def _cache_analysis(self, content_fp: int, analysis: Tuple[str, bool, Dict]):
+        """Add an analysis to the cache, evicting the least recently used"""
+        with self._cache_lock:
+            self._cache[content_fp] = analysis
+            self._cache.move_to_end(content_fp)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    @staticmethod
+    def _analysis(content_type: str, is_sensitive: bool, metadata: Dict) -> Dict[str, Any]:
+        """Result dict for analyze(), with a metadata copy callers may change"""
         return {
             'content_type': content_type,
             'is_sensitive': is_sensitive,
-            'metadata': metadata
+            'metadata': dict(metadata)
         }
     
-    def _determine_type(self, content: str) -> str:
-        """Determine the type of content
+    def _analyze_sampled(self, content: str) -> Tuple[str, bool, Dict[str, Any]]:
+        """Analyze a large clip, typing it from windows of its text
+        
+        The first and last window are always typed. The whole clip is
+        then checked for sensitive content, so a secret cannot slip
+        through between windows; if that takes longer than the time
+        budget, the clip counts as sensitive. Windows from the middle
+        are typed with whatever budget is left, coarse to fine. A type
+        found in any window counts for the clip, except that it is only
+        a number if every window is. The JSON shape and the line count
+        are checked on the whole clip.
         
-        Args:
-            content: Content to analyze
-            
         Returns:
-            Content type string
+            Tuple of (content type, is_sensitive, metadata), with
+            metadata['approximate'] set
         """
-        content_lower = content.lower()
-        
-        # Check for URLs
-        if self.URL_PATTERN.search(content):
-            return 'url'
-        
-        # Check for emails
-        if self.EMAIL_PATTERN.search(content):
-            return 'email'
-        
-        # Check for code
-        if self._is_code(content):
-            return 'code'
-        
-        # Check for file paths
-        if self.FILE_PATH_PATTERN.search(content):
-            return 'file_path'
-        
-        # Check for numbers (could be phone, ID, etc.)
-        if content.strip().replace('-', '').replace(' ', '').isdigit():
-            return 'number'
-        
-        # Check for JSON
+        deadline = time.perf_counter() + self.time_budget
+        windows: List[str] = []
+        types = set()
+        is_sensitive = True
+        for window in self._sample_windows(content, SAMPLE_WINDOW_CHARS):
+            windows.append(window)
+            types.add(self.classifier.content_type(window))
+            if len(windows) == 2:
+                is_sensitive = self._is_sensitive_within(content, deadline)
+            if len(windows) >= 2 and time.perf_counter() >= deadline:
+                break
+        
+        # The shape checks are about the clip as a whole
+        types.discard('json')
+        if len(types) > 1:
+            types.discard('number')
         if self._is_json_like(content):
-            return 'json'
-        
-        # Check for markdown/formatted text
-        if self._is_markdown(content):
-            return 'markdown'
-        
-        # Default to plain text
-        return 'text'
+            types.add('json')
+        content_type = min(types, key=TYPE_PRECEDENCE.index)
+        
+        sample = '\n'.join(windows)
+        metadata = self._extract_metadata(sample, content_type)
+        metadata['length'] = len(content)
+        metadata['lines'] = content.count('\n') + 1
+        # Joining the windows adds len(windows) - 1 characters
+        sampled = len(sample) - len(windows) + 1
+        metadata['words'] = round(metadata['words'] * len(content) / sampled)
+        metadata['approximate'] = True
+        return content_type, is_sensitive, metadata
     
-    def _is_code(self, content: str) -> bool:
-        """Check if content looks like code
+    def _is_sensitive_within(self, content: str, deadline: float) -> bool:
+        """Check content for sensitive patterns a chunk at a time
+        
+        Chunks end on a line break, unless the line is longer than
+        another chunk, and overlap by more than any card number or
+        keyword, so each of those lies whole within some chunk. A line
+        split over chunks counts as holding a password if it has a
+        symbol and each of the other characters one needs, in any order.
         
-        Args:
-            content: Content to check
-            
         Returns:
-            True if content appears to be code
+            True if a chunk is sensitive, or if the deadline passes
+            before the last chunk has been checked
         """
-        # Count how many code patterns match
-        matches = sum(1 for pattern in self.CODE_PATTERNS if pattern.search(content))
-        
-        # If multiple patterns match, likely code
-        if matches >= 2:
-            return True
-        
-        # Check for high density of special characters
-        special_chars = sum(1 for c in content if c in '{}[]();=<>+-*/%&|')
-        if len(content) > 0 and special_chars / len(content) > 0.1:
-            return True
+        classifier = self.classifier
+        overlap = max(CREDIT_CARD_CHARS, classifier.keywords.overlap) + 1
+        # Password parts found so far on a line split over chunks, if any
+        split_line: Optional[int] = None
+        start = 0
+        while True:
+            end = start + SENSITIVE_CHUNK_CHARS
+            if end < len(content):
+                line_end = content.find('\n', end, end + SENSITIVE_CHUNK_CHARS)
+                end = line_end + 1 if line_end >= 0 else end
+            chunk = content[start:end]
+            if classifier.is_sensitive(chunk):
+                return True
+            
+            if split_line is not None:
+                head, newline, _ = chunk.partition('\n')
+                split_line = classifier.password_traits(head, split_line)
+                if split_line == classifier.PASSWORD_TRAITS:
+                    return True
+                if newline:
+                    split_line = None
+            if end >= len(content):
+                return False
+            if content[end - 1] != '\n' and split_line is None:
+                split_line = classifier.password_traits(chunk[chunk.rfind('\n') + 1:])
+            
+            if time.perf_counter() >= deadline:
+                return True
+            start = end - overlap
+    
+    @staticmethod
+    def _sample_windows(content: str, size: int) -> Iterator[str]:
+        """Windows of content: the first, the last, then the middle ones
         
-        return False
+        The middle windows come in the order 1/2, 1/4, 3/4, 1/8, ... of
+        the way through the text, so stopping early still leaves them
+        spread over the whole clip.
+        """
+        yield content[:size]
+        yield content[-size:]
+        count = (len(content) - 2 * size) // size
+        seen = set()
+        denominator = 2
+        while len(seen) < count:
+            for numerator in range(1, denominator, 2):
+                index = numerator * count // denominator
+                if index not in seen:
+                    seen.add(index)
+                    start = size * (index + 1)
+                    yield content[start:start + size]
+            denominator *= 2
     
     def _is_json_like(self, content: str) -> bool:
         """Check if content looks like JSON
@@ -156,56 +293,6 @@ class ContentAnalyzer:
             (content.startswith('[') and content.endswith(']'))
         ) and '"' in content
     
-    def _is_markdown(self, content: str) -> bool:
-        """Check if content looks like Markdown
-        
-        Args:
-            content: Content to check
-            
-        Returns:
-            True if content appears to be Markdown
-        """
-        markdown_indicators = [
-            r'^#{1,6}\s',  # Headers
-            r'\*\*.*\*\*',  # Bold
-            r'\*.*\*',  # Italic
-            r'^\s*[-*+]\s',  # Lists
-            r'^\s*\d+\.\s',  # Numbered lists
-            r'\[.*\]\(.*\)',  # Links
-        ]
-        
-        return any(re.search(pattern, content, re.MULTILINE) 
-                  for pattern in markdown_indicators)
-    
-    def _is_sensitive(self, content: str) -> bool:
-        """Check if content might be sensitive
-        
-        Args:
-            content: Content to check
-            
-        Returns:
-            True if content appears sensitive
-        """
-        # Check for credit card numbers
-        if self.CREDIT_CARD_PATTERN.search(content):
-            return True
-        
-        # Check for password-like strings
-        if self.PASSWORD_PATTERN.search(content):
-            return True
-        
-        # Check for common sensitive keywords
-        sensitive_keywords = [
-            'password', 'passwd', 'pwd', 'secret', 'token', 'api_key',
-            'apikey', 'private_key', 'privatekey', 'ssn', 'social security'
-        ]
-        
-        content_lower = content.lower()
-        if any(keyword in content_lower for keyword in sensitive_keywords):
-            return True
-        
-        return False
-    
     def _extract_metadata(self, content: str, content_type: str) -> Dict[str, Any]:
         """Extract metadata based on content type
         
@@ -223,50 +310,24 @@ class ContentAnalyzer:
         }
         
         if content_type == 'url':
-            urls = self.URL_PATTERN.findall(content)
-            if urls:
-                parsed = urlparse(urls[0])
+            url = self.URL_PATTERN.search(content)
+            if url:
+                parsed = urlparse(url.group())
                 metadata['domain'] = parsed.netloc
                 metadata['scheme'] = parsed.scheme
         
         elif content_type == 'email':
-            emails = self.EMAIL_PATTERN.findall(content)
-            if emails:
-                metadata['email'] = emails[0]
-                metadata['domain'] = emails[0].split('@')[1]
+            email = self.classifier.find_email(content)
+            if email:
+                metadata['email'] = email
+                metadata['domain'] = email.split('@')[1]
         
         elif content_type == 'code':
             # Try to detect programming language
-            metadata['language'] = self._detect_language(content)
+            metadata['language'] = self.classifier.detect_language(content)
         
         return metadata
     
-    def _detect_language(self, content: str) -> Optional[str]:
-        """Detect programming language from code
-        
-        Args:
-            content: Code content
-            
-        Returns:
-            Language name or None
-        """
-        language_patterns = {
-            'python': [r'\bdef\s+\w+\s*\(', r'\bimport\s+\w+', r'\bclass\s+\w+:'],
-            'javascript': [r'\bfunction\s+\w+\s*\(', r'\bconst\s+\w+\s*=', r'=>'],
-            'java': [r'\bpublic\s+class\s+\w+', r'\bprivate\s+\w+\s+\w+'],
-            'cpp': [r'#include\s*<', r'\bstd::', r'\bnamespace\s+\w+'],
-            'go': [r'\bfunc\s+\w+\s*\(', r'\bpackage\s+\w+'],
-            'rust': [r'\bfn\s+\w+\s*\(', r'\blet\s+mut\s+\w+'],
-            'ruby': [r'\bdef\s+\w+', r'\bend\b', r'@\w+'],
-            'php': [r'<\?php', r'\$\w+\s*='],
-        }
-        
-        for language, patterns in language_patterns.items():
-            if any(re.search(pattern, content) for pattern in patterns):
-                return language
-        
-        return None
-    
     def get_preview(self, content: str, max_length: int = 100) -> str:
         """Get a preview of content
         
@@ -0,0 +1,386 @@
+"""
+In-memory fuzzy matcher over recent clip previews
+"""
+import heapq
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Score per matched character, and per skipped character inside a match
+SCORE_MATCH = 16
+PENALTY_GAP = 3
+
+# Bonus when a term match starts at the beginning of a word
+BONUS_BOUNDARY = 8
+
+# Characters after which a new word starts
+BOUNDARY_CHARS = frozenset(' \t/\\_-.,:;@#=?&()[]{}<>"\'')
+
+# Scoring one entry in Python costs about as much as one mask operation
+# over this many bits; decides when bit-parallel pruning pays off
+SCORE_COST_BITS = 200000
+
+# Byte translation marking the non-zero bytes of a hit mask
+_NONZERO = bytes([0] + [1] * 255)
+
+
+class _Segment:
+    """Block of entries matched together with bit-parallel masks
+
+    The entries are joined into one newline-terminated haystack. For a
+    character, bit i of its mask is set when haystack position i holds
+    that character; masks are built on first use and dropped whenever
+    the segment changes.
+    """
+
+    __slots__ = ('ids', 'texts', 'reversed_texts', 'haystack', 'line_ends',
+                 'masks', 'newlines', 'lines')
+
+    def __init__(self):
+        self.ids: List[int] = []
+        self.texts: List[str] = []
+        self.reversed_texts: List[str] = []
+        self.haystack: Optional[bytes] = None
+        self.line_ends: Dict[int, int] = {}
+        self.masks: Dict[int, int] = {}
+        self.newlines = 0
+        self.lines = 0
+
+    def build(self):
+        """Join the texts and reset the character masks"""
+        text = '\n'.join(self.texts) + '\n'
+        # One byte per character, position 0 last so int(..., 2) puts it
+        # in bit 0. Characters outside Latin-1 share '?'; the scoring pass
+        # weeds out what that lets through.
+        self.haystack = text.encode('latin-1', 'replace')[::-1]
+        self.reversed_texts = [entry[::-1] for entry in self.texts]
+        # Position of the newline ending each entry -> entry index
+        self.line_ends = {}
+        position = -1
+        for index, entry in enumerate(self.texts):
+            position += len(entry) + 1
+            self.line_ends[position] = index
+        self.masks = {}
+        self.newlines = self.mask(ord('\n'))
+        self.lines = ((1 << len(text)) - 1) ^ self.newlines
+
+    def mask(self, char: int) -> int:
+        """Bitmask of the haystack positions holding a character byte"""
+        mask = self.masks.get(char)
+        if mask is None:
+            table = bytearray(b'0' * 256)
+            table[char] = ord('1')
+            mask = self.masks[char] = int(self.haystack.translate(table), 2)
+        return mask
+
+
+class FuzzyIndex:
+    """fzf-style subsequence matching over the most recent clip previews
+
+    Each entry is a lowercased single-line preview. Entries live in
+    fixed-size segments in insertion order. Which entries of a segment
+    contain a term as a subsequence is decided for all of them at once
+    with big-integer bit operations, so a query costs a few hundred
+    integer operations plus Python work for the entries it scores.
+
+    A query is split on whitespace and every term must appear as a
+    subsequence, in any order. Terms score higher the more compact their
+    match is, and when they start at a word boundary; ties go to the
+    more recent entry. Segments are visited newest first, and once
+    `limit` results are known, only entries whose tightest match could
+    still beat the weakest of them are scored.
+    """
+
+    def __init__(self, max_entries: int = 50000, segment_size: int = 1024):
+        """Initialize fuzzy index
+
+        Args:
+            max_entries: Maximum number of entries; the oldest are dropped
+            segment_size: Entries per segment
+        """
+        self.max_entries = max_entries
+        self.segment_size = segment_size
+        self._segments: List[_Segment] = []
+        self._where: Dict[int, _Segment] = {}
+        self._seq: Dict[int, int] = {}
+        self._next_seq = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, clip_id: int) -> bool:
+        return clip_id in self._where
+
+    def load(self, entries: Iterable[Tuple[int, str]]):
+        """Replace the contents of the index
+
+        Args:
+            entries: (clip ID, preview) pairs, oldest first
+        """
+        with self._lock:
+            self._segments = []
+            self._where = {}
+            self._seq = {}
+            for clip_id, text in entries:
+                if clip_id in self._where:
+                    self._remove(clip_id)
+                self._add(clip_id, text)
+
+    def add(self, clip_id: int, text: str):
+        """Add an entry as the most recent, moving it if already present
+
+        Args:
+            clip_id: Clipboard entry ID
+            text: Preview of the clip
+        """
+        with self._lock:
+            if clip_id in self._where:
+                self._remove(clip_id)
+            self._add(clip_id, text)
+
+    def touch(self, clip_id: int):
+        """Make an existing entry the most recent"""
+        with self._lock:
+            segment = self._where.get(clip_id)
+            if segment is not None:
+                text = segment.texts[segment.ids.index(clip_id)]
+                self._remove(clip_id)
+                self._add(clip_id, text)
+
+    def remove(self, clip_ids: Iterable[int]):
+        """Remove entries that are present
+
+        Args:
+            clip_ids: Clipboard entry IDs
+        """
+        with self._lock:
+            for clip_id in clip_ids:
+                if clip_id in self._where:
+                    self._remove(clip_id)
+
+    def clear(self):
+        """Remove all entries"""
+        self.load([])
+
+    def search(self, query: str, limit: int = 50,
+               within_ids: Optional[Iterable[int]] = None) -> List[Tuple[int, int]]:
+        """Find the best fuzzy matches for a query
+
+        Args:
+            query: Whitespace-separated terms
+            limit: Maximum number of results
+            within_ids: Only consider these entries
+
+        Returns:
+            List of (clip ID, score), best first
+        """
+        terms = query.lower().split()
+        if not terms or limit <= 0:
+            return []
+
+        keys = [term.encode('latin-1', 'replace') for term in terms]
+        scorers = [(term, self._compile(term).search, self._compile(term[::-1]).match)
+                   for term in terms]
+        score = self._score
+        # Every term matched contiguously at a word start
+        best_score = sum(SCORE_MATCH * len(term) + BONUS_BOUNDARY for term in terms)
+        allowed = set(within_ids) if within_ids is not None else None
+
+        # Min-heap of the best (score, seq, clip ID) so far
+        top: List[Tuple[int, int, int]] = []
+        with self._lock:
+            for segment in reversed(self._segments):
+                if segment.haystack is None:
+                    segment.build()
+
+                hits = self._match(segment, keys, None)
+                if hits and len(top) >= limit:
+                    # Older entries lose ties, so they must score higher
+                    slack = best_score - top[0][0] - 1
+                    if slack < 0:
+                        break
+                    budget = slack // PENALTY_GAP
+                    operations = 4 * (budget + 1) * sum(len(key) - 1 for key in keys)
+                    if bin(hits).count('1') * SCORE_COST_BITS > operations * segment.lines.bit_length():
+                        hits &= self._match(segment, keys, budget)
+                ids = segment.ids
+                texts = segment.texts
+                reversed_texts = segment.reversed_texts
+                for index in self._hit_lines(segment, hits):
+                    clip_id = ids[index]
+                    if allowed is not None and clip_id not in allowed:
+                        continue
+
+                    text = texts[index]
+                    total = 0
+                    for term, search, reverse in scorers:
+                        term_score = score(text, reversed_texts[index], term, search, reverse)
+                        if term_score is None:
+                            break
+                        total += term_score
+                    else:
+                        item = (total, self._seq[clip_id], clip_id)
+                        if len(top) < limit:
+                            heapq.heappush(top, item)
+                        elif item > top[0]:
+                            heapq.heapreplace(top, item)
+
+        top.sort(reverse=True)
+        return [(clip_id, score) for score, _, clip_id in top]
+
+    def _add(self, clip_id: int, text: str):
+        """Append an entry (caller holds the lock)"""
+        text = text.lower().replace('\n', ' ')
+        if not self._segments or len(self._segments[-1].ids) >= self.segment_size:
+            self._segments.append(_Segment())
+
+        segment = self._segments[-1]
+        segment.ids.append(clip_id)
+        segment.texts.append(text)
+        segment.haystack = None
+        self._where[clip_id] = segment
+        self._seq[clip_id] = self._next_seq
+        self._next_seq += 1
+
+        while len(self._where) > self.max_entries:
+            oldest = self._segments[0]
+            self._remove(oldest.ids[0])
+
+    def _remove(self, clip_id: int):
+        """Remove a present entry (caller holds the lock)"""
+        segment = self._where.pop(clip_id)
+        del self._seq[clip_id]
+        index = segment.ids.index(clip_id)
+        del segment.ids[index]
+        del segment.texts[index]
+        segment.haystack = None
+        if not segment.ids:
+            self._segments.remove(segment)
+
+    @staticmethod
+    def _match(segment: _Segment, keys: List[bytes], budget: Optional[int]) -> int:
+        """Mask of the newlines ending entries that contain every term
+
+        Args:
+            segment: Built segment
+            keys: Encoded terms
+            budget: If set, a term must match with at most this many
+                skipped characters
+        """
+        lines = segment.lines
+        hits = segment.newlines
+        for key in keys:
+            if budget is None:
+                ends = FuzzyIndex._subsequence_ends(segment, key)
+            else:
+                ends = FuzzyIndex._bounded_ends(segment, key, budget)
+            if not ends:
+                return 0
+            # Carries run from every match end to the end of its line
+            hits &= (lines + ends) ^ lines ^ ends
+        return hits
+
+    @staticmethod
+    def _subsequence_ends(segment: _Segment, key: bytes) -> int:
+        """Positions where some subsequence match of a term ends
+
+        Adding a position mask to the mask of non-newline positions
+        carries through the rest of that line; the carried-into bits are
+        the positions after it on the same line.
+        """
+        lines = segment.lines
+        ends = segment.mask(key[0])
+        for char in key[1:]:
+            if not ends:
+                break
+            ends = ((lines + ends) ^ lines ^ ends) & segment.mask(char)
+        return ends
+
+    @staticmethod
+    def _bounded_ends(segment: _Segment, key: bytes, budget: int) -> int:
+        """Positions where a match of a term with at most `budget` gaps ends
+
+        levels[d] holds the ends of matches of the term so far with at
+        most d skipped characters.
+        """
+        lines = segment.lines
+        levels = [segment.mask(key[0])] * (budget + 1)
+        for char in key[1:]:
+            mask = segment.mask(char)
+            reach = 0
+            for depth, ends in enumerate(levels):
+                # Next position, from a match with d gaps or by skipping
+                # one more character from a reach with d - 1 gaps
+                reach = ((ends | reach) << 1) & lines
+                levels[depth] = reach & mask
+            if not levels[-1]:
+                return 0
+        return levels[-1]
+
+    @staticmethod
+    def _hit_lines(segment: _Segment, hits: int) -> List[int]:
+        """Entry indexes of the newline bits in hits, newest first"""
+        if not hits:
+            return []
+        data = hits.to_bytes((hits.bit_length() + 7) // 8, 'little')
+        flags = data.translate(_NONZERO)
+        line_ends = segment.line_ends
+        indexes = []
+        position = flags.rfind(1)
+        while position >= 0:
+            byte = data[position]
+            base = position * 8
+            while byte:
+                bit = byte.bit_length() - 1
+                byte ^= 1 << bit
+                indexes.append(line_ends[base + bit])
+            position = flags.rfind(1, 0, position)
+        return indexes
+
+    @staticmethod
+    def _compile(term: str):
+        """Pattern matching term as a subsequence, taking each next
+        character at its first occurrence so it never backtracks"""
+        parts = [re.escape(term[0])]
+        for char in term[1:]:
+            char = re.escape(char)
+            parts.append(f'[^{char}]*{char}')
+        return re.compile(''.join(parts))
+
+    @staticmethod
+    def _score(text: str, reversed_text: str, term: str, search, reverse) -> Optional[int]:
+        """Score the best match of one term in an entry
+
+        Like fzf's first algorithm: find where the first match ends, then
+        scan backwards from there for the shortest window. An exact
+        occurrence of the term is used when there is one.
+
+        Args:
+            text: Entry text
+            reversed_text: The same text reversed
+            term: Query term
+            search: search() of the term's pattern
+            reverse: match() of the reversed term's pattern
+
+        Returns:
+            Score, or None if the term does not match
+        """
+        length = len(term)
+        start = text.find(term)
+        if start >= 0:
+            end = start + length
+        else:
+            match = search(text)
+            if match is None:
+                return None
+            start, end = match.span()
+            if end - start > length:
+                # Match the reversed term backwards from the end
+                start = len(text) - reverse(reversed_text, len(text) - end).end()
+
+        score = SCORE_MATCH * length - PENALTY_GAP * (end - start - length)
+        if start == 0 or text[start - 1] in BOUNDARY_CHARS:
+            score += BONUS_BOUNDARY
+        return score
@@ -0,0 +1,248 @@
+"""
+Asynchronous ingest pipeline for clipboard changes
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Supported values for the 'ingest.overflow_policy' config option
+OVERFLOW_POLICIES = ('coalesce', 'drop_oldest', 'drop_newest', 'block')
+
+
+class PipelineStage:
+    """One worker thread with a bounded input queue
+
+    The stage function receives an item and returns the item to pass to the
+    next stage, or None to stop processing it.
+    """
+
+    def __init__(self, name: str, func: Callable[[Any], Any],
+                 max_queue: int = 64, policy: str = 'block'):
+        """Initialize pipeline stage
+
+        Args:
+            name: Stage name used in stats and error messages
+            func: Function applied to every item
+            max_queue: Maximum number of items waiting for this stage
+            policy: What put() does when the queue is full:
+                'coalesce' replaces the newest waiting item,
+                'drop_oldest' discards the oldest waiting item,
+                'drop_newest' rejects the incoming item,
+                'block' waits for room (backpressure on the caller)
+        """
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+
+        self.name = name
+        self.func = func
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.next_stage: Optional['PipelineStage'] = None
+        self.thread: Optional[threading.Thread] = None
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Counters
+        self.submitted = 0
+        self.processed = 0
+        self.errors = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.total_wait = 0.0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def start(self):
+        """Start the worker thread"""
+        self._closed = False
+        self.thread = threading.Thread(
+            target=self._run, name=f"ingest-{self.name}", daemon=True
+        )
+        self.thread.start()
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop accepting items and wait for the queue to drain
+
+        Args:
+            timeout: Maximum time to wait for the worker in seconds
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def put(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """Queue an item for this stage
+
+        Args:
+            item: Item to process
+            timeout: For the 'block' policy, maximum time to wait for room.
+                If None, waits indefinitely.
+
+        Returns:
+            True if the item was queued or coalesced, False if dropped
+        """
+        with self._cond:
+            self.submitted += 1
+
+            if self._closed:
+                self.dropped += 1
+                return False
+
+            if len(self._queue) >= self.max_queue:
+                if self.policy == 'coalesce':
+                    self._queue[-1] = (item, time.monotonic())
+                    self.coalesced += 1
+                    return True
+
+                if self.policy == 'drop_oldest':
+                    self._queue.popleft()
+                    self.dropped += 1
+                elif self.policy == 'drop_newest':
+                    self.dropped += 1
+                    return False
+                elif not self._wait_for_room(timeout):
+                    self.dropped += 1
+                    return False
+
+            self._queue.append((item, time.monotonic()))
+            self.max_depth = max(self.max_depth, len(self._queue))
+            self._cond.notify_all()
+            return True
+
+    @property
+    def depth(self) -> int:
+        """Number of items waiting for this stage"""
+        return len(self._queue)
+
+    def get_stats(self) -> Dict:
+        """Get stage statistics
+
+        Returns:
+            Dict with queue depth, item counters and latencies in ms
+        """
+        processed = self.processed or 1
+        return {
+            'queue_depth': self.depth,
+            'max_depth': self.max_depth,
+            'submitted': self.submitted,
+            'processed': self.processed,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'avg_wait_ms': self.total_wait / processed * 1000,
+            'avg_ms': self.total_time / processed * 1000,
+            'max_ms': self.max_time * 1000
+        }
+
+    def _wait_for_room(self, timeout: Optional[float]) -> bool:
+        """Wait until the queue has room (caller holds the lock)
+
+        Returns:
+            True if there is room, False on timeout or close
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self._queue) >= self.max_queue and not self._closed:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._cond.wait(remaining)
+        return not self._closed
+
+    def _run(self):
+        """Worker loop: process items until closed and drained"""
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                item, queued_at = self._queue.popleft()
+                self._cond.notify_all()
+
+            start = time.monotonic()
+            self.total_wait += start - queued_at
+
+            try:
+                result = self.func(item)
+            except Exception as e:
+                print(f"Error in ingest stage '{self.name}': {e}")
+                self.errors += 1
+                result = None
+
+            elapsed = time.monotonic() - start
+            self.processed += 1
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+
+            if result is not None and self.next_stage:
+                self.next_stage.put(result)
+
+
+class IngestPipeline:
+    """Chain of stages that processes clipboard changes off the monitor thread
+
+    submit() only queues the item, so capture never waits on analysis or
+    SQLite. Each stage runs on its own worker thread. The first
+    stage applies the configured overflow policy; later stages block when
+    full, which pushes backpressure back to the first queue.
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable[[Any], Any]]],
+                 max_queue: int = 64, policy: str = 'coalesce',
+                 block_timeout: float = 1.0):
+        """Initialize ingest pipeline
+
+        Args:
+            stages: List of (name, function) pairs, in processing order
+            max_queue: Maximum number of items waiting at each stage
+            policy: Overflow policy for the first stage (see PipelineStage)
+            block_timeout: Maximum time submit() waits with the 'block' policy
+        """
+        self.block_timeout = block_timeout
+        self.stages = [
+            PipelineStage(name, func, max_queue, policy if i == 0 else 'block')
+            for i, (name, func) in enumerate(stages)
+        ]
+        for stage, next_stage in zip(self.stages, self.stages[1:]):
+            stage.next_stage = next_stage
+        self.running = False
+
+    def start(self):
+        """Start all stage workers"""
+        if self.running:
+            return
+        for stage in self.stages:
+            stage.start()
+        self.running = True
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the pipeline, processing items that are already queued
+
+        Args:
+            timeout: Maximum time to wait for each stage in seconds
+        """
+        if not self.running:
+            return
+        # Close in order so no stage receives items after it has stopped
+        for stage in self.stages:
+            stage.close(timeout)
+        self.running = False
+
+    def submit(self, item: Any) -> bool:
+        """Queue an item at the first stage
+
+        Returns:
+            True if the item was accepted, False if it was dropped
+        """
+        return self.stages[0].put(item, timeout=self.block_timeout)
+
+    def get_stats(self) -> Dict:
+        """Get per-stage statistics"""
+        return {stage.name: stage.get_stats() for stage in self.stages}
@@ -0,0 +1,137 @@
+"""
+Batch re-classification of stored clips with the current analyzer rules
+"""
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from .content_analyzer import ContentAnalyzer
+
+
+# Clips read, analyzed and written back as one unit
+REANALYZE_CHUNK_CLIPS = 256
+
+# Chunks queued per worker process, so reading from the database
+# overlaps with analysis without holding the whole history in memory
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+# Analyzer of a worker process, created by _init_worker
+_worker_analyzer: Optional[ContentAnalyzer] = None
+
+
+def _init_worker(sensitive_keywords: Tuple[str, ...]):
+    """Create the analyzer of a worker process"""
+    global _worker_analyzer
+    _worker_analyzer = ContentAnalyzer(cache_size=0, sensitive_keywords=sensitive_keywords)
+
+
+def _analyze_chunk(clips: List[Tuple[int, str]]) -> List[Tuple[int, str, Optional[str], bool]]:
+    """Analyze a chunk of clips in a worker process
+
+    Args:
+        clips: (clip ID, full content)
+
+    Returns:
+        List of (clip ID, content type, metadata JSON, is sensitive)
+    """
+    results = []
+    for clip_id, content in clips:
+        analysis = _worker_analyzer.analyze(content)
+        metadata = analysis['metadata']
+        results.append((clip_id, analysis['content_type'],
+                        json.dumps(metadata) if metadata else None,
+                        analysis['is_sensitive']))
+    return results
+
+
+def reanalyze(storage, sensitive_keywords: Iterable[str] = (),
+              workers: Optional[int] = None,
+              chunk_size: int = REANALYZE_CHUNK_CLIPS,
+              progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """Re-classify every stored clip with the current ContentAnalyzer rules
+
+    Clips are read in ID order, a chunk at a time, analyzed by a pool of
+    worker processes and written back one transaction per chunk, in
+    order; only clips whose analysis changed are updated. Each
+    transaction also records the last clip done, so after an
+    interruption a new call with the same rules resumes there; with
+    different rules it starts over.
+
+    Sensitive clips are not removed, only counted: they were stored by
+    rules that let them in, and deleting history is left to the user.
+
+    Args:
+        storage: ClipboardStorage instance
+        sensitive_keywords: analysis.sensitive_keywords from the config
+        workers: Number of worker processes; defaults to the CPU count.
+            With 1, clips are analyzed in this process.
+        chunk_size: Clips per chunk
+        progress: Called with (clips done, clips to do) after every chunk
+
+    Returns:
+        Dict with the number of clips analyzed, changed (new content
+        type), sensitive, the ID resumed after, and the seconds taken
+    """
+    sensitive_keywords = tuple(sensitive_keywords)
+    version = ContentAnalyzer(cache_size=0, sensitive_keywords=sensitive_keywords).rules_version
+    resumed_after, total = storage.reanalysis_progress(version)
+    workers = workers or os.cpu_count() or 1
+
+    stats = {'analyzed': 0, 'changed': 0, 'sensitive': 0,
+             'resumed_after': resumed_after, 'seconds': 0.0}
+    start = time.perf_counter()
+    # Stored (content type, metadata JSON) by clip ID, for chunks in flight
+    stored: Dict[int, Tuple[str, Optional[str]]] = {}
+
+    def chunks():
+        after = resumed_after
+        while True:
+            rows = storage.get_contents_after(after, chunk_size)
+            if not rows:
+                return
+            after = rows[-1][0]
+            for clip_id, _, content_type, metadata in rows:
+                stored[clip_id] = (content_type, metadata)
+            yield [(clip_id, content) for clip_id, content, _, _ in rows]
+
+    def store(results):
+        # Only rows whose analysis changed are written
+        changed = []
+        for clip_id, content_type, metadata, is_sensitive in results:
+            old_type, old_metadata = stored.pop(clip_id)
+            if (content_type, metadata) != (old_type, old_metadata):
+                changed.append((clip_id, content_type, metadata))
+            stats['changed'] += content_type != old_type
+            stats['sensitive'] += is_sensitive
+        storage.update_analyses(changed, version, results[-1][0])
+        stats['analyzed'] += len(results)
+        if progress:
+            progress(stats['analyzed'], total)
+
+    if workers == 1:
+        _init_worker(sensitive_keywords)
+        for chunk in chunks():
+            store(_analyze_chunk(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(sensitive_keywords,)) as pool:
+            pending: Deque[Future] = deque()
+            try:
+                for chunk in chunks():
+                    pending.append(pool.submit(_analyze_chunk, chunk))
+                    # Results are stored in submission (ID) order, so the
+                    # recorded progress never skips a chunk
+                    if len(pending) >= workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                        store(pending.popleft().result())
+                while pending:
+                    store(pending.popleft().result())
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    storage.finish_reanalysis(version)
+    stats['seconds'] = time.perf_counter() - start
+    return stats
@@ -0,0 +1,241 @@
+"""
+Search-as-you-type engine that keeps storage queries off the UI thread
+"""
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+from .storage import SearchCancelled
+
+
+class SearchResult(NamedTuple):
+    """Results of one query, as delivered to the UI"""
+    query: str
+    clips: List[Dict]
+    elapsed_ms: float
+    source: str  # 'cache', 'refined' or 'index'
+
+
+class _Entry(NamedTuple):
+    """Result set remembered for the cache and for prefix refinement"""
+    query: str
+    route: str
+    commit_count: int
+    clips: List[Dict]
+
+
+class SearchEngine:
+    """Debounced, cancellable background search for the UI
+
+    submit() is called for every keystroke and returns immediately. A
+    worker thread runs the query once typing pauses for `debounce`
+    seconds; a newer keystroke aborts a query that is still running.
+    Results are read from the UI thread with get_result(), typically from
+    a Tk after() loop, so the event loop never waits on SQLite.
+
+    A query that extends the previous one (more characters typed) is run
+    only against the previous results when those were complete, and
+    recent queries are answered from an LRU cache until the next commit.
+    In fuzzy mode queries go to storage.fuzzy_search() instead of the
+    full-text indexes.
+    """
+
+    def __init__(self, storage, limit: int = 50, debounce: float = 0.15,
+                 cache_size: int = 64, rank: str = 'relevance',
+                 fuzzy: bool = False):
+        """Initialize search engine
+
+        Args:
+            storage: ClipboardStorage instance
+            limit: Maximum number of results per query
+            debounce: Seconds without a keystroke before a query runs
+            cache_size: Number of recent queries to remember
+            rank: Result order passed to storage.search()
+            fuzzy: Match subsequences of recent previews
+        """
+        self.storage = storage
+        self.limit = limit
+        self.debounce = debounce
+        self.cache_size = cache_size
+        self.rank = rank
+        self.fuzzy = fuzzy
+
+        self._cond = threading.Condition()
+        self._pending: Optional[str] = None
+        self._due = 0.0
+        self._generation = 0
+        self._cache: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._last: Optional[_Entry] = None
+        self._results = queue.Queue()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+        # Counters
+        self.submitted = 0
+        self.executed = 0
+        self.cancelled = 0
+        self.cache_hits = 0
+        self.refined = 0
+
+    def start(self):
+        """Start the worker thread"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="search", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the worker thread, aborting a running query"""
+        with self._cond:
+            self.running = False
+            self._generation += 1
+            self._cond.notify_all()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+
+    def submit(self, query: str):
+        """Request results for the current search text
+
+        Cached results are delivered at once; anything else runs after the
+        debounce delay unless a newer query arrives first.
+
+        Args:
+            query: Search text as typed
+        """
+        query = query.strip()
+        with self._cond:
+            self.submitted += 1
+            self._generation += 1
+
+            entry = self._cache.get(query)
+            if entry is not None and entry.commit_count == self.storage.commit_count:
+                self._cache.move_to_end(query)
+                self.cache_hits += 1
+                self._last = entry
+                self._pending = None
+                self._results.put(SearchResult(query, entry.clips, 0.0, 'cache'))
+                return
+
+            self._pending = query
+            self._due = time.monotonic() + self.debounce
+            self._cond.notify_all()
+
+    def get_result(self) -> Optional[SearchResult]:
+        """Get the newest delivered result without blocking
+
+        Older results still queued are superseded and discarded.
+
+        Returns:
+            SearchResult, or None if nothing new has arrived
+        """
+        result = None
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                return result
+
+    def get_stats(self) -> Dict:
+        """Get engine statistics"""
+        return {
+            'submitted': self.submitted,
+            'executed': self.executed,
+            'cancelled': self.cancelled,
+            'cache_hits': self.cache_hits,
+            'refined': self.refined
+        }
+
+    def _run(self):
+        """Worker loop: wait for a debounced query and run it"""
+        while True:
+            with self._cond:
+                while self.running and (
+                        self._pending is None or time.monotonic() < self._due):
+                    timeout = None if self._pending is None else self._due - time.monotonic()
+                    self._cond.wait(timeout)
+                if not self.running:
+                    return
+                query = self._pending
+                self._pending = None
+                generation = self._generation
+                previous = self._last
+
+            try:
+                result, entry = self._execute(query, previous, generation)
+            except SearchCancelled:
+                self.cancelled += 1
+                continue
+            except Exception as e:
+                print(f"Search error: {e}")
+                continue
+
+            with self._cond:
+                if generation != self._generation:
+                    self.cancelled += 1
+                    continue
+                self._remember(entry)
+                self._results.put(result)
+
+    def _execute(self, query: str, previous: Optional[_Entry], generation: int):
+        """Run one query, refining the previous result set if possible
+
+        Returns:
+            Tuple of (SearchResult, cache entry)
+        """
+        start = time.perf_counter()
+        commit_count = self.storage.commit_count
+        route = 'fuzzy' if self.fuzzy else self.storage.search_route(query)
+
+        def should_cancel():
+            return generation != self._generation
+
+        def search(within_ids=None):
+            self.executed += 1
+            if self.fuzzy:
+                return self.storage.fuzzy_search(
+                    query, limit=self.limit, preview_only=True,
+                    within_ids=within_ids
+                )
+            return self.storage.search(
+                query, limit=self.limit, preview_only=True, rank=self.rank,
+                prefix=True, within_ids=within_ids, should_cancel=should_cancel
+            )
+
+        clips = None
+        source = 'index'
+        if self._can_refine(query, route, previous, commit_count):
+            # Typing more can only narrow the matches, and the previous
+            # query returned all of its matches
+            clips = search([clip['id'] for clip in previous.clips])
+            source = 'refined'
+            self.refined += 1
+        if not clips:
+            # Also covers a refinement that came back empty, which may
+            # still have matches through the trigram fallback
+            clips = search()
+            source = 'index'
+
+        elapsed = (time.perf_counter() - start) * 1000
+        entry = _Entry(query, route, commit_count, clips)
+        return SearchResult(query, clips, elapsed, source), entry
+
+    def _can_refine(self, query: str, route: str, previous: Optional[_Entry],
+                    commit_count: int) -> bool:
+        """Whether `query` can be answered from the previous result set"""
+        return (previous is not None and
+                0 < len(previous.clips) < self.limit and
+                previous.commit_count == commit_count and
+                previous.route == route and
+                query.startswith(previous.query) and
+                query != previous.query)
+
+    def _remember(self, entry: _Entry):
+        """Store a result set in the cache (caller holds the lock)"""
+        self._last = entry
+        self._cache[entry.query] = entry
+        self._cache.move_to_end(entry.query)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -4,25 +4,264 @@ Storage engine for clipboard history using SQLite
 import sqlite3
 import hashlib
 import json
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
 from pathlib import Path
 
+from .fuzzy import FuzzyIndex
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+# INSERT ... ON CONFLICT ... RETURNING needs SQLite 3.35+
+UPSERT_SUPPORTED = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Bumped whenever create_tables() or _migrate() change the schema
+SCHEMA_VERSION = 5
+
+# Clips longer than this many characters go to the blob store
+BLOB_THRESHOLD = 65536
+
+# Characters of a blob clip kept inline for previews and full-text search
+BLOB_PREFIX_LENGTH = 4096
+
+# Characters per content-addressed blob chunk
+BLOB_CHUNK_SIZE = 65536
+
+# Characters kept in the precomputed preview column
+PREVIEW_LENGTH = 256
+
+# The trigram tokenizer needs SQLite 3.34+
+TRIGRAM_SUPPORTED = sqlite3.sqlite_version_info >= (3, 34, 0)
+
+# Queries the word index cannot answer: punctuation other than FTS
+# syntax, camelCase humps, and letters mixed with digits (hash or id
+# fragments). These are matched as substrings by the trigram index.
+FRAGMENT_QUERY = re.compile(r'[^\w\s"*()]|[a-z][A-Z]|[A-Za-z]\d|\d[A-Za-z]')
+
+# Supported values for the rank argument of search()
+SEARCH_RANKS = ('relevance', 'recent')
+
+# Age in days at which recency halves a match's relevance score
+RECENCY_HALF_LIFE_DAYS = 7.0
+
+# Largest relevance boost from being pasted often, and the boost per use
+USAGE_BOOST_MAX = 2.0
+USAGE_BOOST_STEP = 0.1
+
+# SQLite VM steps between should_cancel() checks in search()
+SEARCH_CANCEL_CHECK_STEPS = 1000
+
+# Bounds of the get_clip() cache: entries, and characters of content held
+CLIP_CACHE_ENTRIES = 32
+CLIP_CACHE_CHARS = 4 * 1024 * 1024
+
+# Most recent clips held by the in-memory fuzzy index
+FUZZY_INDEX_ENTRIES = 50000
+
+# Columns returned by listing queries with preview_only=True
+LISTING_COLUMNS = "id, content_type, is_favorite, timestamp, preview, content_length"
+
+# Fingerprint algorithm; recorded in the database so a change is detected
+FINGERPRINT_SCHEME = 'xxh3_64' if xxhash is not None else 'sha1_64'
+
+
+def fingerprint(content: str) -> int:
+    """Compute the 64-bit fingerprint used to deduplicate clips
+    
+    Uses xxh3 when the optional xxhash package is installed and the first
+    8 bytes of SHA-1 otherwise. Neither needs to resist attacks, only to
+    spread typical clipboard content evenly.
+    
+    Args:
+        content: Clipboard content
+        
+    Returns:
+        Signed 64-bit integer, so it fits an SQLite INTEGER column
+    """
+    data = content.encode('utf-8')
+    if xxhash is not None:
+        value = xxhash.xxh3_64_intdigest(data)
+        return value - (1 << 64) if value >= (1 << 63) else value
+    return int.from_bytes(hashlib.sha1(data).digest()[:8], 'big', signed=True)
+
+
+def make_preview(content: str) -> str:
+    """Build the single-line preview stored alongside a clip
+    
+    Args:
+        content: Clipboard content
+        
+    Returns:
+        Up to PREVIEW_LENGTH characters with line breaks flattened
+    """
+    return content[:PREVIEW_LENGTH].replace('\n', ' ').replace('\r', '')
+
+
+class SearchCancelled(Exception):
+    """Raised by search() when its should_cancel callback aborts the query"""
+
+
+class ConnectionManager:
+    """Hands out SQLite connections: one shared writer and a reader per thread
+    
+    The database runs in WAL mode, so readers see the last committed state
+    and never wait on a transaction the writer has open. Writes must be
+    serialized by the caller. In-memory databases cannot be shared between
+    connections; there every thread uses the writer.
+    """
+    
+    def __init__(self, db_path: Path):
+        """Initialize connection manager
+        
+        Args:
+            db_path: Path to SQLite database file, or ':memory:'
+        """
+        self.db_path = db_path
+        self.shared_readers = str(db_path) != ':memory:'
+        
+        self.writer = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.writer.row_factory = sqlite3.Row
+        if self.shared_readers:
+            self.writer.execute("PRAGMA journal_mode=WAL")
+        
+        self._local = threading.local()
+        self._readers: Dict[int, Tuple[threading.Thread, sqlite3.Connection]] = {}
+        self._readers_lock = threading.Lock()
+    
+    def reader(self) -> sqlite3.Connection:
+        """Get the calling thread's read-only connection"""
+        if not self.shared_readers:
+            return self.writer
+        
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                # as_uri() escapes '?', '#' and '%' in the path
+                Path(self.db_path).resolve().as_uri() + "?mode=ro",
+                uri=True, check_same_thread=False
+            )
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            
+            with self._readers_lock:
+                self._close_dead_readers()
+                thread = threading.current_thread()
+                self._readers[thread.ident] = (thread, conn)
+        
+        return conn
+    
+    def close(self):
+        """Close the writer and every reader connection"""
+        with self._readers_lock:
+            for _, conn in self._readers.values():
+                conn.close()
+            self._readers.clear()
+        self.writer.close()
+    
+    def _close_dead_readers(self):
+        """Close readers whose thread has exited (caller holds the lock)"""
+        for ident, (thread, conn) in list(self._readers.items()):
+            if not thread.is_alive():
+                conn.close()
+                del self._readers[ident]
+
 
 class ClipboardStorage:
     """Manages clipboard history storage with SQLite"""
     
-    def __init__(self, db_path: str):
+    # Columns written by save_clip, in the order of its row tuples
+    _SAVE_COLUMNS = ("content_fp, content, content_type, app_name, metadata, "
+                     "is_blob, content_length, preview")
+    
+    def __init__(self, db_path: str, write_behind: bool = False,
+                 flush_interval: float = 1.0, flush_batch_size: int = 50,
+                 blob_threshold: int = BLOB_THRESHOLD,
+                 clip_cache_size: int = CLIP_CACHE_ENTRIES,
+                 trigram_index: bool = False,
+                 fuzzy_index_size: int = FUZZY_INDEX_ENTRIES):
         """Initialize storage
         
         Args:
             db_path: Path to SQLite database file
+            write_behind: Group saves into one transaction per flush window
+                instead of committing every save. Other threads only see
+                the saves once they are flushed.
+            flush_interval: Maximum seconds a save stays uncommitted in
+                write-behind mode
+            flush_batch_size: Maximum number of saves per transaction in
+                write-behind mode
+            blob_threshold: Clips longer than this many characters are
+                stored as compressed chunks, with only a prefix inline
+            clip_cache_size: Number of clips kept by the get_clip() cache
+            trigram_index: Keep a trigram index for substring search. If
+                False, an existing trigram index is dropped.
+            fuzzy_index_size: Number of recent clip previews held in
+                memory for fuzzy_search(); 0 disables it
         """
         self.db_path = Path(db_path)
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        if str(db_path) != ':memory:':
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Single writer connection; reads go through per-thread readers
+        self.connections = ConnectionManager(self.db_path)
+        self.conn = self.connections.writer
+        
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self.blob_threshold = blob_threshold
+        self.trigram_index = trigram_index and TRIGRAM_SUPPORTED
+        self.use_upsert = UPSERT_SUPPORTED
+        self._lock = threading.RLock()
+        self._pending_saves = 0
+        # Last clip timestamp handed out, see _clip_timestamp()
+        self._last_timestamp: Optional[datetime] = None
+        self._flush_timer: Optional[threading.Timer] = None
+        # Bumped on every commit, so readers can tell their results are stale
+        self.commit_count = 0
+        
+        # LRU cache of full clips for get_clip(); every invalidation bumps
+        # the generation so a concurrent miss cannot re-add a stale row
+        self.clip_cache_size = clip_cache_size
+        self._clip_cache: 'OrderedDict[int, Dict]' = OrderedDict()
+        self._cache_chars = 0
+        self._cache_generation = 0
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Clips changed by the open transaction (None entry: all of them)
+        self._stale_clips = set()
+        
+        # Previews for fuzzy_search(), loaded on first use and then kept
+        # in step by every write
+        self.fuzzy_index_size = fuzzy_index_size
+        self.fuzzy_index = FuzzyIndex(max(1, fuzzy_index_size))
+        self._fuzzy_loaded = False
+        
+        if write_behind:
+            # In WAL mode NORMAL only syncs at checkpoints and stays corruption-safe
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        
+        self.conn.create_function('content_fingerprint', 1, fingerprint)
+        self.conn.create_function('clip_preview', 1, make_preview)
+        # Some upgrade steps need the tables from create_tables()
+        post_migrations = self._migrate()
         self.create_tables()
+        for step in post_migrations:
+            step()
+        self._sync_trigram_index()
+        self._check_fingerprint_scheme()
+        
+        # Number of non-favorite entries, maintained by every write
+        self.live_count = self._count_live()
     
     def create_tables(self):
         """Create database tables if they don't exist"""
@@ -32,14 +271,17 @@ class ClipboardStorage:
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS clipboard_history (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                content_hash TEXT UNIQUE NOT NULL,
+                content_fp INTEGER UNIQUE NOT NULL,
                 content TEXT NOT NULL,
                 content_type TEXT,
                 app_name TEXT,
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                 is_favorite INTEGER DEFAULT 0,
                 use_count INTEGER DEFAULT 0,
-                metadata TEXT
+                metadata TEXT,
+                is_blob INTEGER DEFAULT 0,
+                content_length INTEGER,
+                preview TEXT
             )
         """)
         
@@ -49,14 +291,24 @@ class ClipboardStorage:
             ON clipboard_history(timestamp DESC)
         """)
         
+        # Pages of one content type, in the same order as idx_listing
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_content_hash 
-            ON clipboard_history(content_hash)
+            CREATE INDEX IF NOT EXISTS idx_type_listing 
+            ON clipboard_history(content_type, timestamp DESC, id DESC)
         """)
         
+        # Covers preview_only listings, so they never read the row itself;
+        # preview is the last column and sits behind any large content
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_content_type 
-            ON clipboard_history(content_type)
+            CREATE INDEX IF NOT EXISTS idx_listing 
+            ON clipboard_history(timestamp DESC, id DESC, content_type, 
+                                 is_favorite, preview, content_length)
+        """)
+        
+        # Eviction order for retention; favorites are never in it
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_retention 
+            ON clipboard_history(timestamp, id) WHERE is_favorite = 0
         """)
         
         # Full-text search virtual table
@@ -72,16 +324,316 @@ class ClipboardStorage:
             END
         """)
         
+        # External-content FTS tables must be told the old values to remove
         cursor.execute("""
             CREATE TRIGGER IF NOT EXISTS clipboard_ad AFTER DELETE ON clipboard_history BEGIN
-                DELETE FROM clipboard_fts WHERE rowid = old.id;
+                INSERT INTO clipboard_fts(clipboard_fts, rowid, content) 
+                VALUES ('delete', old.id, old.content);
+            END
+        """)
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS clipboard_au AFTER UPDATE OF content ON clipboard_history BEGIN
+                INSERT INTO clipboard_fts(clipboard_fts, rowid, content) 
+                VALUES ('delete', old.id, old.content);
+                INSERT INTO clipboard_fts(rowid, content) VALUES (new.id, new.content);
+            END
+        """)
+        
+        # Out-of-line storage for large clips: zlib-compressed chunks keyed
+        # by their SHA-1, shared by every clip that contains them
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS blob_chunks (
+                chunk_hash BLOB PRIMARY KEY,
+                data BLOB NOT NULL,
+                refcount INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS clip_chunks (
+                clip_id INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                chunk_hash BLOB NOT NULL,
+                PRIMARY KEY (clip_id, seq)
+            ) WITHOUT ROWID
+        """)
+        
+        # Chunk reference counting; unreferenced chunks are removed
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS clip_chunks_ai AFTER INSERT ON clip_chunks BEGIN
+                UPDATE blob_chunks SET refcount = refcount + 1 
+                WHERE chunk_hash = new.chunk_hash;
+            END
+        """)
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS clip_chunks_ad AFTER DELETE ON clip_chunks BEGIN
+                UPDATE blob_chunks SET refcount = refcount - 1 
+                WHERE chunk_hash = old.chunk_hash;
+                DELETE FROM blob_chunks 
+                WHERE chunk_hash = old.chunk_hash AND refcount <= 0;
+            END
+        """)
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS clipboard_blob_ad AFTER DELETE ON clipboard_history 
+            WHEN old.is_blob BEGIN
+                DELETE FROM clip_chunks WHERE clip_id = old.id;
             END
         """)
         
+        # Storage-level settings such as the fingerprint scheme
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS storage_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+    
+    def _migrate(self) -> List[Callable[[], None]]:
+        """Upgrade a database created by an older version
+        
+        Returns:
+            Upgrade steps to run once create_tables() has created any
+            missing tables
+        """
+        columns = self._table_columns('clipboard_history')
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        post_migrations = []
+        
+        if 'content_hash' in columns:
+            self._migrate_content_hash()
+        
+        if columns and 'is_blob' not in columns:
+            self.conn.execute(
+                "ALTER TABLE clipboard_history ADD COLUMN is_blob INTEGER DEFAULT 0"
+            )
+            self.conn.execute(
+                "ALTER TABLE clipboard_history ADD COLUMN content_length INTEGER"
+            )
+            self.conn.execute(
+                "UPDATE clipboard_history SET content_length = length(content)"
+            )
+            self.conn.commit()
+            post_migrations.append(self._migrate_large_clips)
+        
+        if columns and 'preview' not in columns:
+            self.conn.execute("ALTER TABLE clipboard_history ADD COLUMN preview TEXT")
+            self.conn.execute(
+                "UPDATE clipboard_history SET preview = clip_preview(content)"
+            )
+            self.conn.commit()
+        
+        if columns and version < 4:
+            # The old delete trigger left deleted clips' tokens in the index
+            self.conn.execute("DROP TRIGGER IF EXISTS clipboard_ad")
+            self.conn.commit()
+            post_migrations.append(self._rebuild_fts)
+        
+        if columns and version < 5:
+            # Superseded by idx_type_listing
+            self.conn.execute("DROP INDEX IF EXISTS idx_content_type")
+            self.conn.commit()
+        
+        return post_migrations
+    
+    def _table_columns(self, table: str) -> List[str]:
+        """Get column names of a table, or [] if it does not exist"""
+        cursor = self.conn.execute(f"PRAGMA table_info({table})")
+        return [row['name'] for row in cursor.fetchall()]
+    
+    def _migrate_content_hash(self):
+        """Replace MD5 hex content hashes with integer fingerprints
+        
+        SQLite cannot drop a UNIQUE column in place, so rows are copied
+        into a table keyed by content_fp, with ids preserved. This also
+        drops the redundant idx_content_hash index. Everything happens in
+        one transaction, so an interrupted migration leaves the old table
+        untouched.
+        """
+        print("Migrating clipboard history to integer fingerprints...")
+        cursor = self.conn.cursor()
+        
+        try:
+            cursor.execute("BEGIN")
+            cursor.execute("""
+                CREATE TABLE clipboard_history_new (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    content_fp INTEGER UNIQUE NOT NULL,
+                    content TEXT NOT NULL,
+                    content_type TEXT,
+                    app_name TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    is_favorite INTEGER DEFAULT 0,
+                    use_count INTEGER DEFAULT 0,
+                    metadata TEXT
+                )
+            """)
+            cursor.execute("""
+                INSERT OR IGNORE INTO clipboard_history_new 
+                (id, content_fp, content, content_type, app_name, 
+                 timestamp, is_favorite, use_count, metadata)
+                SELECT id, content_fingerprint(content), content, content_type, 
+                       app_name, timestamp, is_favorite, use_count, metadata
+                FROM clipboard_history
+                ORDER BY id
+            """)
+            # Also drops the old indexes and FTS triggers
+            cursor.execute("DROP TABLE clipboard_history")
+            cursor.execute(
+                "ALTER TABLE clipboard_history_new RENAME TO clipboard_history"
+            )
+            
+            # Rows keep their ids, but rebuild in case the old index drifted
+            if self._table_columns('clipboard_fts'):
+                cursor.execute(
+                    "INSERT INTO clipboard_fts(clipboard_fts) VALUES ('rebuild')"
+                )
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+    
+    def _migrate_large_clips(self):
+        """Move clips stored inline by older versions to the blob store"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT id FROM clipboard_history WHERE length(content) > ?",
+            (self.blob_threshold,)
+        )
+        ids = [row['id'] for row in cursor.fetchall()]
+        if not ids:
+            return
+        
+        print(f"Moving {len(ids)} large clips to the blob store...")
+        try:
+            for clip_id in ids:
+                cursor.execute(
+                    "SELECT content FROM clipboard_history WHERE id = ?", (clip_id,)
+                )
+                content = cursor.fetchone()['content']
+                prefix = content[:BLOB_PREFIX_LENGTH]
+                self._write_blob(clip_id, content)
+                # clipboard_au re-indexes the prefix
+                cursor.execute(
+                    "UPDATE clipboard_history SET content = ?, is_blob = 1 WHERE id = ?",
+                    (prefix, clip_id)
+                )
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+    
+    def _rebuild_fts(self):
+        """Rebuild the full-text indexes from the history table"""
+        for table in self._fts_tables():
+            self.conn.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+        self.conn.commit()
+    
+    def _fts_tables(self) -> List[str]:
+        """Names of the full-text indexes present in the database"""
+        tables = ['clipboard_fts']
+        if self._table_columns('clipboard_trigram'):
+            tables.append('clipboard_trigram')
+        return tables
+    
+    def _sync_trigram_index(self):
+        """Create or drop the trigram index to match trigram_index"""
+        exists = bool(self._table_columns('clipboard_trigram'))
+        cursor = self.conn.cursor()
+        
+        if not self.trigram_index:
+            if exists:
+                print("Dropping trigram search index...")
+                for trigger in ('clipboard_tri_ai', 'clipboard_tri_ad', 'clipboard_tri_au'):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+                cursor.execute("DROP TABLE clipboard_trigram")
+                self.conn.commit()
+            return
+        
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS clipboard_trigram 
+            USING fts5(content, content=clipboard_history, content_rowid=id, 
+                       tokenize='trigram')
+        """)
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS clipboard_tri_ai AFTER INSERT ON clipboard_history BEGIN
+                INSERT INTO clipboard_trigram(rowid, content) VALUES (new.id, new.content);
+            END
+        """)
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS clipboard_tri_ad AFTER DELETE ON clipboard_history BEGIN
+                INSERT INTO clipboard_trigram(clipboard_trigram, rowid, content) 
+                VALUES ('delete', old.id, old.content);
+            END
+        """)
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS clipboard_tri_au AFTER UPDATE OF content ON clipboard_history BEGIN
+                INSERT INTO clipboard_trigram(clipboard_trigram, rowid, content) 
+                VALUES ('delete', old.id, old.content);
+                INSERT INTO clipboard_trigram(rowid, content) VALUES (new.id, new.content);
+            END
+        """)
+        
+        has_rows = cursor.execute("SELECT 1 FROM clipboard_history LIMIT 1").fetchone()
+        if not exists and has_rows:
+            print("Building trigram search index...")
+            cursor.execute(
+                "INSERT INTO clipboard_trigram(clipboard_trigram) VALUES ('rebuild')"
+            )
+        self.conn.commit()
+    
+    def rebuild_search_index(self):
+        """Rebuild the full-text indexes from scratch
+        
+        Repairs indexes that drifted from the history table and compacts
+        them into a single segment.
+        """
+        with self._lock:
+            self._commit()
+            self._rebuild_fts()
+    
+    def _check_fingerprint_scheme(self):
+        """Recompute fingerprints if the database used a different scheme"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT value FROM storage_meta WHERE key = 'fingerprint'")
+        row = cursor.fetchone()
+        stored = row['value'] if row else None
+        
+        if stored == FINGERPRINT_SCHEME:
+            return
+        
+        if stored is not None:
+            print(f"Recomputing content fingerprints ({stored} -> {FINGERPRINT_SCHEME})...")
+            cursor.execute(
+                "UPDATE clipboard_history SET content_fp = content_fingerprint(content) "
+                "WHERE is_blob = 0"
+            )
+            # Blob clips only have a prefix inline
+            cursor.execute("SELECT id FROM clipboard_history WHERE is_blob = 1")
+            for clip_id in [row['id'] for row in cursor.fetchall()]:
+                content = ''.join(self._read_blob(self.conn, clip_id))
+                cursor.execute(
+                    "UPDATE clipboard_history SET content_fp = ? WHERE id = ?",
+                    (fingerprint(content), clip_id)
+                )
+        
+        cursor.execute(
+            "INSERT OR REPLACE INTO storage_meta (key, value) VALUES (?, ?)",
+            ('fingerprint', FINGERPRINT_SCHEME)
+        )
         self.conn.commit()
     
     def save_clip(self, content: str, content_type: str = None, 
-                  app_name: str = None, metadata: Dict = None) -> Optional[int]:
+                  app_name: str = None, metadata: Dict = None,
+                  content_fp: Optional[int] = None) -> Optional[int]:
         """Save clipboard content
         
         Args:
@@ -89,6 +641,7 @@ class ClipboardStorage:
             content_type: Type of content (url, email, code, text, image)
             app_name: Name of application where content was copied
             metadata: Additional metadata as dict
+            content_fp: fingerprint(content), if the caller already has it
             
         Returns:
             Row ID if saved, None if duplicate
@@ -96,103 +649,769 @@ class ClipboardStorage:
         if not content or len(content.strip()) == 0:
             return None
         
-        content_hash = self._hash_content(content)
+        if content_fp is None:
+            content_fp = fingerprint(content)
+        metadata_json = json.dumps(metadata) if metadata else None
+        
+        # Large clips keep only a prefix inline; the rest goes to the blob store
+        is_blob = len(content) > self.blob_threshold
+        inline = content[:BLOB_PREFIX_LENGTH] if is_blob else content
+        row = (content_fp, inline, content_type, app_name, metadata_json,
+               int(is_blob), len(content), make_preview(content))
+        
+        with self._lock:
+            try:
+                timestamp = self._clip_timestamp()
+                if self.use_upsert:
+                    clip_id, inserted = self._upsert_clip(row, timestamp)
+                else:
+                    clip_id, inserted = self._select_and_save_clip(row, timestamp)
+                
+                if inserted:
+                    self.live_count += 1
+                    if is_blob:
+                        self._write_blob(clip_id, content)
+                    if self._fuzzy_loaded:
+                        self.fuzzy_index.add(clip_id, row[-1])
+                else:
+                    # Use count and timestamp changed
+                    self._mark_stale([clip_id])
+                    if self._fuzzy_loaded:
+                        self.fuzzy_index.touch(clip_id)
+                
+                if self.write_behind:
+                    self._schedule_flush()
+                else:
+                    self._commit()
+                return clip_id
+                
+            except sqlite3.Error as e:
+                print(f"Database error: {e}")
+                return None
+    
+    def _clip_timestamp(self) -> str:
+        """Timestamp for a saved or bumped clip
+        
+        UTC like CURRENT_TIMESTAMP, but to the microsecond and strictly
+        increasing, so the history order is the order clips were copied
+        in even within one second. Called with the writer lock held.
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        if self._last_timestamp is not None and now <= self._last_timestamp:
+            now = self._last_timestamp + timedelta(microseconds=1)
+        self._last_timestamp = now
+        return now.strftime('%Y-%m-%d %H:%M:%S.%f')
+    
+    def _upsert_clip(self, row: Tuple, timestamp: str) -> Tuple[int, bool]:
+        """Insert a clip, or bump an existing one, in a single statement
+        
+        Args:
+            row: Values for the columns in _SAVE_COLUMNS
+            timestamp: New timestamp of the clip
+        
+        Returns:
+            Tuple of (row ID, whether a new row was inserted)
+        """
+        cursor = self.conn.execute(f"""
+            INSERT INTO clipboard_history ({self._SAVE_COLUMNS}, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(content_fp) DO UPDATE 
+            SET use_count = use_count + 1, 
+                timestamp = excluded.timestamp
+            RETURNING id, use_count
+        """, row + (timestamp,))
+        result = cursor.fetchone()
+        # Only a bumped row can have a non-zero use count
+        return result['id'], result['use_count'] == 0
+    
+    def _select_and_save_clip(self, row: Tuple, timestamp: str) -> Tuple[int, bool]:
+        """Insert or bump a clip on SQLite versions without RETURNING
+        
+        Args:
+            row: Values for the columns in _SAVE_COLUMNS
+            timestamp: New timestamp of the clip
+        
+        Returns:
+            Tuple of (row ID, whether a new row was inserted)
+        """
         cursor = self.conn.cursor()
         
-        try:
-            # Check if content already exists
+        # Check if content already exists
+        cursor.execute(
+            "SELECT id, use_count FROM clipboard_history WHERE content_fp = ?",
+            (row[0],)
+        )
+        existing = cursor.fetchone()
+        
+        if existing:
+            # Update use count and timestamp
+            cursor.execute("""
+                UPDATE clipboard_history 
+                SET use_count = use_count + 1, 
+                    timestamp = ? 
+                WHERE id = ?
+            """, (timestamp, existing['id']))
+            return existing['id'], False
+        
+        # Insert new entry
+        cursor.execute(f"""
+            INSERT INTO clipboard_history ({self._SAVE_COLUMNS}, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, row + (timestamp,))
+        return cursor.lastrowid, True
+    
+    def _write_blob(self, clip_id: int, content: str):
+        """Store the full content of a clip as content-addressed chunks
+        
+        Chunks already in the store, for example from an earlier version of
+        the same log, are referenced instead of compressed again.
+        Caller must hold the lock.
+        """
+        cursor = self.conn.cursor()
+        for seq, start in enumerate(range(0, len(content), BLOB_CHUNK_SIZE)):
+            data = content[start:start + BLOB_CHUNK_SIZE].encode('utf-8')
+            chunk_hash = hashlib.sha1(data).digest()
+            
             cursor.execute(
-                "SELECT id, use_count FROM clipboard_history WHERE content_hash = ?",
-                (content_hash,)
+                "SELECT 1 FROM blob_chunks WHERE chunk_hash = ?", (chunk_hash,)
             )
-            existing = cursor.fetchone()
-            
-            if existing:
-                # Update use count and timestamp
-                cursor.execute("""
-                    UPDATE clipboard_history 
-                    SET use_count = use_count + 1, 
-                        timestamp = CURRENT_TIMESTAMP 
-                    WHERE id = ?
-                """, (existing['id'],))
-                self.conn.commit()
-                return existing['id']
-            
-            # Insert new entry
-            metadata_json = json.dumps(metadata) if metadata else None
+            if cursor.fetchone() is None:
+                cursor.execute(
+                    "INSERT INTO blob_chunks (chunk_hash, data) VALUES (?, ?)",
+                    (chunk_hash, zlib.compress(data))
+                )
+            cursor.execute(
+                "INSERT INTO clip_chunks (clip_id, seq, chunk_hash) VALUES (?, ?, ?)",
+                (clip_id, seq, chunk_hash)
+            )
+    
+    @staticmethod
+    def _read_blob(conn: sqlite3.Connection, clip_id: int) -> Iterator[str]:
+        """Decompress the chunks of a blob clip one at a time, in order"""
+        cursor = conn.execute("""
+            SELECT b.data FROM clip_chunks c
+            JOIN blob_chunks b ON b.chunk_hash = c.chunk_hash
+            WHERE c.clip_id = ?
+            ORDER BY c.seq
+        """, (clip_id,))
+        for row in cursor:
+            yield zlib.decompress(row['data']).decode('utf-8')
+    
+    def _schedule_flush(self):
+        """Commit now if the batch is full, otherwise within flush_interval
+        
+        Caller must hold the lock.
+        """
+        self._pending_saves += 1
+        if self._pending_saves >= self.flush_batch_size:
+            self._commit()
+        elif self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+    
+    def _commit(self):
+        """Commit the open transaction, including pending write-behind saves
+        
+        Caller must hold the lock.
+        """
+        self.conn.commit()
+        self._pending_saves = 0
+        self.commit_count += 1
+        
+        # Readers see the changes only now, so only now can the cache drop them
+        if self._stale_clips:
+            stale = None if None in self._stale_clips else list(self._stale_clips)
+            self._stale_clips = set()
+            self._invalidate_cache(stale)
+        
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+    
+    def flush(self):
+        """Commit saves that are still pending in write-behind mode"""
+        with self._lock:
+            # A flush timer may fire once close() has run
+            if self.conn is None:
+                return
+            try:
+                self._commit()
+            except sqlite3.Error as e:
+                print(f"Database error: {e}")
+    
+    def load_analyses(self, version: str, limit: int) -> List[Tuple[int, str, Dict]]:
+        """Stored analyses of the most recent clips saved by an analyzer version
+        
+        The first call with a new version records it, together with the
+        first clip ID it can have saved; clips from earlier versions are
+        never returned.
+        
+        Args:
+            version: ContentAnalyzer.rules_version
+            limit: Maximum number of analyses
+        
+        Returns:
+            List of (content fingerprint, content type, metadata), most
+            recent first
+        """
+        with self._lock:
+            cursor = self.conn.cursor()
             cursor.execute("""
-                INSERT INTO clipboard_history 
-                (content_hash, content, content_type, app_name, metadata)
-                VALUES (?, ?, ?, ?, ?)
-            """, (content_hash, content, content_type, app_name, metadata_json))
+                SELECT key, value FROM storage_meta 
+                WHERE key IN ('analyzer_version', 'analyzer_since')
+            """)
+            meta = {row['key']: row['value'] for row in cursor.fetchall()}
+            if meta.get('analyzer_version') != str(version):
+                cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 AS since FROM clipboard_history")
+                since = cursor.fetchone()['since']
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO storage_meta (key, value) VALUES (?, ?)",
+                    [('analyzer_version', str(version)), ('analyzer_since', str(since))]
+                )
+                self._commit()
+                return []
             
-            self.conn.commit()
-            return cursor.lastrowid
+            cursor.execute("""
+                SELECT content_fp, content_type, metadata FROM clipboard_history 
+                WHERE id >= ? AND content_type IS NOT NULL 
+                ORDER BY timestamp DESC, id DESC 
+                LIMIT ?
+            """, (int(meta['analyzer_since']), limit))
+            return [
+                (row['content_fp'], row['content_type'],
+                 json.loads(row['metadata']) if row['metadata'] else {})
+                for row in cursor.fetchall()
+            ]
+    
+    def reanalysis_progress(self, version: str) -> Tuple[int, int]:
+        """Where a reanalysis under an analyzer version left off
+        
+        Args:
+            version: ContentAnalyzer.rules_version
+        
+        Returns:
+            Tuple of (ID of the last clip reanalyzed, or 0 to start over;
+            number of clips after it)
+        """
+        conn = self.connections.reader()
+        meta = {
+            row['key']: row['value'] for row in conn.execute("""
+                SELECT key, value FROM storage_meta
+                WHERE key IN ('reanalyze_version', 'reanalyze_after')
+            """)
+        }
+        after = int(meta['reanalyze_after']) if meta.get('reanalyze_version') == version else 0
+        remaining = conn.execute(
+            "SELECT COUNT(*) FROM clipboard_history WHERE id > ?", (after,)
+        ).fetchone()[0]
+        return after, remaining
+    
+    def get_contents_after(self, after_id: int,
+                           limit: int) -> List[Tuple[int, str, str, Optional[str]]]:
+        """Clips in ID order, starting after a given ID, with full content
+        
+        Pages by ID rather than offset, so each call starts at once
+        however far into the history it is.
+        
+        Args:
+            after_id: ID of the last clip of the previous page, or 0
+            limit: Maximum number of clips
             
-        except sqlite3.Error as e:
-            print(f"Database error: {e}")
-            return None
+        Returns:
+            List of (ID, full content, content type, metadata JSON)
+        """
+        conn = self.connections.reader()
+        rows = conn.execute("""
+            SELECT id, content, content_type, metadata, is_blob FROM clipboard_history 
+            WHERE id > ? ORDER BY id LIMIT ?
+        """, (after_id, limit)).fetchall()
+        return [
+            (row['id'],
+             ''.join(self._read_blob(conn, row['id'])) if row['is_blob'] else row['content'],
+             row['content_type'], row['metadata'])
+            for row in rows
+        ]
+    
+    def update_analyses(self, analyses: List[Tuple[int, str, Optional[str]]],
+                        version: str, last_id: int):
+        """Store new analyses of clips and record the reanalysis progress
+        
+        Both are committed in one transaction, so an interrupted
+        reanalysis resumes after the last clip whose analysis was stored.
+        
+        Args:
+            analyses: (clip ID, content type, metadata JSON) of the clips
+                whose analysis changed
+            version: ContentAnalyzer.rules_version of the analyses
+            last_id: ID of the last clip reanalyzed, changed or not
+        """
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.executemany(
+                "UPDATE clipboard_history SET content_type = ?, metadata = ? WHERE id = ?",
+                [(content_type, metadata, clip_id) for clip_id, content_type, metadata in analyses]
+            )
+            cursor.executemany(
+                "INSERT OR REPLACE INTO storage_meta (key, value) VALUES (?, ?)",
+                [('reanalyze_version', version), ('reanalyze_after', str(last_id))]
+            )
+            self._mark_stale([clip_id for clip_id, _, _ in analyses])
+            self._commit()
+    
+    def finish_reanalysis(self, version: str):
+        """Record that every stored clip has an analysis by this version
+        
+        load_analyses() then returns analyses of clips from before the
+        reanalysis too.
+        
+        Args:
+            version: ContentAnalyzer.rules_version
+        """
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO storage_meta (key, value) VALUES (?, ?)",
+                [('analyzer_version', version), ('analyzer_since', '0')]
+            )
+            self._commit()
     
     def get_history(self, limit: int = 100, offset: int = 0, 
-                    content_type: str = None) -> List[Dict]:
-        """Get clipboard history
+                    content_type: str = None,
+                    preview_only: bool = False,
+                    before: Optional[Tuple[str, int]] = None) -> List[Dict]:
+        """Get clipboard history, newest first
+        
+        Entries are ordered by (timestamp, id), so pages never overlap or
+        skip entries copied within the same second. Deep pages should be
+        read with a cursor: OFFSET still steps over every skipped entry,
+        while `before` seeks straight to the page in the index.
         
         Args:
             limit: Maximum number of entries to return
             offset: Number of entries to skip
             content_type: Filter by content type
+            preview_only: Return only LISTING_COLUMNS, with the stored
+                preview instead of the content
+            before: Cursor (timestamp, id) of the last entry of the
+                previous page; only older entries are returned
             
         Returns:
             List of clipboard entries
         """
-        cursor = self.conn.cursor()
+        cursor = self.connections.reader().cursor()
         
-        query = "SELECT * FROM clipboard_history"
+        columns = LISTING_COLUMNS if preview_only else "*"
+        query = f"SELECT {columns} FROM clipboard_history"
+        conditions = []
         params = []
         
         if content_type:
-            query += " WHERE content_type = ?"
+            conditions.append("content_type = ?")
             params.append(content_type)
         
-        query += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
+        if before is not None:
+            conditions.append("(timestamp, id) < (?, ?)")
+            params.extend(before)
+        
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        
+        query += " ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
         params.extend([limit, offset])
         
         cursor.execute(query, params)
         return [dict(row) for row in cursor.fetchall()]
     
-    def search(self, query: str, limit: int = 50) -> List[Dict]:
+    @staticmethod
+    def history_cursor(entry: Dict) -> Tuple[str, int]:
+        """Cursor for get_history(before=...) that continues after entry"""
+        return entry['timestamp'], entry['id']
+    
+    def iter_history(self, content_type: str = None, preview_only: bool = False,
+                     batch_size: int = 1000) -> Iterator[Dict]:
+        """Stream the whole history, newest first, a page at a time
+        
+        Meant for exports and maintenance jobs: memory stays bounded by
+        batch_size and every page is a cursor seek, however deep. Unlike
+        get_history(), full entries carry the whole content of large
+        clips, read from the blob store. Entries bumped to the top while
+        iterating are not visited again.
+        
+        Args:
+            content_type: Filter by content type
+            preview_only: Yield only LISTING_COLUMNS (see get_history)
+            batch_size: Entries read per query
+        """
+        before = None
+        while True:
+            page = self.get_history(limit=batch_size, content_type=content_type,
+                                    preview_only=preview_only, before=before)
+            for entry in page:
+                if not preview_only and entry['is_blob']:
+                    conn = self.connections.reader()
+                    entry['content'] = ''.join(self._read_blob(conn, entry['id']))
+                yield entry
+            if len(page) < batch_size:
+                return
+            before = self.history_cursor(page[-1])
+    
+    def get_saved_entry(self, clip_id: int) -> Optional[Dict]:
+        """Listing row of a clip that was just saved, with its use count
+        
+        Reads through the writer connection, so a save still waiting in
+        a write-behind batch is seen too. A use count of 0 means the save
+        inserted the clip rather than bumping it.
+        
+        Args:
+            clip_id: Row ID returned by save_clip()
+            
+        Returns:
+            LISTING_COLUMNS plus use_count, or None if there is no such clip
+        """
+        with self._lock:
+            cursor = self.conn.execute(
+                f"SELECT {LISTING_COLUMNS}, use_count FROM clipboard_history WHERE id = ?",
+                (clip_id,)
+            )
+            row = cursor.fetchone()
+        return dict(row) if row else None
+    
+    def count_history(self, content_type: str = None) -> int:
+        """Number of entries get_history() can page through
+        
+        Args:
+            content_type: Filter by content type
+        """
+        cursor = self.connections.reader().cursor()
+        if content_type:
+            cursor.execute(
+                "SELECT COUNT(*) FROM clipboard_history WHERE content_type = ?",
+                (content_type,)
+            )
+        else:
+            cursor.execute("SELECT COUNT(*) FROM clipboard_history")
+        return cursor.fetchone()[0]
+    
+    def count_history_snapshot(self, content_type: str = None) -> Tuple[int, int]:
+        """Number of entries, as count_history(), and the newest entry id
+        
+        Both come from one query, so an entry saved concurrently is either
+        counted and no newer than the id, or neither. Ids only grow, so
+        entries with a larger id were saved after counting.
+        
+        Args:
+            content_type: Filter by content type
+            
+        Returns:
+            Tuple of (entry count, newest entry id, or 0 if there is none)
+        """
+        cursor = self.connections.reader().cursor()
+        cursor.execute(
+            "SELECT (SELECT COUNT(*) FROM clipboard_history"
+            + (" WHERE content_type = ?" if content_type else "") + "), "
+            "(SELECT COALESCE(MAX(id), 0) FROM clipboard_history)",
+            (content_type,) if content_type else ()
+        )
+        count, newest_id = cursor.fetchone()
+        return count, newest_id
+    
+    def get_clip(self, clip_id: int) -> Optional[Dict]:
+        """Get one clipboard entry with its full content
+        
+        Recently fetched clips are served from an LRU cache, which is
+        invalidated whenever a clip is bumped, toggled, deleted or evicted.
+        
+        Args:
+            clip_id: Clipboard entry ID
+            
+        Returns:
+            Clipboard entry, or None if it does not exist
+        """
+        with self._cache_lock:
+            clip = self._clip_cache.get(clip_id)
+            if clip is not None:
+                self._clip_cache.move_to_end(clip_id)
+                self.cache_hits += 1
+                return dict(clip)
+            self.cache_misses += 1
+            generation = self._cache_generation
+        
+        conn = self.connections.reader()
+        row = conn.execute(
+            "SELECT * FROM clipboard_history WHERE id = ?", (clip_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        clip = dict(row)
+        if clip['is_blob']:
+            clip['content'] = ''.join(self._read_blob(conn, clip_id))
+        
+        self._cache_clip(clip, generation)
+        return dict(clip)
+    
+    def _cache_clip(self, clip: Dict, generation: int):
+        """Add a clip to the cache unless it was invalidated meanwhile"""
+        size = len(clip['content'])
+        if size > CLIP_CACHE_CHARS:
+            return
+        
+        with self._cache_lock:
+            if generation != self._cache_generation:
+                return
+            self._clip_cache[clip['id']] = clip
+            self._cache_chars += size
+            while (len(self._clip_cache) > self.clip_cache_size or
+                   self._cache_chars > CLIP_CACHE_CHARS):
+                _, oldest = self._clip_cache.popitem(last=False)
+                self._cache_chars -= len(oldest['content'])
+    
+    def _mark_stale(self, clip_ids: Optional[List[int]] = None):
+        """Invalidate cached clips when the open transaction commits
+        
+        Caller must hold the lock.
+        
+        Args:
+            clip_ids: IDs of changed clips. If None, every clip.
+        """
+        self._stale_clips.update([None] if clip_ids is None else clip_ids)
+    
+    def _invalidate_cache(self, clip_ids: Optional[List[int]] = None):
+        """Drop clips from the get_clip() cache
+        
+        Args:
+            clip_ids: IDs to drop. If None, clears the whole cache.
+        """
+        with self._cache_lock:
+            self._cache_generation += 1
+            if clip_ids is None:
+                self._clip_cache.clear()
+                self._cache_chars = 0
+                return
+            for clip_id in clip_ids:
+                clip = self._clip_cache.pop(clip_id, None)
+                if clip is not None:
+                    self._cache_chars -= len(clip['content'])
+    
+    def search(self, query: str, limit: int = 50,
+               preview_only: bool = False, rank: str = 'relevance',
+               prefix: bool = False, within_ids: Optional[List[int]] = None,
+               should_cancel: Optional[Callable[[], bool]] = None) -> List[Dict]:
         """Search clipboard history
         
+        Word queries (FTS5 syntax) use the word index. With the trigram
+        index enabled, fragments such as URL paths, camelCase parts or
+        hash pieces are matched as substrings instead, and so are word
+        queries without whole-word matches.
+        
         Args:
             query: Search query
             limit: Maximum number of results
+            preview_only: Return only LISTING_COLUMNS (see get_history)
+            rank: 'relevance' orders by BM25 score, discounted by age and
+                boosted by use count; 'recent' orders newest first
+            prefix: Match the words literally, the last one as a prefix,
+                for search-as-you-type
+            within_ids: Only consider these entries. Disables the
+                fallback to the trigram index.
+            should_cancel: Polled while the query runs; returning True
+                aborts it with SearchCancelled
             
         Returns:
-            List of matching clipboard entries
+            List of matching clipboard entries, best first
         """
-        cursor = self.conn.cursor()
+        if rank not in SEARCH_RANKS:
+            raise ValueError(f"Unknown search rank: {rank}")
         
-        # Use FTS for full-text search
-        cursor.execute("""
-            SELECT h.* FROM clipboard_history h
-            INNER JOIN clipboard_fts fts ON h.id = fts.rowid
-            WHERE content MATCH ?
-            ORDER BY h.timestamp DESC
-            LIMIT ?
-        """, (query, limit))
+        query = query.strip()
+        if not query:
+            return []
         
-        return [dict(row) for row in cursor.fetchall()]
+        def run(table, match):
+            return self._search_index(table, match, limit, preview_only, rank,
+                                      within_ids, should_cancel)
+        
+        if self.search_route(query) == 'trigram':
+            return run('clipboard_trigram', self._fts_phrase(query))
+        
+        words = [self._fts_phrase(word) for word in query.split()]
+        if prefix:
+            results = run('clipboard_fts', ' '.join(words) + '*')
+        else:
+            try:
+                results = run('clipboard_fts', query)
+            except sqlite3.OperationalError:
+                # Not valid FTS syntax: match the words literally instead
+                results = run('clipboard_fts', ' '.join(words))
+        
+        # No whole-word match: the query may be part of a longer word
+        if not results and within_ids is None and self._trigram_usable(query):
+            results = run('clipboard_trigram', self._fts_phrase(query))
+        return results
     
-    def get_favorites(self) -> List[Dict]:
-        """Get favorite clipboard entries"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT * FROM clipboard_history 
+    def fuzzy_search(self, query: str, limit: int = 50,
+                     preview_only: bool = False,
+                     within_ids: Optional[List[int]] = None) -> List[Dict]:
+        """Find clips whose preview contains the query terms as subsequences
+        
+        Unlike search(), typos that drop characters, fragments and terms
+        in any order still match ("gtcmt" finds "git commit"). Only the
+        fuzzy_index_size most recent clips are considered, and only their
+        previews.
+        
+        Args:
+            query: Whitespace-separated terms
+            limit: Maximum number of results
+            preview_only: Return only LISTING_COLUMNS (see get_history)
+            within_ids: Only consider these entries
+            
+        Returns:
+            List of matching clipboard entries, best first
+        """
+        if not self.fuzzy_index_size:
+            return []
+        self._load_fuzzy_index()
+        
+        matches = self.fuzzy_index.search(query, limit, within_ids)
+        if not matches:
+            return []
+        
+        ids = [clip_id for clip_id, _ in matches]
+        columns = LISTING_COLUMNS if preview_only else "*"
+        cursor = self.connections.reader().cursor()
+        cursor.execute(
+            f"SELECT {columns} FROM clipboard_history "
+            f"WHERE id IN ({','.join('?' * len(ids))})",
+            ids
+        )
+        rows = {row['id']: dict(row) for row in cursor.fetchall()}
+        # Saves still pending in write-behind mode are not visible yet
+        return [rows[clip_id] for clip_id in ids if clip_id in rows]
+    
+    def _load_fuzzy_index(self):
+        """Fill the fuzzy index with the most recent previews, once"""
+        if self._fuzzy_loaded:
+            return
+        with self._lock:
+            if self._fuzzy_loaded:
+                return
+            cursor = self.conn.execute("""
+                SELECT id, preview FROM clipboard_history
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            """, (self.fuzzy_index_size,))
+            rows = cursor.fetchall()
+            self.fuzzy_index.load(
+                (row['id'], row['preview'] or '') for row in reversed(rows)
+            )
+            self._fuzzy_loaded = True
+    
+    def _reset_fuzzy_index(self):
+        """Reload the fuzzy index on next use (caller holds the lock)"""
+        self._fuzzy_loaded = False
+        self.fuzzy_index.clear()
+    
+    def search_route(self, query: str) -> str:
+        """Tell which index search() consults first for a query
+        
+        Returns:
+            'trigram' for fragment queries when the trigram index is
+            enabled, otherwise 'words'
+        """
+        query = query.strip()
+        if self._trigram_usable(query) and FRAGMENT_QUERY.search(query):
+            return 'trigram'
+        return 'words'
+    
+    def _trigram_usable(self, query: str) -> bool:
+        """Whether the trigram index can answer a stripped query"""
+        return self.trigram_index and len(query) >= 3
+    
+    def _search_index(self, table: str, match: str, limit: int,
+                      preview_only: bool, rank: str,
+                      within_ids: Optional[List[int]] = None,
+                      should_cancel: Optional[Callable[[], bool]] = None) -> List[Dict]:
+        """Run a ranked query against one full-text index
+        
+        Args:
+            table: clipboard_fts or clipboard_trigram
+            match: FTS5 match expression
+            limit: Maximum number of results
+            preview_only: Return only LISTING_COLUMNS
+            rank: Value from SEARCH_RANKS
+            within_ids: Only consider these entries
+            should_cancel: Aborts the query when it returns True
+        """
+        conn = self.connections.reader()
+        cursor = conn.cursor()
+        
+        columns = self._prefixed(LISTING_COLUMNS, 'h') if preview_only else "h.*"
+        params = [match]
+        
+        where = f"{table} MATCH ?"
+        if within_ids is not None:
+            where += f" AND {table}.rowid IN ({','.join('?' * len(within_ids))})"
+            params += list(within_ids)
+        
+        if rank == 'relevance':
+            # bm25() is negative, better matches more so; the factors are
+            # positive, so ascending order puts the best match first
+            order = f"""
+                bm25({table})
+                / (1.0 + (julianday('now') - julianday(h.timestamp)) / ?)
+                * min(?, 1.0 + ? * h.use_count),
+                h.timestamp DESC
+            """
+            params += [RECENCY_HALF_LIFE_DAYS, USAGE_BOOST_MAX, USAGE_BOOST_STEP]
+        else:
+            order = "h.timestamp DESC"
+        params.append(limit)
+        
+        if should_cancel is not None:
+            conn.set_progress_handler(should_cancel, SEARCH_CANCEL_CHECK_STEPS)
+        try:
+            # One pass over the matches; SQLite keeps only the top `limit`
+            cursor.execute(f"""
+                SELECT {columns} FROM {table}
+                INNER JOIN clipboard_history h ON h.id = {table}.rowid
+                WHERE {where}
+                ORDER BY {order}
+                LIMIT ?
+            """, params)
+            return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.OperationalError as e:
+            if should_cancel is not None and should_cancel():
+                raise SearchCancelled(match) from e
+            raise
+        finally:
+            if should_cancel is not None:
+                conn.set_progress_handler(None, 0)
+    
+    @staticmethod
+    def _fts_phrase(text: str) -> str:
+        """Quote text as a single FTS5 phrase"""
+        return '"' + text.replace('"', '""') + '"'
+    
+    def get_favorites(self, preview_only: bool = False) -> List[Dict]:
+        """Get favorite clipboard entries
+        
+        Args:
+            preview_only: Return only LISTING_COLUMNS (see get_history)
+        """
+        cursor = self.connections.reader().cursor()
+        columns = LISTING_COLUMNS if preview_only else "*"
+        cursor.execute(f"""
+            SELECT {columns} FROM clipboard_history 
             WHERE is_favorite = 1 
             ORDER BY timestamp DESC
         """)
         return [dict(row) for row in cursor.fetchall()]
     
+    @staticmethod
+    def _prefixed(columns: str, alias: str) -> str:
+        """Qualify a comma-separated column list with a table alias"""
+        return ', '.join(f"{alias}.{column.strip()}" for column in columns.split(','))
+    
     def toggle_favorite(self, clip_id: int) -> bool:
         """Toggle favorite status
         
@@ -202,23 +1421,26 @@ class ClipboardStorage:
         Returns:
             New favorite status
         """
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT is_favorite FROM clipboard_history WHERE id = ?",
-            (clip_id,)
-        )
-        row = cursor.fetchone()
-        
-        if row:
-            new_status = 0 if row['is_favorite'] else 1
+        with self._lock:
+            cursor = self.conn.cursor()
             cursor.execute(
-                "UPDATE clipboard_history SET is_favorite = ? WHERE id = ?",
-                (new_status, clip_id)
+                "SELECT is_favorite FROM clipboard_history WHERE id = ?",
+                (clip_id,)
             )
-            self.conn.commit()
-            return bool(new_status)
+            row = cursor.fetchone()
         
-        return False
+            if row:
+                new_status = 0 if row['is_favorite'] else 1
+                cursor.execute(
+                    "UPDATE clipboard_history SET is_favorite = ? WHERE id = ?",
+                    (new_status, clip_id)
+                )
+                self._mark_stale([clip_id])
+                self._commit()
+                self.live_count += -1 if new_status else 1
+                return bool(new_status)
+        
+            return False
     
     def delete_clip(self, clip_id: int):
         """Delete clipboard entry
@@ -226,41 +1448,133 @@ class ClipboardStorage:
         Args:
             clip_id: Clipboard entry ID
         """
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM clipboard_history WHERE id = ?", (clip_id,))
-        self.conn.commit()
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "SELECT is_favorite FROM clipboard_history WHERE id = ?",
+                (clip_id,)
+            )
+            row = cursor.fetchone()
+            if not row:
+                return
+            
+            cursor.execute("DELETE FROM clipboard_history WHERE id = ?", (clip_id,))
+            self._mark_stale([clip_id])
+            self.fuzzy_index.remove([clip_id])
+            self._commit()
+            if not row['is_favorite']:
+                self.live_count -= 1
     
     def clear_all(self):
         """Clear all clipboard entries"""
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM clipboard_history")
-        self.conn.commit()
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute("DELETE FROM clipboard_history")
+            self._mark_stale()
+            self.fuzzy_index.clear()
+            self._commit()
+            self.live_count = 0
     
     def cleanup_old_entries(self, max_entries: int = 1000):
         """Remove old entries to maintain size limit
         
+        Rescans and sorts the whole table; enforce_retention is the cheap
+        per-clip alternative.
+        
         Args:
             max_entries: Maximum number of entries to keep
         """
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            DELETE FROM clipboard_history 
-            WHERE id NOT IN (
-                SELECT id FROM clipboard_history 
-                WHERE is_favorite = 1
-                UNION
-                SELECT id FROM (
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                DELETE FROM clipboard_history 
+                WHERE id NOT IN (
                     SELECT id FROM clipboard_history 
-                    ORDER BY timestamp DESC 
+                    WHERE is_favorite = 1
+                    UNION
+                    SELECT id FROM (
+                        SELECT id FROM clipboard_history 
+                        ORDER BY timestamp DESC 
+                        LIMIT ?
+                    )
+                )
+            """, (max_entries,))
+            self._mark_stale()
+            self._reset_fuzzy_index()
+            # Ride along with the pending write-behind batch, if any
+            if not self._pending_saves:
+                self._commit()
+            self.live_count = self._count_live()
+    
+    def enforce_retention(self, max_entries: int = 1000,
+                          high_water: Optional[int] = None,
+                          batch_size: int = 100) -> List[int]:
+        """Evict the oldest non-favorite entries once a high-water mark is crossed
+        
+        Uses the maintained live count, so calls below the high-water mark
+        cost nothing. Above it, the overflow is deleted in small batches
+        taken from the front of the retention index. Favorites are not in
+        that index and do not count towards max_entries.
+        
+        Args:
+            max_entries: Number of non-favorite entries to keep
+            high_water: Live count that triggers eviction. Defaults to
+                max_entries plus 5%.
+            batch_size: Maximum number of rows deleted per statement
+            
+        Returns:
+            IDs of the evicted entries
+        """
+        if high_water is None:
+            high_water = max_entries + max(1, max_entries // 20)
+        
+        if self.live_count <= high_water:
+            return []
+        
+        evicted = []
+        with self._lock:
+            cursor = self.conn.cursor()
+            overflow = self.live_count - max_entries
+            
+            while overflow > 0:
+                cursor.execute("""
+                    SELECT id FROM clipboard_history INDEXED BY idx_retention
+                    WHERE is_favorite = 0
+                    ORDER BY timestamp, id
                     LIMIT ?
+                """, (min(batch_size, overflow),))
+                ids = [row['id'] for row in cursor.fetchall()]
+                if not ids:
+                    break
+                
+                placeholders = ','.join('?' * len(ids))
+                cursor.execute(
+                    f"DELETE FROM clipboard_history WHERE id IN ({placeholders})",
+                    ids
                 )
-            )
-        """, (max_entries,))
-        self.conn.commit()
+                evicted.extend(ids)
+                overflow -= len(ids)
+                self.live_count -= len(ids)
+            
+            self._mark_stale(evicted)
+            self.fuzzy_index.remove(evicted)
+            # Ride along with the pending write-behind batch, if any
+            if not self._pending_saves:
+                self._commit()
+        
+        return evicted
+    
+    def _count_live(self) -> int:
+        """Count non-favorite entries"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) as live FROM clipboard_history WHERE is_favorite = 0"
+        )
+        return cursor.fetchone()['live']
     
     def get_stats(self) -> Dict:
         """Get storage statistics"""
-        cursor = self.conn.cursor()
+        cursor = self.connections.reader().cursor()
         
         cursor.execute("SELECT COUNT(*) as total FROM clipboard_history")
         total = cursor.fetchone()['total']
@@ -274,15 +1588,33 @@ class ClipboardStorage:
         return {
             'total': total,
             'favorites': favorites,
-            'by_type': by_type
+            'by_type': by_type,
+            'clip_cache': {
+                'size': len(self._clip_cache),
+                'hits': self.cache_hits,
+                'misses': self.cache_misses
+            },
+            'fuzzy_index': len(self.fuzzy_index)
         }
     
-    def _hash_content(self, content: str) -> str:
-        """Generate hash for content deduplication"""
-        return hashlib.md5(content.encode('utf-8')).hexdigest()
-    
     def close(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
+        """Flush pending saves and close database connections"""
+        # Let a flush timer that already fired finish first; it takes the
+        # lock, so it cannot be waited for while holding it
+        with self._lock:
+            timer, self._flush_timer = self._flush_timer, None
+        if timer is not None:
+            timer.cancel()
+            if timer is not threading.current_thread():
+                timer.join()
+        
+        with self._lock:
+            if self.conn is None:
+                return
+            try:
+                self._commit()
+            except sqlite3.Error as e:
+                print(f"Database error: {e}")
+            self.connections.close()
+            self.conn = None
 
@@ -1,15 +1,27 @@
 """
 User interface for Smart Clipboard Manager
 """
+import queue
 import tkinter as tk
 from tkinter import ttk, messagebox
 from typing import Optional, Callable, List, Dict
-import pyperclip
+
+from .search_engine import SearchEngine
+from .virtual_list import ClipPager, VirtualClipList
 
 
 class ClipboardUI:
     """Main UI for clipboard manager"""
     
+    # Characters of the selected clip shown in the preview panel
+    PREVIEW_TEXT_LIMIT = 65536
+    
+    # Milliseconds between checks for background search results
+    SEARCH_POLL_MS = 30
+    
+    # Milliseconds between applying the clips added meanwhile to the list
+    UPDATE_POLL_MS = 100
+    
     def __init__(self, storage, analyzer, clipboard_manager, config):
         """Initialize UI
         
@@ -26,13 +38,36 @@ class ClipboardUI:
         
         self.root = None
         self.search_var = None
+        self.clip_list = None
         self.clips_listbox = None
         self.preview_text = None
-        self.current_clips = []
         self.auto_refresh_enabled = True
+        self.built = False
+        
+        # Builds a pager for the listing on screen (history, a type,
+        # favorites or search results), to reload it after a change
+        self._view: Callable[[], ClipPager] = self._history_pager
+        # Rows of the search results on screen, None for other listings
+        self._view_rows: Optional[List[Dict]] = None
+        
+        # History changes (ClipDelta) posted by the ingest thread
+        self.updates = queue.Queue()
+        
+        # Searches run on a background thread while typing
+        self.search_engine = SearchEngine(
+            storage,
+            debounce=config.get('ui.search_debounce_ms', 150) / 1000,
+            fuzzy=config.get('ui.fuzzy_search', False)
+        )
         
-    def create_window(self):
-        """Create the main UI window"""
+    def create_window(self, build: bool = True):
+        """Create the main UI window
+        
+        Args:
+            build: Build the widgets now. If False they are built once the
+                event loop is idle, or by show() if that comes first, so
+                the caller gets to its event loop sooner.
+        """
         self.root = tk.Tk()
         self.root.title("Smart Clipboard Manager")
         
@@ -52,20 +87,36 @@ class ClipboardUI:
         # Prevent window from being destroyed when closed - just hide it
         self.root.protocol("WM_DELETE_WINDOW", self.hide)
         
+        if build:
+            self.build()
+        else:
+            self.root.after_idle(self.build)
+        
+        return self.root
+    
+    def build(self):
+        """Create the widgets and start the UI's background work, once"""
+        if self.built:
+            return
+        self.built = True
+        
         # Create UI elements
         self._create_widgets()
         
-        # Register for clipboard updates
-        if hasattr(self.clipboard_manager, 'add_refresh_callback'):
-            self.clipboard_manager.add_refresh_callback(self._auto_refresh)
+        # Deliver background search results on the Tk thread
+        self.search_engine.start()
+        self.root.after(self.SEARCH_POLL_MS, self._poll_search_results)
+        
+        # Register for clipboard updates; they are applied on the Tk thread
+        if hasattr(self.clipboard_manager, 'add_delta_callback'):
+            self.clipboard_manager.add_delta_callback(self.updates.put)
+        self.root.after(self.UPDATE_POLL_MS, self._apply_updates)
         
         # Bind keyboard shortcuts
         self.root.bind('<Escape>', lambda e: self.hide())
         self.root.bind('<Return>', lambda e: self._paste_selected())
         self.root.bind('<Double-Button-1>', lambda e: self._paste_selected())
         self.root.bind('<Button-1>', lambda e: self._on_click_copy(e))
-        
-        return self.root
     
     def _create_widgets(self):
         """Create UI widgets"""
@@ -107,19 +158,16 @@ class ClipboardUI:
         list_frame.columnconfigure(0, weight=1)
         list_frame.rowconfigure(0, weight=1)
         
-        scrollbar = ttk.Scrollbar(list_frame)
-        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
-        
-        self.clips_listbox = tk.Listbox(
+        # Only the rows on screen are rendered; pages of the history are
+        # fetched as they scroll into view
+        self.clip_list = VirtualClipList(
             list_frame,
-            yscrollcommand=scrollbar.set,
+            self._format_clip,
+            on_select=self._on_select,
             font=('Courier', 10),
             height=15
         )
-        self.clips_listbox.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        scrollbar.config(command=self.clips_listbox.yview)
-        
-        self.clips_listbox.bind('<<ListboxSelect>>', self._on_select)
+        self.clips_listbox = self.clip_list.listbox
         
         # Preview pane
         preview_frame = ttk.LabelFrame(main_frame, text="Preview", padding="5")
@@ -156,6 +204,7 @@ class ClipboardUI:
         """Show the UI window"""
         if self.root is None:
             self.create_window()
+        self.build()
         
         print("UI show() called")
         self.root.deiconify()
@@ -180,33 +229,68 @@ class ClipboardUI:
         if self.root:
             self.root.withdraw()
     
+    def close(self):
+        """Stop background work started by the UI"""
+        self.search_engine.stop()
+    
     def _refresh_clips(self, clips: List[Dict] = None):
         """Refresh the clips list
         
         Args:
-            clips: List of clips to display. If None, loads from storage.
+            clips: List of clips to display. If None, shows the whole
+                history, paged in from storage as it is scrolled.
         """
         if clips is None:
-            clips = self.storage.get_history(limit=100)
+            self._show_view(self._history_pager)
+        else:
+            clips = list(clips)
+            self._show_view(lambda: ClipPager.from_list(clips), rows=clips)
+    
+    def _show_view(self, view: Callable[[], ClipPager], rows: List[Dict] = None):
+        """Show a listing from the top
         
-        self.current_clips = clips
+        Args:
+            view: Returns a pager over the listing; called again by
+                _reload_view()
+            rows: The rows of a listing held in memory, if it is one
+        """
+        self._view = view
+        self._view_rows = rows
+        self.clip_list.set_pager(view())
+    
+    def _reload_view(self):
+        """Reload the listing on screen after a clip in it changed,
+        keeping the scroll position and selection"""
+        self.clip_list.set_pager(self._view(), keep_position=True)
+    
+    def _history_pager(self, content_type: Optional[str] = None) -> ClipPager:
+        """Pager over the history, optionally of one content type"""
+        return ClipPager(
+            lambda offset, limit: self.storage.get_history(
+                limit=limit, offset=offset, content_type=content_type, preview_only=True
+            ),
+            lambda: self.storage.count_history_snapshot(content_type),
+            fetch_after=lambda row, limit: self.storage.get_history(
+                limit=limit, content_type=content_type, preview_only=True,
+                before=self.storage.history_cursor(row)
+            )
+        )
+    
+    def _format_clip(self, clip: Dict) -> str:
+        """Text of a clip's row in the list"""
+        max_preview = self.config.get('ui.max_preview_length', 100)
         
-        # Clear listbox
-        self.clips_listbox.delete(0, tk.END)
+        # The stored preview is already flattened to one line
+        preview = self.analyzer.get_preview(clip['preview'], max_preview)
+        truncated = (clip['content_length'] or 0) > len(clip['preview'])
+        if truncated and not preview.endswith('...'):
+            preview += '...'
         
-        # Add clips
-        max_preview = self.config.get('ui.max_preview_length', 100)
+        # Add type indicator
+        type_icon = self._get_type_icon(clip['content_type'])
+        favorite_icon = '⭐' if clip.get('is_favorite') else '  '
         
-        for clip in clips:
-            preview = self.analyzer.get_preview(clip['content'], max_preview)
-            preview = preview.replace('\n', ' ').replace('\r', '')
-            
-            # Add type indicator
-            type_icon = self._get_type_icon(clip['content_type'])
-            favorite_icon = '⭐' if clip.get('is_favorite') else '  '
-            
-            display = f"{favorite_icon} {type_icon} {preview}"
-            self.clips_listbox.insert(tk.END, display)
+        return f"{favorite_icon} {type_icon} {preview}"
     
     def _get_type_icon(self, content_type: str) -> str:
         """Get icon for content type"""
@@ -222,21 +306,30 @@ class ClipboardUI:
         }
         return icons.get(content_type, '📄')
     
-    def _auto_refresh(self):
-        """Auto-refresh when new clipboard item is added"""
-        if not self.auto_refresh_enabled:
-            return
-            
-        # Only refresh if window is visible and search is empty
-        if (self.root and self.root.winfo_viewable() and 
-            self.search_var and not self.search_var.get().strip()):
-            self._refresh_clips()
+    def _apply_updates(self):
+        """Patch the list with the clips added, bumped or evicted meanwhile
+        
+        A burst of clips is applied as one change and one redraw. Changes
+        are dropped while a search, filter or favorites are shown, or the
+        window is hidden: going back to the history reloads it anyway.
+        """
+        deltas = []
+        try:
+            while True:
+                deltas.append(self.updates.get_nowait())
+        except queue.Empty:
+            pass
+        
+        if deltas and self.auto_refresh_enabled and self.root.winfo_viewable():
+            self.clip_list.apply_deltas(deltas)
+        
+        self.root.after(self.UPDATE_POLL_MS, self._apply_updates)
     
     def _on_search(self):
         """Handle search input"""
         query = self.search_var.get()
         
-        if not query:
+        if not query.strip():
             # Enable auto-refresh when search is cleared
             self.auto_refresh_enabled = True
             self._refresh_clips()
@@ -245,9 +338,17 @@ class ClipboardUI:
         # Disable auto-refresh during search
         self.auto_refresh_enabled = False
         
-        # Search in storage
-        results = self.storage.search(query)
-        self._refresh_clips(results)
+        # Results arrive through _poll_search_results
+        self.search_engine.submit(query)
+    
+    def _poll_search_results(self):
+        """Show background search results that match the current search text"""
+        result = self.search_engine.get_result()
+        if (result is not None and not self.auto_refresh_enabled and
+                result.query == self.search_var.get().strip()):
+            self._refresh_clips(result.clips)
+        
+        self.root.after(self.SEARCH_POLL_MS, self._poll_search_results)
     
     def _filter_by_type(self, content_type: Optional[str]):
         """Filter clips by type
@@ -257,31 +358,51 @@ class ClipboardUI:
         """
         # Disable auto-refresh when filtering
         self.auto_refresh_enabled = (content_type is None)
-        clips = self.storage.get_history(limit=100, content_type=content_type)
-        self._refresh_clips(clips)
+        self._show_view(lambda: self._history_pager(content_type))
     
     def _show_favorites(self):
         """Show favorite clips"""
         # Disable auto-refresh when showing favorites
         self.auto_refresh_enabled = False
-        clips = self.storage.get_favorites()
-        self._refresh_clips(clips)
+        self._show_view(
+            lambda: ClipPager.from_list(self.storage.get_favorites(preview_only=True))
+        )
     
-    def _on_select(self, event):
+    def _selected_clip(self) -> Optional[Dict]:
+        """Listing row of the selected clip, or None"""
+        return self.clip_list.selected_clip()
+    
+    def _on_select(self):
         """Handle clip selection"""
-        selection = self.clips_listbox.curselection()
-        if not selection:
+        clip = self._selected_clip()
+        if clip is None:
             return
         
-        index = selection[0]
-        if index >= len(self.current_clips):
+        # Show preview; the full clip is cached for a following copy
+        self.preview_text.delete('1.0', tk.END)
+        full_clip = self.storage.get_clip(clip['id'])
+        if full_clip is None:
             return
         
-        clip = self.current_clips[index]
+        # Keep the Text widget responsive for very large clips
+        text = full_clip['content'][:self.PREVIEW_TEXT_LIMIT]
+        self.preview_text.insert('1.0', text)
+        remaining = len(full_clip['content']) - len(text)
+        if remaining > 0:
+            self.preview_text.insert(tk.END, f"\n\n... ({remaining} more characters)")
+    
+    def _copy_clip(self, clip) -> bool:
+        """Load the full content of a listed clip and copy it
         
-        # Show preview
-        self.preview_text.delete('1.0', tk.END)
-        self.preview_text.insert('1.0', clip['content'])
+        Returns:
+            True if copied, False if the clip no longer exists or the
+            clipboard could not be set
+        """
+        full_clip = self.storage.get_clip(clip['id'])
+        if full_clip is None:
+            print(f"Clip {clip['id']} not found")
+            return False
+        return self.clipboard_manager.copy_to_clipboard(full_clip['content'])
     
     def _on_click_copy(self, event):
         """Handle click on listbox item - copy to clipboard"""
@@ -289,50 +410,33 @@ class ClipboardUI:
         if event.widget != self.clips_listbox:
             return
         
-        selection = self.clips_listbox.curselection()
-        if not selection:
-            return
-        
-        index = selection[0]
-        if index >= len(self.current_clips):
+        clip = self._selected_clip()
+        if clip is None:
             return
         
-        clip = self.current_clips[index]
-        
         # Copy to clipboard
-        pyperclip.copy(clip['content'])
-        print(f"Copied clip {clip['id']} to clipboard")
+        if self._copy_clip(clip):
+            print(f"Copied clip {clip['id']} to clipboard")
     
     def _copy_selected(self):
         """Copy selected clip to clipboard"""
-        selection = self.clips_listbox.curselection()
-        if not selection:
+        clip = self._selected_clip()
+        if clip is None:
             return
         
-        index = selection[0]
-        if index >= len(self.current_clips):
-            return
-        
-        clip = self.current_clips[index]
-        
         # Copy to clipboard
-        pyperclip.copy(clip['content'])
-        print(f"Copied clip {clip['id']} to clipboard")
+        if self._copy_clip(clip):
+            print(f"Copied clip {clip['id']} to clipboard")
     
     def _paste_selected(self):
         """Paste selected clip"""
-        selection = self.clips_listbox.curselection()
-        if not selection:
+        clip = self._selected_clip()
+        if clip is None:
             return
         
-        index = selection[0]
-        if index >= len(self.current_clips):
-            return
-        
-        clip = self.current_clips[index]
-        
         # Copy to clipboard
-        pyperclip.copy(clip['content'])
+        if not self._copy_clip(clip):
+            return
         
         # Hide window
         self.hide()
@@ -341,36 +445,25 @@ class ClipboardUI:
     
     def _toggle_favorite(self):
         """Toggle favorite status of selected clip"""
-        selection = self.clips_listbox.curselection()
-        if not selection:
-            return
-        
-        index = selection[0]
-        if index >= len(self.current_clips):
+        clip = self._selected_clip()
+        if clip is None:
             return
-        
-        clip = self.current_clips[index]
-        self.storage.toggle_favorite(clip['id'])
-        
-        # Refresh
-        self._refresh_clips()
+        # Search results are not fetched again, so their row is updated
+        clip['is_favorite'] = self.storage.toggle_favorite(clip['id'])
+        self._reload_view()
     
     def _delete_selected(self):
         """Delete selected clip"""
-        selection = self.clips_listbox.curselection()
-        if not selection:
+        clip = self._selected_clip()
+        if clip is None:
             return
         
-        index = selection[0]
-        if index >= len(self.current_clips):
-            return
-        
-        clip = self.current_clips[index]
-        
         # Confirm deletion
         if messagebox.askyesno("Confirm Delete", "Delete this clip?"):
             self.storage.delete_clip(clip['id'])
-            self._refresh_clips()
+            if self._view_rows is not None:
+                self._view_rows.remove(clip)
+            self._reload_view()
     
     def _clear_all(self):
         """Clear all clipboard items"""
@@ -402,5 +495,36 @@ class ClipboardUI:
         for content_type, count in stats['by_type'].items():
             message += f"  {content_type}: {count}\n"
         
+        cache = stats['clip_cache']
+        message += (f"\nClip cache: {cache['size']} clips, "
+                    f"{cache['hits']} hits, {cache['misses']} misses\n")
+        
+        if hasattr(self.clipboard_manager, 'get_stats'):
+            manager_stats = self.clipboard_manager.get_stats()
+            monitor = manager_stats['monitor']
+            message += f"\nMonitor: {monitor['mode']} mode\n"
+            if monitor['interval'] is not None:
+                message += f"  Poll interval: {monitor['interval']:.2f}s\n"
+            message += f"  Wakeups: {monitor['wakeups']} "
+            message += f"({monitor['wakeups_per_minute']:.1f}/min)\n"
+            message += f"  Changes: {monitor['changes']}\n"
+            
+            message += "\nIngest stages:\n"
+            for name, stage in manager_stats['ingest'].items():
+                message += (f"  {name}: {stage['processed']} done, "
+                            f"queue {stage['queue_depth']}/{stage['max_depth']} max, "
+                            f"{stage['avg_ms']:.1f}ms avg, "
+                            f"{stage['dropped'] + stage['coalesced']} dropped\n")
+
+            rejected = manager_stats['rejected']
+            message += "Rejected: " + ", ".join(
+                f"{count} {reason.replace('_', ' ')}" for reason, count in rejected.items()
+            ) + "\n"
+
+            analysis = manager_stats['analysis']
+            message += (f"\nAnalysis cache: {analysis['size']} clips, "
+                        f"{analysis['hit_rate']:.0%} hit rate "
+                        f"({analysis['hits']} hits, {analysis['misses']} misses)\n")
+
         messagebox.showinfo("Statistics", message)
 
@@ -0,0 +1,359 @@
+"""
+Virtualized clip list: renders only the visible rows of a long listing
+"""
+import tkinter as tk
+import tkinter.font as tkfont
+from collections import OrderedDict
+from tkinter import ttk
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+# Rows fetched from storage at a time
+PAGE_SIZE = 100
+
+# Pages kept in memory; older pages are fetched again when scrolled back to
+MAX_CACHED_PAGES = 64
+
+# Rows moved by one mouse wheel step
+WHEEL_ROWS = 3
+
+
+class ClipPager:
+    """Random access to a long clip listing, fetched a page at a time
+
+    Only pages that are looked at are fetched, and at most max_pages are
+    kept, so a 100k-entry history costs no more to show than a short one.
+    A page that follows a cached page is fetched with fetch_after, if
+    given, so scrolling on page by page never seeks by offset.
+    """
+
+    def __init__(self, fetch: Callable[[int, int], List[Dict]],
+                 count: Callable[[], Union[int, Tuple[int, int]]],
+                 page_size: int = PAGE_SIZE,
+                 max_pages: int = MAX_CACHED_PAGES,
+                 fetch_after: Optional[Callable[[Dict, int], List[Dict]]] = None):
+        """Initialize pager
+
+        Args:
+            fetch: Returns up to `limit` rows starting at `offset`,
+                called as fetch(offset, limit)
+            count: Returns the number of rows in the listing, or a tuple
+                of that number and the newest clip id it counted, which
+                lets apply_deltas tell clips it already counted from new ones
+            page_size: Rows per fetch
+            max_pages: Pages kept in memory
+            fetch_after: Returns up to `limit` rows following `row`,
+                called as fetch_after(row, limit)
+        """
+        self.fetch = fetch
+        self.count = count
+        self.fetch_after = fetch_after
+        self.page_size = page_size
+        self.max_pages = max(1, max_pages)
+        self.fetches = 0
+        self._pages: 'OrderedDict[int, List[Dict]]' = OrderedDict()
+        self._length = 0
+        self._newest_id: Optional[int] = None
+        self._count()
+
+    @classmethod
+    def from_list(cls, clips: List[Dict]) -> 'ClipPager':
+        """Pager over rows that are already in memory (search results)"""
+        return cls(lambda offset, limit: clips[offset:offset + limit],
+                   lambda: len(clips), page_size=max(1, len(clips)))
+
+    def __len__(self) -> int:
+        return self._length
+
+    def reset(self):
+        """Forget fetched pages and count the rows again"""
+        self._pages.clear()
+        self._count()
+
+    def get(self, index: int) -> Optional[Dict]:
+        """Row at index, or None if out of range"""
+        if not 0 <= index < self._length:
+            return None
+        page = self._page(index // self.page_size)
+        offset = index % self.page_size
+        return page[offset] if offset < len(page) else None
+
+    def rows(self, start: int, stop: int) -> List[Dict]:
+        """Rows from start up to (not including) stop"""
+        start = max(0, start)
+        stop = min(stop, self._length)
+        rows = []
+        while start < stop:
+            number, offset = divmod(start, self.page_size)
+            page = self._page(number)
+            if offset >= len(page):
+                # The listing shrank since it was counted
+                break
+            taken = page[offset:offset + stop - start]
+            rows.extend(taken)
+            start += len(taken)
+        return rows
+
+    def index_of(self, clip_id: int) -> Optional[int]:
+        """Index of the row with this id among the fetched pages, or None"""
+        for number, page in self._pages.items():
+            for offset, row in enumerate(page):
+                if row['id'] == clip_id:
+                    return number * self.page_size + offset
+        return None
+
+    def apply_deltas(self, deltas: Iterable) -> bool:
+        """Patch the listing with history changes instead of fetching again
+
+        Added and bumped rows go to the top, in the order of the changes,
+        and evicted rows are removed. Pages fetched from the top down are
+        patched in place; pages further down would have shifted and are
+        dropped, to be fetched again when scrolled to.
+
+        Args:
+            deltas: ClipDelta-like objects (kind, clip_id, row), oldest first
+
+        Returns:
+            Whether there was anything to apply
+        """
+        # Fetched rows from the top down to the first missing page
+        prefix = []
+        number = 0
+        while number in self._pages and len(prefix) < self._length:
+            prefix.extend(self._pages[number])
+            number += 1
+        complete = len(prefix) >= self._length
+        # Clips up to the newest one counted are already in the length;
+        # without a count snapshot, only the fetched ones are known to be
+        fetched = {row['id'] for row in prefix}
+        newest = self._newest_id
+
+        head: 'OrderedDict[int, Dict]' = OrderedDict()
+        dropped = set()
+        growth = 0
+        for delta in deltas:
+            head.pop(delta.clip_id, None)
+            dropped.add(delta.clip_id)
+            if delta.kind == 'evicted':
+                growth -= 1
+            else:
+                head[delta.clip_id] = delta.row
+                if delta.kind == 'added':
+                    growth += (delta.clip_id > newest if newest is not None
+                               else delta.clip_id not in fetched)
+        if not dropped:
+            return False
+
+        rows = list(reversed(head.values()))
+        rows.extend(row for row in prefix if row['id'] not in dropped)
+        if not complete:
+            # The last page would lack the rows below the prefix
+            rows = rows[:len(rows) - len(rows) % self.page_size]
+        self._length = max(0, self._length + growth)
+
+        # Deepest page first, so the top pages are the last to be dropped
+        self._pages.clear()
+        for start in reversed(range(0, len(rows), self.page_size)):
+            self._pages[start // self.page_size] = rows[start:start + self.page_size]
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return True
+
+    def _count(self):
+        """Count the rows, noting the newest clip counted if count tells"""
+        counted = self.count()
+        if isinstance(counted, tuple):
+            self._length, self._newest_id = counted
+        else:
+            self._length, self._newest_id = counted, None
+
+    def _page(self, number: int) -> List[Dict]:
+        """Fetched page, most recently used last"""
+        page = self._pages.get(number)
+        if page is None:
+            previous = self._pages.get(number - 1)
+            if self.fetch_after and previous and len(previous) == self.page_size:
+                page = self.fetch_after(previous[-1], self.page_size)
+            else:
+                page = self.fetch(number * self.page_size, self.page_size)
+            self.fetches += 1
+            self._pages[number] = page
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(number)
+        return page
+
+
+class VirtualClipList:
+    """A Listbox that shows a window of a ClipPager's rows
+
+    The Listbox only ever holds the rows that fit on screen. Scrolling
+    moves the window and redraws those rows; the scrollbar shows the
+    position in the whole listing. The selection is kept as an index
+    into the listing, so it survives scrolling out of view.
+    """
+
+    def __init__(self, parent, format_row: Callable[[Dict], str],
+                 on_select: Optional[Callable[[], None]] = None, **options):
+        """Create the list and its scrollbar in column 0 and 1 of parent
+
+        Args:
+            parent: Containing widget, laid out with grid
+            format_row: Returns the text shown for a row
+            on_select: Called when the user selects a row
+            options: Passed on to tk.Listbox
+        """
+        self.format_row = format_row
+        self.on_select = on_select
+        self.pager = ClipPager.from_list([])
+        self.top = 0
+        self.selected: Optional[int] = None
+        self.visible_rows = options.get('height', 10)
+
+        self.scrollbar = ttk.Scrollbar(parent, command=self.yview)
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.listbox = tk.Listbox(parent, exportselection=False, **options)
+        self.listbox.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        # Listbox rows are a line of the font, plus one pixel and the
+        # selection border
+        font = tkfont.Font(root=self.listbox, font=self.listbox.cget('font'))
+        self._line_height = (font.metrics('linespace') + 1 +
+                             2 * self._pixels('selectborderwidth'))
+
+        self.listbox.bind('<<ListboxSelect>>', self._on_listbox_select)
+        self.listbox.bind('<Configure>', self._on_configure)
+        self.listbox.bind('<MouseWheel>', self._on_wheel)
+        self.listbox.bind('<Button-4>', lambda e: self._scroll_rows(-WHEEL_ROWS))
+        self.listbox.bind('<Button-5>', lambda e: self._scroll_rows(WHEEL_ROWS))
+        self.listbox.bind('<Up>', lambda e: self._move_selection(-1))
+        self.listbox.bind('<Down>', lambda e: self._move_selection(1))
+        self.listbox.bind('<Prior>', lambda e: self._move_selection(-self.visible_rows))
+        self.listbox.bind('<Next>', lambda e: self._move_selection(self.visible_rows))
+
+    def set_pager(self, pager: ClipPager, keep_position: bool = False):
+        """Show another listing
+
+        Args:
+            pager: Rows to show
+            keep_position: Keep the scroll position and selection (the
+                same listing, refreshed) instead of going to the top
+        """
+        self.pager = pager
+        if not keep_position:
+            self.top = 0
+            self.selected = None
+        elif self.selected is not None and self.selected >= len(pager):
+            self.selected = None
+        self._scroll_to(self.top, force=True)
+
+    def apply_deltas(self, deltas: Iterable):
+        """Patch the listing with history changes and redraw once
+
+        A list at the top shows the new rows; a scrolled list keeps its
+        rows in view. The selection follows its row, and is cleared if
+        the row was evicted.
+
+        Args:
+            deltas: ClipDelta-like objects (kind, clip_id, row), oldest first
+        """
+        deltas = list(deltas)
+        old_length = len(self.pager)
+        top = self.pager.get(self.top) if self.top else None
+        selected = self.selected_clip()
+        if not self.pager.apply_deltas(deltas):
+            return
+        growth = len(self.pager) - old_length
+
+        if top is not None:
+            index = self.pager.index_of(top['id'])
+            self.top = self.top + growth if index is None else index
+        if selected is not None:
+            evicted = {delta.clip_id for delta in deltas if delta.kind == 'evicted'}
+            index = self.pager.index_of(selected['id'])
+            if selected['id'] in evicted:
+                self.selected = None
+            else:
+                self.selected = self.selected + growth if index is None else index
+        self._scroll_to(self.top, force=True)
+
+    def selected_clip(self) -> Optional[Dict]:
+        """Row selected by the user, or None"""
+        if self.selected is None:
+            return None
+        return self.pager.get(self.selected)
+
+    def yview(self, *args):
+        """Scrollbar command: 'moveto' fraction or 'scroll' n units/pages"""
+        if args[0] == 'moveto':
+            self._scroll_to(round(float(args[1]) * len(self.pager)))
+        elif args[0] == 'scroll':
+            step = self.visible_rows if args[2] == 'pages' else 1
+            self._scroll_rows(int(args[1]) * step)
+
+    def render(self):
+        """Redraw the visible rows"""
+        rows = self.pager.rows(self.top, self.top + self.visible_rows)
+        self.listbox.delete(0, tk.END)
+        if rows:
+            self.listbox.insert(tk.END, *[self.format_row(row) for row in rows])
+        if self.selected is not None and self.top <= self.selected < self.top + len(rows):
+            self.listbox.selection_set(self.selected - self.top)
+
+        total = len(self.pager)
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + len(rows)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _scroll_to(self, top: int, force: bool = False):
+        """Show rows from index top, clamped to the listing"""
+        top = max(0, min(top, len(self.pager) - self.visible_rows))
+        if top != self.top or force:
+            self.top = top
+            self.render()
+
+    def _scroll_rows(self, rows: int) -> str:
+        self._scroll_to(self.top + rows)
+        return 'break'
+
+    def _on_wheel(self, event) -> str:
+        # Windows reports multiples of 120 per notch, macOS small deltas
+        notches = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_rows(-notches * WHEEL_ROWS)
+
+    def _move_selection(self, rows: int) -> str:
+        """Move the selection, scrolling it into view"""
+        if not len(self.pager):
+            return 'break'
+        current = self.top if self.selected is None else self.selected
+        self.selected = max(0, min(current + rows, len(self.pager) - 1))
+        if self.selected < self.top:
+            self._scroll_to(self.selected, force=True)
+        elif self.selected >= self.top + self.visible_rows:
+            self._scroll_to(self.selected - self.visible_rows + 1, force=True)
+        else:
+            self.render()
+        if self.on_select:
+            self.on_select()
+        return 'break'
+
+    def _on_listbox_select(self, event):
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        self.selected = self.top + selection[0]
+        if self.on_select:
+            self.on_select()
+
+    def _pixels(self, option: str) -> int:
+        """A distance option of the Listbox, in pixels"""
+        return self.listbox.winfo_pixels(self.listbox.cget(option))
+
+    def _on_configure(self, event):
+        """Fit the number of rendered rows to the new height"""
+        border = 2 * (self._pixels('borderwidth') + self._pixels('highlightthickness'))
+        rows = max(1, (event.height - border) // self._line_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self._scroll_to(self.top, force=True)
@@ -0,0 +1,39 @@
+"""
+Shared fixtures
+
+xvfb_display needs python-xlib and an Xvfb binary; it starts a private X
+server and skips the test when either is missing.
+"""
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture
+def xvfb_display():
+    """Start a private Xvfb server and return its display name"""
+    pytest.importorskip("Xlib")
+    if shutil.which("Xvfb") is None:
+        pytest.skip("Xvfb not installed")
+    
+    number = 90 + os.getpid() % 100
+    name = f":{number}"
+    proc = subprocess.Popen(
+        ["Xvfb", name, "-nolisten", "tcp"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    
+    socket_path = Path(f"/tmp/.X11-unix/X{number}")
+    deadline = time.time() + 5
+    while not socket_path.exists() and time.time() < deadline:
+        time.sleep(0.05)
+    
+    yield name
+    
+    proc.terminate()
+    proc.wait()
@@ -0,0 +1,251 @@
+"""
+Tests for the precompiled content classifier
+"""
+import random
+import re
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.classifier import (
+    LANGUAGE_PATTERNS, SENSITIVE_KEYWORDS, ContentClassifier, KeywordScanner
+)
+from src.content_analyzer import ContentAnalyzer
+
+
+class ReferenceClassifier:
+    """The content rules as ContentAnalyzer first had them
+
+    The golden oracle for ContentClassifier, which must give the same
+    answers. The rules are unchanged, slow and quadratic patterns included; the
+    bench_classifier.py benchmark times it too.
+    """
+
+    URL_PATTERN = ContentAnalyzer.URL_PATTERN
+
+    EMAIL_PATTERN = re.compile(
+        r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+    )
+
+    # Common code patterns
+    CODE_PATTERNS = [
+        re.compile(r'(def|class|function|var|let|const|import|from)\s+\w+'),
+        re.compile(r'[{}\[\]();].*[{}\[\]();]'),  # Multiple brackets/braces
+        re.compile(r'(if|for|while|switch|try|catch)\s*\('),
+        re.compile(r'=>|->|\|\||&&'),  # Arrow functions, logical operators
+    ]
+
+    # File path patterns
+    FILE_PATH_PATTERN = re.compile(
+        r'(?:[a-zA-Z]:\\|/)?(?:[\w\-]+[/\\])+[\w\-\.]+\.\w+'
+    )
+
+    # Credit card pattern (basic)
+    CREDIT_CARD_PATTERN = re.compile(
+        r'\b\d{4}[\s\-]?\d{4}[\s\-]?\d{4}[\s\-]?\d{4}\b'
+    )
+
+    # Password-like patterns
+    PASSWORD_PATTERN = re.compile(
+        r'(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[@$!%*?&])[A-Za-z\d@$!%*?&]{8,}'
+    )
+
+    SENSITIVE_KEYWORDS = [
+        'password', 'passwd', 'pwd', 'secret', 'token', 'api_key',
+        'apikey', 'private_key', 'privatekey', 'ssn', 'social security'
+    ]
+
+    def determine_type(self, content):
+        """Content type, as ContentClassifier.content_type must give it"""
+        if self.URL_PATTERN.search(content):
+            return 'url'
+        if self.EMAIL_PATTERN.search(content):
+            return 'email'
+        if self.is_code(content):
+            return 'code'
+        if self.FILE_PATH_PATTERN.search(content):
+            return 'file_path'
+        # Numbers (could be phone, ID, etc.)
+        if content.strip().replace('-', '').replace(' ', '').isdigit():
+            return 'number'
+        if self.is_json_like(content):
+            return 'json'
+        if self.is_markdown(content):
+            return 'markdown'
+        return 'text'
+
+    def is_code(self, content):
+        """Whether content looks like code"""
+        # If multiple patterns match, likely code
+        matches = sum(1 for pattern in self.CODE_PATTERNS if pattern.search(content))
+        if matches >= 2:
+            return True
+
+        # High density of special characters
+        special_chars = sum(1 for c in content if c in '{}[]();=<>+-*/%&|')
+        if len(content) > 0 and special_chars / len(content) > 0.1:
+            return True
+
+        return False
+
+    def is_json_like(self, content):
+        """Whether content looks like JSON"""
+        content = content.strip()
+        return (
+            (content.startswith('{') and content.endswith('}')) or
+            (content.startswith('[') and content.endswith(']'))
+        ) and '"' in content
+
+    def is_markdown(self, content):
+        """Whether content looks like Markdown"""
+        markdown_indicators = [
+            r'^#{1,6}\s',  # Headers
+            r'\*\*.*\*\*',  # Bold
+            r'\*.*\*',  # Italic
+            r'^\s*[-*+]\s',  # Lists
+            r'^\s*\d+\.\s',  # Numbered lists
+            r'\[.*\]\(.*\)',  # Links
+        ]
+
+        return any(re.search(pattern, content, re.MULTILINE)
+                   for pattern in markdown_indicators)
+
+    def is_sensitive(self, content):
+        """Whether content looks sensitive, as ContentClassifier.is_sensitive
+        must tell"""
+        if self.CREDIT_CARD_PATTERN.search(content):
+            return True
+        if self.PASSWORD_PATTERN.search(content):
+            return True
+
+        content_lower = content.lower()
+        return any(keyword in content_lower for keyword in self.SENSITIVE_KEYWORDS)
+
+
+# (content, content type, is sensitive) as given by ContentAnalyzer
+# before the classifier existed
+GOLDEN = [
+    ('https://www.example.com', 'url', False),
+    ('see http://x.io/a?b=1 now', 'url', False),
+    ('contact@example.com', 'email', False),
+    ('user@host', 'text', False),
+    ('def foo(bar):\n    return bar', 'code', False),
+    ('x = a && b', 'code', False),
+    ('if (x) { y(); }', 'code', False),
+    ('a -> b', 'code', False),
+    ('{}', 'code', False),
+    ('(a)', 'code', False),
+    ('/usr/local/bin/python3.11', 'code', False),
+    ('C:\\Users\\me\\file.txt', 'file_path', False),
+    ('src/app.py', 'file_path', False),
+    ('not/a path', 'text', False),
+    ('555-123-4567', 'code', False),
+    ('12 34', 'number', False),
+    ('{"a": 1}', 'code', False),
+    ('["x"]', 'code', False),
+    ('# Title\ntext', 'markdown', False),
+    ('some **bold** words', 'code', False),
+    ('an *it* word', 'code', False),
+    ('- item', 'code', False),
+    ('  1. first', 'markdown', False),
+    ('[link](http://x)', 'url', False),
+    ('x\n\n  - item', 'markdown', False),
+    ('[a] and (b)', 'code', False),
+    ('plain words here', 'text', False),
+    ('a * b\n* c', 'code', False),
+    ('4111 1111 1111 1111', 'number', True),
+    ('4111-1111-1111-1111', 'code', True),
+    ('Passw0rd!', 'text', True),
+    ('Abcdefg1!', 'text', True),
+    ('abcdefg1!', 'text', False),
+    ('Abc!\ndefgh1xyz', 'text', False),
+    ('xxxxxxxxAb1!', 'text', True),
+    ('my secret plan', 'text', True),
+    ('SOCIAL SECURITY', 'text', True),
+    ('api_key=abc', 'text', True),
+    ('Token', 'text', True),
+    ('ΑΒΓ δεζ 123', 'text', False),
+    ('naïve café', 'text', False),
+    ('*\n*', 'code', False),
+    ('a\u2028- b', 'code', False),
+    ('tab\t-\tthing', 'text', False),
+]
+
+
+def test_golden_outputs():
+    """Test the classifier against recorded outputs"""
+    classifier = ContentClassifier()
+    for content, content_type, sensitive in GOLDEN:
+        assert classifier.classify(content) == (content_type, sensitive), content
+
+
+def test_matches_reference_implementation():
+    """Test random clips against the reference classifier"""
+    reference = ReferenceClassifier()
+    classifier = ContentClassifier()
+    rng = random.Random(16)
+    pieces = ["word", "Abc", "x1", "!", "*", "-", "+", "#", " ", "  ", "\n", "\t",
+              "(", ")", "{", "}", "[", "]", ";", "=", "->", "&&", "/", "\\", ".",
+              "py", "@", "example.com", "http://", "1234", "5", "if", "def f",
+              "\"", "é", "\u2028", "\r", "\x1c", "\u0663", "Pa$$w0rd", "](", "C:\\",
+              "# ", "1. ", "-1234 ", "a.", "%", "x@", "@a.bc", "_", "ab", "é@x.io"]
+    for _ in range(5000):
+        content = ''.join(rng.choices(pieces, k=rng.randint(1, 25)))
+        expected = (reference.determine_type(content), reference.is_sensitive(content))
+        assert classifier.classify(content) == expected, repr(content)
+
+
+def test_linear_rewrites_match_original_patterns():
+    """Test the e-mail, link and language scans against the regexes they replace"""
+    classifier = ContentClassifier()
+    link = re.compile(r'\[.*\]\(.*\)')
+    rng = random.Random(18)
+    pieces = ["[", "]", "(", ")", "](", "\n", "a", " ", "@", "a.", "é", "_", "%",
+              "bc", "Z|", "-", "1", "def ", "xdef ", "std::", "end", "$x =", "<?php"]
+    for _ in range(5000):
+        content = ''.join(rng.choices(pieces, k=rng.randint(1, 20)))
+        emails = ReferenceClassifier.EMAIL_PATTERN.findall(content)
+        assert classifier.find_email(content) == (emails[0] if emails else None)
+        assert classifier._has_markdown_link(content) == bool(link.search(content))
+        expected = next((language for language, patterns in LANGUAGE_PATTERNS.items()
+                         if any(re.search(pattern, content) for pattern in patterns)), None)
+        assert classifier.detect_language(content) == expected
+
+
+def test_keyword_scanner_matches_lowercased_search():
+    """Test the chunked keyword scan against `in` on the lowercased text"""
+    keywords = SENSITIVE_KEYWORDS + ('pass', 'Straße', 'kK')
+    scanners = [KeywordScanner(keywords, chunk_size=size) for size in (1, 7, 64)]
+    assert [prefix for prefix, _ in scanners[0].groups] == [
+        'api', 'kk', 'pass', 'private', 'pwd', 'secret', 'social security',
+        'ssn', 'straße', 'token'
+    ]
+    rng = random.Random(20)
+    pieces = ["pass", "PASS", "word", "Wd", "p", "api_", "Key", "ssN", "s", "n",
+              "SECRET", "tok", "en", "social ", "security", "STRASSE", "straSSe",
+              "Straße", "\u212a", "k", "\u0130", "\u03a3", " ", "\n", "x"]
+    lowered = [keyword.lower() for keyword in keywords]
+    for _ in range(5000):
+        content = ''.join(rng.choices(pieces, k=rng.randint(0, 12)))
+        expected = any(keyword in content.lower() for keyword in lowered)
+        for scanner in scanners:
+            assert scanner.search(content) == expected, repr(content)
+    assert not KeywordScanner([]).search("password")
+
+
+def test_extra_sensitive_keywords():
+    """Test keywords added on top of the built-in ones"""
+    assert ContentClassifier(["Project Falcon"]).is_sensitive("re: PROJECT FALCON")
+    assert not ContentClassifier().is_sensitive("re: PROJECT FALCON")
+    assert ContentClassifier(["falcon"]).is_sensitive("my TOKEN")
+
+
+def test_detect_language():
+    """Test language detection for code clips"""
+    analyzer = ContentAnalyzer()
+    assert analyzer.analyze("def main():\n    pass")['metadata']['language'] == 'python'
+    assert analyzer.analyze("const f = (a) => a;")['metadata']['language'] == 'javascript'
+    assert analyzer.analyze("#include <stdio.h>\nint x;")['metadata']['language'] == 'cpp'
+    assert analyzer.analyze("<?php $x = 1; ?>")['metadata']['language'] == 'php'
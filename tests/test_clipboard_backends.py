@@ -0,0 +1,251 @@
+"""
+Tests for the clipboard backends
+
+The XlibBackend tests run against a private Xvfb server (the xvfb_display
+fixture from conftest.py) and are skipped when python-xlib or Xvfb is
+missing. Other clients are played by raw python-xlib connections.
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.clipboard_backends import ClipboardBackend, XlibBackend
+
+
+class MemoryBackend(ClipboardBackend):
+    """Clipboard backend recording what it is given"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self.copies = []
+
+    def paste(self):
+        return self.copies[-1] if self.copies else ""
+
+    def copy(self, content):
+        self.copies.append(content)
+
+
+class SelectionOwner:
+    """Another client owning the CLIPBOARD selection
+
+    Serves UTF8_STRING requests from a thread, with the INCR protocol in
+    chunks of incr_chunk bytes when data is longer than that.
+    """
+
+    def __init__(self, display_name, data, incr_chunk=None):
+        from Xlib import X, display
+
+        self.X = X
+        self.data = data
+        self.incr_chunk = incr_chunk
+        self.client = display.Display(display_name)
+        self.window = self.client.screen().root.create_window(
+            0, 0, 1, 1, 0, X.CopyFromParent
+        )
+        self.selection = self.client.intern_atom("CLIPBOARD")
+        self.utf8_string = self.client.intern_atom("UTF8_STRING")
+        self.incr = self.client.intern_atom("INCR")
+        self.requests = 0
+        self.running = True
+
+        self.window.set_selection_owner(self.selection, X.CurrentTime)
+        self.client.sync()
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.running = False
+        self.thread.join(timeout=2.0)
+        self.client.close()
+
+    def _next_event(self):
+        """Next event, or None once closed"""
+        while self.running:
+            if self.client.pending_events():
+                return self.client.next_event()
+            time.sleep(0.01)
+        return None
+
+    def _serve(self):
+        from Xlib.protocol import event as xevent
+
+        X = self.X
+        while True:
+            request = self._next_event()
+            if request is None:
+                return
+            if request.type != X.SelectionRequest:
+                continue
+            self.requests += 1
+
+            requestor, prop = request.requestor, request.property
+            incr = self.incr_chunk is not None and len(self.data) > self.incr_chunk
+            if request.target != self.utf8_string:
+                prop = X.NONE
+            elif incr:
+                # Announce the size, then send chunks as each is consumed
+                requestor.change_attributes(event_mask=X.PropertyChangeMask)
+                requestor.change_property(prop, self.incr, 32, [len(self.data)])
+            else:
+                requestor.change_property(prop, self.utf8_string, 8, self.data)
+
+            requestor.send_event(xevent.SelectionNotify(
+                time=request.time, requestor=requestor,
+                selection=request.selection, target=request.target,
+                property=prop
+            ), event_mask=0)
+            self.client.flush()
+
+            if incr and prop != X.NONE:
+                self._send_incr(requestor, prop)
+
+    def _send_incr(self, requestor, prop):
+        X = self.X
+        chunks = [self.data[i:i + self.incr_chunk]
+                  for i in range(0, len(self.data), self.incr_chunk)]
+        # The zero-length chunk ends the transfer
+        for chunk in chunks + [b""]:
+            while True:
+                event = self._next_event()
+                if event is None:
+                    return
+                if (event.type == X.PropertyNotify and event.atom == prop and
+                        event.state == X.PropertyDelete):
+                    break
+            requestor.change_property(prop, self.utf8_string, 8, chunk)
+            self.client.flush()
+
+
+def _convert_selection(display_name, target_name):
+    """Request the CLIPBOARD selection as target from a new client
+
+    Returns:
+        Tuple of (property value, property type name), or None if the
+        owner refused the conversion
+    """
+    from Xlib import X, display
+
+    client = display.Display(display_name)
+    try:
+        window = client.screen().root.create_window(0, 0, 1, 1, 0, X.CopyFromParent)
+        prop = client.intern_atom("TEST_SELECTION")
+        window.convert_selection(client.intern_atom("CLIPBOARD"),
+                                 client.intern_atom(target_name), prop, X.CurrentTime)
+        client.flush()
+
+        deadline = time.monotonic() + 2.0
+        while time.monotonic() < deadline:
+            if not client.pending_events():
+                time.sleep(0.01)
+                continue
+            event = client.next_event()
+            if event.type != X.SelectionNotify:
+                continue
+            if event.property == X.NONE:
+                return None
+            value = window.get_full_property(prop, X.AnyPropertyType)
+            return value.value, client.get_atom_name(value.property_type)
+        raise AssertionError("no SelectionNotify from the owner")
+    finally:
+        client.close()
+
+
+def _clipboard_owner(display_name):
+    """Window owning the CLIPBOARD selection, or X.NONE"""
+    from Xlib import display
+
+    client = display.Display(display_name)
+    try:
+        owner = client.get_selection_owner(client.intern_atom("CLIPBOARD"))
+        return owner if isinstance(owner, int) else owner.id
+    finally:
+        client.close()
+
+
+def _wait_for(predicate, timeout=2.0):
+    """Poll predicate until it is true or timeout seconds pass"""
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_copy_is_served_to_other_clients(xvfb_display):
+    """Test that copied text is pasted by another client, in each target"""
+    owner = XlibBackend(display_name=xvfb_display)
+    reader = XlibBackend(display_name=xvfb_display)
+    try:
+        owner.copy("café ✓")
+        assert reader.paste() == "café ✓"
+
+        assert _convert_selection(xvfb_display, "UTF8_STRING") == (
+            "café ✓".encode('utf-8'), "UTF8_STRING"
+        )
+        # STRING is Latin-1, with characters outside it replaced
+        assert _convert_selection(xvfb_display, "STRING") == (b"caf\xe9 ?", "STRING")
+
+        value, property_type = _convert_selection(xvfb_display, "TARGETS")
+        assert property_type == "ATOM"
+        assert set(value) == {owner.targets, owner.utf8_string, owner.text_targets[1]}
+
+        assert _convert_selection(xvfb_display, "image/png") is None
+    finally:
+        reader.close()
+        owner.close()
+
+
+def test_paste_reads_another_clients_selection(xvfb_display):
+    """Test paste() of a selection owned by another client"""
+    backend = XlibBackend(display_name=xvfb_display)
+    try:
+        backend.copy("ours")
+        other = SelectionOwner(xvfb_display, "theirs".encode('utf-8'))
+        try:
+            # Losing the selection drops our copy
+            assert _wait_for(lambda: backend._owned is None)
+            assert backend.paste() == "theirs"
+            assert other.requests == 1
+        finally:
+            other.close()
+    finally:
+        backend.close()
+
+
+def test_paste_reads_incr_transfers(xvfb_display):
+    """Test paste() of a selection sent in chunks with the INCR protocol"""
+    text = "".join(f"line {i} of a long clip\n" for i in range(2000))
+    other = SelectionOwner(xvfb_display, text.encode('utf-8'), incr_chunk=4096)
+    backend = XlibBackend(display_name=xvfb_display)
+    try:
+        assert backend.paste() == text
+    finally:
+        backend.close()
+        other.close()
+
+
+def test_oversized_copy_releases_the_selection(xvfb_display):
+    """Test that content too large to serve goes to the fallback backend"""
+    from Xlib import X
+
+    backend = XlibBackend(display_name=xvfb_display)
+    fallback = MemoryBackend()
+    backend._fallback = fallback
+    try:
+        backend.copy("small")
+        assert _clipboard_owner(xvfb_display) == backend.window.id
+
+        backend.max_write_size = 100
+        backend.copy("x" * 101)
+        assert fallback.copies == ["x" * 101]
+        assert backend._owned is None
+        assert _clipboard_owner(xvfb_display) == X.NONE
+        # The previous copy is not served any more
+        assert backend.paste() == ""
+    finally:
+        backend.close()
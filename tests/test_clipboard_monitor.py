@@ -0,0 +1,328 @@
+"""
+Tests for clipboard monitoring
+
+The selection watcher tests use the xvfb_display fixture from conftest.py
+and are skipped when python-xlib or Xvfb is missing.
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.clipboard_backends import ClipboardBackend
+from src.clipboard_monitor import (
+    AdaptivePollScheduler, ClipboardManager, ClipboardMonitor, SelectionWatcher
+)
+from src.config import Config
+from src.content_analyzer import ContentAnalyzer
+from src.storage import ClipboardStorage
+
+
+class MemoryBackend(ClipboardBackend):
+    """Clipboard backend holding content in memory"""
+    
+    name = 'memory'
+    
+    def __init__(self, content=""):
+        self.content = content
+    
+    def paste(self):
+        return self.content
+    
+    def copy(self, content):
+        self.content = content
+
+
+def _take_clipboard_ownership(display_name):
+    """Make a new client the owner of the CLIPBOARD selection"""
+    from Xlib import X, display
+    
+    client = display.Display(display_name)
+    window = client.screen().root.create_window(0, 0, 1, 1, 0, X.CopyFromParent)
+    window.set_selection_owner(client.intern_atom("CLIPBOARD"), X.CurrentTime)
+    client.sync()
+    return client
+
+
+def test_watcher_reports_owner_change(xvfb_display):
+    """Test that taking the selection wakes the watcher"""
+    watcher = SelectionWatcher(display_name=xvfb_display)
+    try:
+        assert watcher.wait(timeout=0.1) == False
+        
+        client = _take_clipboard_ownership(xvfb_display)
+        assert watcher.wait(timeout=2.0) == True
+        
+        # The notification is consumed once it has been reported
+        assert watcher.wait(timeout=0.1) == False
+        client.close()
+    finally:
+        watcher.close()
+
+
+def test_watcher_wake(xvfb_display):
+    """Test that wake() interrupts a blocking wait"""
+    watcher = SelectionWatcher(display_name=xvfb_display)
+    try:
+        watcher.wake()
+        start = time.time()
+        assert watcher.wait(timeout=5.0) == False
+        assert time.time() - start < 1.0
+    finally:
+        watcher.close()
+
+
+def test_auto_mode_falls_back_to_polling(monkeypatch):
+    """Test that auto mode polls when no X display is reachable"""
+    monkeypatch.setenv("DISPLAY", ":none")
+    monitor = ClipboardMonitor(callback=lambda content: None, mode='auto',
+                               backend=MemoryBackend())
+    assert monitor._create_watcher() is None
+
+
+def test_poll_mode_skips_watcher():
+    """Test that poll mode never connects to the X server"""
+    monitor = ClipboardMonitor(callback=lambda content: None, mode='poll',
+                               backend=MemoryBackend())
+    assert monitor._create_watcher() is None
+
+
+def test_check_clipboard_reports_changes_once():
+    """Test that a change is reported once and our own writes are not"""
+    seen = []
+    backend = MemoryBackend()
+    monitor = ClipboardMonitor(callback=seen.append, mode='poll', backend=backend)
+    
+    backend.content = "first"
+    monitor._check_clipboard()
+    monitor._check_clipboard()
+    assert seen == ["first"]
+    
+    monitor.set_clipboard("from history")
+    monitor._check_clipboard()
+    assert seen == ["first"]
+    assert backend.content == "from history"
+
+
+class BrokenWatcher:
+    """Selection watcher whose X connection fails"""
+    
+    closed = False
+    
+    def wait(self, timeout=None):
+        raise ConnectionError("X connection lost")
+    
+    def wake(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+
+
+def test_failed_watcher_falls_back_to_polling(monkeypatch):
+    """Test that monitoring goes on when the selection watcher fails"""
+    seen = []
+    backend = MemoryBackend("before")
+    watcher = BrokenWatcher()
+    monitor = ClipboardMonitor(callback=seen.append, interval=0.01, backend=backend)
+    monkeypatch.setattr(monitor, '_create_watcher', lambda: watcher)
+    monitor.start()
+    assert monitor.active_mode == 'event'
+    
+    backend.content = "after"
+    deadline = time.monotonic() + 2.0
+    while not seen and time.monotonic() < deadline:
+        time.sleep(0.01)
+    monitor.stop()
+    
+    assert seen == ["after"]
+    assert watcher.closed
+    assert monitor.active_mode == 'poll'
+
+
+def test_scheduler_backs_off_and_tightens():
+    """Test the adaptive poll interval"""
+    scheduler = AdaptivePollScheduler(
+        base_interval=0.5, min_interval=0.1, max_interval=2.0, backoff=2.0
+    )
+    
+    scheduler.on_idle()
+    assert scheduler.interval == 1.0
+    for _ in range(10):
+        scheduler.on_idle()
+    assert scheduler.interval == 2.0
+    
+    scheduler.on_change()
+    assert scheduler.interval == 0.1
+    
+    scheduler.on_idle()
+    scheduler.reset()
+    assert scheduler.interval == 0.5
+
+
+def test_idle_polling_wakes_less_often():
+    """Test that an idle clipboard is polled at a decreasing rate"""
+    scheduler = AdaptivePollScheduler(
+        base_interval=0.01, min_interval=0.01, max_interval=0.2, backoff=2.0
+    )
+    monitor = ClipboardMonitor(callback=lambda content: None, mode='poll',
+                               backend=MemoryBackend("idle"),
+                               scheduler=scheduler)
+    monitor.start()
+    time.sleep(0.5)
+    monitor.stop()
+    
+    stats = monitor.get_stats()
+    assert stats['mode'] == 'poll'
+    assert stats['interval'] == 0.2
+    # A fixed 10ms interval would have woken about 50 times
+    assert stats['wakeups'] < 15
+
+
+def test_activity_during_a_poll_is_not_lost():
+    """Test that notify_activity() while reading cuts the next sleep short"""
+    class NotifyingBackend(MemoryBackend):
+        reads = 0
+        
+        def paste(self):
+            self.reads += 1
+            if self.reads == 2:
+                monitor.notify_activity()
+            return self.content
+    
+    backend = NotifyingBackend("idle")
+    monitor = ClipboardMonitor(callback=lambda content: None, interval=5.0,
+                               mode='poll', backend=backend)
+    monitor.start()
+    deadline = time.monotonic() + 2.0
+    while backend.reads < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    monitor.stop()
+    
+    assert backend.reads >= 3
+
+
+def test_manager_rejects_clips_before_analysis(tmp_path, monkeypatch):
+    """Test that each cheap rejection skips analysis and storage"""
+    config = Config(str(tmp_path / "config.json"))
+    config.config['max_content_size'] = 100
+    config.config['excluded_apps'] = ['keepassxc']
+    storage = ClipboardStorage(str(tmp_path / "clipboard.db"))
+    analyzer = ContentAnalyzer()
+    manager = ClipboardManager(storage, analyzer, config, backend=MemoryBackend())
+    
+    analyzed = []
+    analyze = analyzer.analyze
+    monkeypatch.setattr(analyzer, 'analyze',
+                        lambda content, **kwargs: analyzed.append(content) or analyze(content, **kwargs))
+    app = ['editor']
+    monkeypatch.setattr(manager.app_detector, 'get_active_app', lambda: app[0])
+    
+    def run_stages(item):
+        # Run the ingest stages on this thread, so each clip is done
+        # before the next is captured
+        for stage in manager.pipeline.stages:
+            item = stage.func(item)
+            if item is None:
+                break
+        return True
+    monkeypatch.setattr(manager.pipeline, 'submit', run_stages)
+    
+    for content in ["first", "", " \n ", "x" * 101, "first", "second"]:
+        manager._on_clipboard_change(content)
+    app[0] = 'keepassxc'
+    manager._on_clipboard_change("hunter2")
+    app[0] = 'editor'
+    manager._on_clipboard_change("my password is hunter2")
+    # Back to an older clip: stored again, so it becomes the newest
+    manager._on_clipboard_change("first")
+    
+    assert analyzed == ["first", "second", "my password is hunter2", "first"]
+    assert [clip['content'] for clip in storage.get_history()] == ["first", "second"]
+    assert manager.get_stats()['rejected'] == {
+        'empty': 2, 'too_large': 1, 'excluded_app': 1, 'unchanged': 1, 'sensitive': 1
+    }
+    storage.close()
+
+
+def test_manager_reads_the_app_when_the_clip_is_captured(tmp_path, monkeypatch):
+    """Test that a backlog does not credit clips to a window focused later"""
+    config = Config(str(tmp_path / "config.json"))
+    config.config['excluded_apps'] = ['keepassxc']
+    storage = ClipboardStorage(str(tmp_path / "clipboard.db"))
+    manager = ClipboardManager(storage, ContentAnalyzer(), config, backend=MemoryBackend())
+    app = ['keepassxc']
+    monkeypatch.setattr(manager.app_detector, 'get_active_app', lambda: app[0])
+    backlog = []
+    monkeypatch.setattr(manager.pipeline, 'submit', backlog.append)
+    
+    manager._on_clipboard_change("vault entry")
+    app[0] = 'editor'
+    manager._on_clipboard_change("some notes")
+    app[0] = 'terminal'
+    
+    # The stages only run once the user has moved on
+    for item in backlog:
+        for stage in manager.pipeline.stages:
+            item = stage.func(item)
+            if item is None:
+                break
+    
+    assert [(clip['content'], clip['app_name']) for clip in storage.get_history()] == [
+        ("some notes", 'editor')
+    ]
+    assert manager.rejected['excluded_app'] == 1
+    storage.close()
+
+
+def test_slow_app_detection_does_not_block_capture(tmp_path, monkeypatch):
+    """Test that capture only waits briefly for the active app"""
+    config = Config(str(tmp_path / "config.json"))
+    config.config['excluded_apps'] = ['keepassxc']
+    storage = ClipboardStorage(str(tmp_path / "clipboard.db"))
+    manager = ClipboardManager(storage, ContentAnalyzer(), config, backend=MemoryBackend())
+    apps = iter(['keepassxc', 'editor'])
+    
+    def get_active_app():
+        app_name = next(apps)
+        time.sleep(0.3)
+        return app_name
+    monkeypatch.setattr(manager.app_detector, 'get_active_app', get_active_app)
+    backlog = []
+    monkeypatch.setattr(manager.pipeline, 'submit', backlog.append)
+    
+    start = time.monotonic()
+    manager._on_clipboard_change("vault entry")
+    manager._on_clipboard_change("some notes")
+    assert time.monotonic() - start < 0.3
+    
+    for item in backlog:
+        for stage in manager.pipeline.stages:
+            item = stage.func(item)
+            if item is None:
+                break
+    
+    assert [(clip['content'], clip['app_name']) for clip in storage.get_history()] == [
+        ("some notes", 'editor')
+    ]
+    assert manager.rejected['excluded_app'] == 1
+    storage.close()
+
+
+def test_copy_to_clipboard_reports_backend_errors(tmp_path):
+    """Test that a failed copy is logged and reported, not raised"""
+    class FailingBackend(MemoryBackend):
+        def copy(self, content):
+            raise RuntimeError("Could not take ownership of the clipboard")
+    
+    config = Config(str(tmp_path / "config.json"))
+    storage = ClipboardStorage(str(tmp_path / "clipboard.db"))
+    manager = ClipboardManager(storage, ContentAnalyzer(), config, backend=FailingBackend())
+    assert manager.copy_to_clipboard("text") is False
+    
+    manager.backend = MemoryBackend()
+    assert manager.copy_to_clipboard("text") is True
+    assert manager.backend.content == "text"
+    storage.close()
@@ -7,7 +7,8 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.content_analyzer import ContentAnalyzer
+from src.content_analyzer import SENSITIVE_CHUNK_CHARS, ContentAnalyzer
+from src.storage import ClipboardStorage, fingerprint
 
 
 def test_url_detection():
@@ -92,6 +93,155 @@ This is **bold** text
     assert result['content_type'] == 'markdown'
 
 
+def test_analysis_cache():
+    """Test that repeat content is answered from a bounded cache"""
+    analyzer = ContentAnalyzer(cache_size=2)
+    url = "https://www.example.com"
+    
+    first = analyzer.analyze(url, content_fp=fingerprint(url))
+    first['metadata']['domain'] = 'changed'
+    assert analyzer.analyze(url, content_fp=fingerprint(url)) == analyzer.analyze(url)
+    assert analyzer.get_stats() == {'size': 1, 'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+    
+    # Least recently used entries are evicted
+    for text in ("one", "two", url, "three"):
+        analyzer.analyze(text, content_fp=fingerprint(text))
+    stats = analyzer.get_stats()
+    assert stats['size'] == 2
+    assert stats['hits'] == 1
+    assert analyzer.analyze(url, content_fp=fingerprint(url))['content_type'] == 'url'
+    assert analyzer.get_stats()['hits'] == 2
+    
+    disabled = ContentAnalyzer(cache_size=0)
+    disabled.analyze(url, content_fp=fingerprint(url))
+    assert disabled.get_stats()['size'] == 0
+
+
+def test_cached_analyses_follow_analyzer_upgrades(tmp_path):
+    """Test warm-loaded analyses are only reused under the same rules"""
+    db_path = str(tmp_path / "clipboard.db")
+    clip = "contact me at someone@example.com"
+    
+    def ingest(analyzer, storage, content):
+        content_fp = fingerprint(content)
+        analysis = analyzer.analyze(content, content_fp=content_fp)
+        storage.save_clip(content, analysis['content_type'],
+                          metadata=analysis['metadata'], content_fp=content_fp)
+        return analysis
+    
+    storage = ClipboardStorage(db_path)
+    analyzer = ContentAnalyzer()
+    analyzer.warm_cache(storage.load_analyses(analyzer.rules_version, analyzer.cache_size))
+    expected = ingest(analyzer, storage, clip)
+    storage.close()
+    
+    # Restart: a repeat copy is served from the warm cache
+    storage = ClipboardStorage(db_path)
+    analyzer = ContentAnalyzer()
+    analyzer.warm_cache(storage.load_analyses(analyzer.rules_version, analyzer.cache_size))
+    assert ingest(analyzer, storage, clip) == expected
+    assert analyzer.get_stats()['hits'] == 1
+    storage.close()
+    
+    class UpgradedAnalyzer(ContentAnalyzer):
+        VERSION = ContentAnalyzer.VERSION + 1
+        
+        def _extract_metadata(self, content, content_type):
+            metadata = super()._extract_metadata(content, content_type)
+            metadata['upgraded'] = True
+            return metadata
+    
+    # After an upgrade the stored analysis is ignored and redone
+    storage = ClipboardStorage(db_path)
+    upgraded = UpgradedAnalyzer()
+    upgraded.warm_cache(storage.load_analyses(upgraded.rules_version, upgraded.cache_size))
+    assert ingest(upgraded, storage, clip)['metadata']['upgraded'] is True
+    assert upgraded.get_stats()['hits'] == 0
+    storage.close()
+    
+    # A new keyword can make a stored clip sensitive, so it also
+    # invalidates stored analyses
+    storage = ClipboardStorage(db_path)
+    strict = ContentAnalyzer(sensitive_keywords=["SomeOne"])
+    strict.warm_cache(storage.load_analyses(strict.rules_version, strict.cache_size))
+    assert strict.analyze(clip, content_fp=fingerprint(clip))['is_sensitive'] is True
+    assert ContentAnalyzer(sensitive_keywords=["someone"]).rules_version == strict.rules_version
+    storage.close()
+
+
+def test_large_clips_are_sampled():
+    """Test that clips past the exact limit are analyzed from windows"""
+    prose = "Plain words about the clipboard history. " * 1000
+    middle = len(prose) // 2
+    with_url = prose[:middle] + " https://example.com/page " + prose[middle:]
+    
+    exact = ContentAnalyzer(exact_limit=len(with_url))
+    result = exact.analyze(with_url)
+    assert result['content_type'] == 'url'
+    assert 'approximate' not in result['metadata']
+    
+    # Given enough time, every window is looked at
+    sampled = ContentAnalyzer(exact_limit=1000, time_budget=10.0)
+    result = sampled.analyze(with_url)
+    assert result['content_type'] == 'url'
+    assert result['metadata']['domain'] == 'example.com'
+    assert result['metadata']['approximate'] is True
+    assert result['metadata']['length'] == len(with_url)
+    assert result['metadata']['lines'] == 1
+    assert abs(result['metadata']['words'] - len(with_url.split())) < 100
+    secret = prose[:middle] + " my secret token " + prose[middle:]
+    assert sampled.analyze(secret)['is_sensitive'] is True
+    
+    # Without any budget only the first and last window count
+    hurried = ContentAnalyzer(exact_limit=1000, time_budget=0.0)
+    assert hurried.analyze(with_url)['content_type'] == 'text'
+    assert hurried.analyze("4111 1111 1111 1111 " + prose)['is_sensitive'] is True
+    assert hurried.analyze('{"items": ["' + prose + '"]}')['content_type'] == 'json'
+
+
+def test_large_clips_are_checked_for_secrets_in_full():
+    """Test that sensitive content outside the sampled windows is found"""
+    prose = "Plain words about the clipboard history.\n" * 25000
+    thorough = ContentAnalyzer(exact_limit=1000, time_budget=10.0)
+    assert thorough.analyze(prose)['is_sensitive'] is False
+    for fraction in (0.1, 0.3, 0.37, 0.61, 0.9):
+        at = int(len(prose) * fraction)
+        for secret in (" password ", " SECRET=", " 4111 1111 1111 1111 ", "\nAbcdef1!\n"):
+            content = prose[:at] + secret + prose[at:]
+            assert thorough.analyze(content)['is_sensitive'] is True, (fraction, secret)
+    
+    # A card number across the end of the first chunk
+    filler = ("a" * 99 + "\n") * (SENSITIVE_CHUNK_CHARS // 100)
+    filler += " " * (SENSITIVE_CHUNK_CHARS - len(filler))
+    content = filler + "4111\n1111 1111 1111\n" + prose
+    assert thorough.analyze(content)['is_sensitive'] is True
+    
+    # Lines longer than a chunk are split, but a password on them is found
+    line = "Abcdefgh" + " plain words" * 20000
+    assert thorough.analyze(line)['is_sensitive'] is False
+    assert thorough.analyze(line + " 1!")['is_sensitive'] is True
+
+
+def test_large_clips_not_checked_in_time_count_as_sensitive():
+    """Test that running out of budget gives the conservative verdict"""
+    prose = "Plain words about the clipboard history.\n" * 25000
+    hurried = ContentAnalyzer(exact_limit=1000, time_budget=0.0)
+    assert hurried.analyze(prose)['is_sensitive'] is True
+    # Clips that fit in one chunk are always checked in full
+    short = prose[:SENSITIVE_CHUNK_CHARS // 2]
+    assert hurried.analyze(short)['is_sensitive'] is False
+
+
+def test_sample_windows_cover_the_clip_once():
+    """Test the window order: first, last, then the middle coarse to fine"""
+    content = ''.join(chr(ord('a') + i % 26) * 10 for i in range(100))
+    windows = list(ContentAnalyzer._sample_windows(content, 10))
+    assert windows[0] == content[:10]
+    assert windows[1] == content[-10:]
+    assert windows[2] == content[500:510]
+    assert sorted(windows) == sorted(content[i:i + 10] for i in range(0, 1000, 10))
+
+
 if __name__ == "__main__":
     # Run tests
     test_url_detection()
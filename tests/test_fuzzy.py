@@ -0,0 +1,119 @@
+"""
+Tests for the in-memory fuzzy matcher
+"""
+import random
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.fuzzy import FuzzyIndex
+
+
+def _ids(index, query, **kwargs):
+    return [clip_id for clip_id, _ in index.search(query, **kwargs)]
+
+
+def test_subsequence_terms_in_any_order():
+    """Test that terms match as subsequences, in any order"""
+    index = FuzzyIndex()
+    index.load([(1, "git commit -m 'fix build'"), (2, "git checkout main"),
+                (3, "Commit message draft")])
+
+    assert _ids(index, "gtcmt") == [1]
+    assert set(_ids(index, "cmt")) == {1, 3}
+    assert _ids(index, "main git") == [2]
+    assert _ids(index, "GIT COMMIT") == [1]
+    assert _ids(index, "tmc") == []
+    assert _ids(index, "   ") == []
+
+
+def test_compact_and_word_start_matches_rank_first():
+    """Test that tighter matches and matches at word starts score higher"""
+    index = FuzzyIndex()
+    index.load([(1, "a_big_house"), (2, "abhouse"), (3, "xabh")])
+
+    # Exact at a word start, then exact inside a word, then with gaps
+    assert _ids(index, "abh") == [2, 3, 1]
+    scores = dict(index.search("abh"))
+    assert scores[2] > scores[3] > scores[1]
+
+
+def test_ties_go_to_most_recent():
+    """Test that equal scores are ordered newest first, including touches"""
+    index = FuzzyIndex()
+    index.load([(1, "copy one"), (2, "copy two"), (3, "copy three")])
+    assert _ids(index, "copy") == [3, 2, 1]
+
+    index.touch(1)
+    assert _ids(index, "copy") == [1, 3, 2]
+    assert _ids(index, "copy", limit=2) == [1, 3]
+
+
+def test_incremental_updates():
+    """Test add, re-add, remove and eviction of the oldest entries"""
+    index = FuzzyIndex(max_entries=3, segment_size=2)
+    for clip_id, text in enumerate(["alpha", "beta", "gamma", "delta"], 1):
+        index.add(clip_id, text)
+
+    assert len(index) == 3
+    assert 1 not in index
+    assert _ids(index, "alpha") == []
+
+    index.add(2, "beta renamed")
+    assert _ids(index, "renamed") == [2]
+
+    index.remove([3, 99])
+    assert _ids(index, "gamma") == []
+    assert _ids(index, "a") == [2, 4]
+
+    index.clear()
+    assert len(index) == 0
+    assert _ids(index, "a") == []
+
+
+def test_within_ids_and_unusual_characters():
+    """Test restricting the candidates, and non-Latin-1 text"""
+    index = FuzzyIndex()
+    index.load([(1, "naïve café"), (2, "日本語のテキスト"), (3, "what? why?"),
+                (4, "line one\nline two")])
+
+    assert _ids(index, "nvcf") == [1]
+    assert _ids(index, "日語") == [2]
+    # Characters outside Latin-1 share a mask slot with '?'
+    assert _ids(index, "??") == [3]
+    assert _ids(index, "one two") == [4]
+    assert _ids(index, "e", within_ids=[1, 3]) == [1]
+
+
+def test_pruned_search_matches_exhaustive_scoring():
+    """Test that segment pruning never changes the result"""
+    rng = random.Random(7)
+    words = ["git", "commit", "push", "origin", "main", "history", "index",
+             "https://example.com/api", "get_user_by_id", "clipboard"]
+    texts = [" ".join(rng.choices(words, k=rng.randint(1, 6))) for _ in range(2000)]
+    index = FuzzyIndex(segment_size=64)
+    index.load(enumerate(texts))
+
+    def exhaustive(query, limit):
+        scored = []
+        for clip_id, text in enumerate(texts):
+            total = 0
+            for term in query.split():
+                score = FuzzyIndex._score(
+                    text, text[::-1], term,
+                    FuzzyIndex._compile(term).search,
+                    FuzzyIndex._compile(term[::-1]).match
+                )
+                if score is None:
+                    break
+                total += score
+            else:
+                scored.append((total, clip_id))
+        scored.sort(reverse=True)
+        return [(clip_id, score) for score, clip_id in scored[:limit]]
+
+    for query in ["gtcmt", "main origin", "hstry", "getusr", "i", "pshmn git"]:
+        for limit in (1, 10, 50):
+            assert index.search(query, limit) == exhaustive(query, limit)
@@ -0,0 +1,124 @@
+"""
+Tests for the ingest pipeline
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.ingest_pipeline import IngestPipeline
+
+
+def _blocked_pipeline(policy, max_queue=2):
+    """Build a two-stage pipeline whose first stage waits on an event"""
+    release = threading.Event()
+    results = []
+    
+    def first(item):
+        release.wait(5)
+        return item
+    
+    pipeline = IngestPipeline(
+        [('first', first), ('collect', results.append)],
+        max_queue=max_queue,
+        policy=policy,
+        block_timeout=0.05
+    )
+    return pipeline, release, results
+
+
+def _fill(pipeline, count):
+    """Submit items once the first stage is busy with item 0"""
+    pipeline.submit(0)
+    # Wait until the worker has taken item 0 so the queue is empty
+    stage = pipeline.stages[0]
+    while stage.get_stats()['queue_depth']:
+        time.sleep(0.001)
+    return [pipeline.submit(i) for i in range(1, count)]
+
+
+def test_items_flow_through_stages_in_order():
+    """Test that every stage sees every item, in order"""
+    results = []
+    pipeline = IngestPipeline([
+        ('double', lambda x: x * 2),
+        ('skip_odd_inputs', lambda x: x if x % 4 == 0 else None),
+        ('collect', results.append),
+    ])
+    pipeline.start()
+    for i in range(10):
+        pipeline.submit(i)
+    pipeline.stop()
+    
+    assert results == [0, 4, 8, 12, 16]
+    stats = pipeline.get_stats()
+    assert stats['double']['processed'] == 10
+    assert stats['collect']['processed'] == 5
+
+
+def test_coalesce_keeps_latest_item():
+    """Test that a full queue replaces its newest item"""
+    pipeline, release, results = _blocked_pipeline('coalesce')
+    pipeline.start()
+    accepted = _fill(pipeline, 6)
+    release.set()
+    pipeline.stop()
+    
+    assert all(accepted)
+    assert results == [0, 1, 5]
+    assert pipeline.get_stats()['first']['coalesced'] == 3
+
+
+def test_drop_newest_rejects_incoming():
+    """Test that a full queue rejects new items"""
+    pipeline, release, results = _blocked_pipeline('drop_newest')
+    pipeline.start()
+    accepted = _fill(pipeline, 5)
+    release.set()
+    pipeline.stop()
+    
+    assert accepted == [True, True, False, False]
+    assert results == [0, 1, 2]
+    assert pipeline.get_stats()['first']['dropped'] == 2
+
+
+def test_drop_oldest_discards_waiting():
+    """Test that a full queue discards its oldest item"""
+    pipeline, release, results = _blocked_pipeline('drop_oldest')
+    pipeline.start()
+    _fill(pipeline, 5)
+    release.set()
+    pipeline.stop()
+    
+    assert results == [0, 3, 4]
+
+
+def test_block_times_out_when_full():
+    """Test that the block policy applies backpressure with a timeout"""
+    pipeline, release, results = _blocked_pipeline('block', max_queue=1)
+    pipeline.start()
+    accepted = _fill(pipeline, 3)
+    release.set()
+    pipeline.stop()
+    
+    assert accepted == [True, False]
+    assert results == [0, 1]
+
+
+def test_stage_errors_are_counted():
+    """Test that a failing stage does not stop the pipeline"""
+    results = []
+    pipeline = IngestPipeline([
+        ('invert', lambda x: 1 / x),
+        ('collect', results.append),
+    ])
+    pipeline.start()
+    for i in (1, 0, 2):
+        pipeline.submit(i)
+    pipeline.stop()
+    
+    assert results == [1.0, 0.5]
+    assert pipeline.get_stats()['invert']['errors'] == 1
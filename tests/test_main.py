@@ -0,0 +1,21 @@
+"""
+Tests for the application entry point
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+
+def test_entry_point_defers_heavy_imports():
+    """Test that monitoring does not wait for Tk, pynput or multiprocessing"""
+    result = subprocess.run(
+        [sys.executable, '-c',
+         "import sys, src.__main__; "
+         "print(' '.join(sorted(name for name in sys.modules if name.split('.')[0] in "
+         "('tkinter', 'pynput', 'pyperclip', 'multiprocessing') or "
+         "name in ('src.ui', 'src.hotkey_handler', 'src.reanalyze'))))"],
+        cwd=str(ROOT), capture_output=True, text=True, check=True
+    )
+    assert result.stdout.split() == []
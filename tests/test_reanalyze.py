@@ -0,0 +1,82 @@
+"""
+Tests for batch re-classification of stored clips
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.content_analyzer import ContentAnalyzer
+from src.reanalyze import reanalyze
+from src.storage import ClipboardStorage
+
+
+CLIPS = [
+    ("https://example.com/docs", 'url'),
+    ("def main():\n    return 0", 'code'),
+    ("plain words", 'text'),
+    ("contact@example.com", 'email'),
+    ("my api_key is abc", 'text'),
+    ("x = a && b " * 10000, 'code'),
+]
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """Storage holding CLIPS, all stored as 'text' by older rules"""
+    storage = ClipboardStorage(str(tmp_path / "clipboard.db"), blob_threshold=1000)
+    for content, _ in CLIPS:
+        storage.save_clip(content, 'text')
+    yield storage
+    storage.close()
+
+
+def _types(storage):
+    """Stored content types, oldest clip first"""
+    return [content_type for _, _, content_type, _ in storage.get_contents_after(0, 100)]
+
+
+def test_reanalyze_updates_stored_types(storage):
+    """Test that every clip gets the current analysis, large ones included"""
+    reports = []
+    stats = reanalyze(storage, workers=1, chunk_size=4,
+                      progress=lambda done, total: reports.append((done, total)))
+
+    assert _types(storage) == [content_type for _, content_type in CLIPS]
+    assert stats['analyzed'] == 6
+    assert stats['changed'] == 4
+    assert stats['sensitive'] == 1
+    assert reports == [(4, 6), (6, 6)]
+    # Stored analyses now all count as made by the current rules
+    version = ContentAnalyzer().rules_version
+    assert len(storage.load_analyses(version, 100)) == 6
+
+
+def test_reanalyze_resumes_after_interruption(storage):
+    """Test that an interrupted run continues after the last stored chunk"""
+    def interrupt(done, total):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        reanalyze(storage, workers=1, chunk_size=2, progress=interrupt)
+    assert _types(storage)[:3] == ['url', 'code', 'text']
+
+    stats = reanalyze(storage, workers=1, chunk_size=2)
+    assert stats['analyzed'] == 4
+    assert _types(storage) == [content_type for _, content_type in CLIPS]
+
+    # New rules start over
+    stats = reanalyze(storage, sensitive_keywords=["plain"], workers=1)
+    assert stats['resumed_after'] == 0
+    assert stats['sensitive'] == 2
+
+
+def test_process_pool_matches_single_process(storage):
+    """Test that worker processes store the same analyses, in order"""
+    stats = reanalyze(storage, workers=2, chunk_size=1)
+
+    assert stats['analyzed'] == 6
+    assert _types(storage) == [content_type for _, content_type in CLIPS]
@@ -0,0 +1,137 @@
+"""
+Tests for the search-as-you-type engine
+"""
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.search_engine import SearchEngine
+from src.storage import ClipboardStorage, SearchCancelled
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """Storage with a few searchable clips"""
+    storage = ClipboardStorage(str(tmp_path / "search.db"))
+    for content in ["deploy the service", "deployment notes", "history page",
+                    "historical data", "unrelated clip"]:
+        storage.save_clip(content)
+    yield storage
+    storage.close()
+
+
+@pytest.fixture
+def engine(storage):
+    """Running engine with a short debounce"""
+    engine = SearchEngine(storage, debounce=0.05)
+    engine.start()
+    yield engine
+    engine.stop()
+
+
+def _wait_result(engine, timeout=2.0):
+    """Poll like the UI does until a result arrives"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = engine.get_result()
+        if result is not None:
+            return result
+        time.sleep(0.01)
+    raise AssertionError("no search result delivered")
+
+
+def _contents(result):
+    return sorted(clip['preview'] for clip in result.clips)
+
+
+def test_debounce_runs_only_last_query(engine):
+    """Test that rapid keystrokes only run the final query"""
+    for text in ["h", "hi", "his", "hist"]:
+        engine.submit(text)
+    
+    result = _wait_result(engine)
+    assert result.query == "hist"
+    assert _contents(result) == ["historical data", "history page"]
+    assert engine.executed == 1
+    
+    time.sleep(0.1)
+    assert engine.get_result() is None
+
+
+def test_cache_hit_until_next_commit(engine, storage):
+    """Test that repeated queries are served from the cache"""
+    engine.submit("deploy")
+    first = _wait_result(engine)
+    assert first.source == 'index'
+    
+    engine.submit("deploy")
+    cached = engine.get_result()
+    assert cached.source == 'cache'
+    assert cached.clips == first.clips
+    
+    storage.save_clip("deploy again")
+    engine.submit("deploy")
+    fresh = _wait_result(engine)
+    assert fresh.source == 'index'
+    assert "deploy again" in _contents(fresh)
+
+
+def test_prefix_refinement(engine, storage):
+    """Test that extending a query reuses the previous result set"""
+    engine.submit("dep")
+    assert _contents(_wait_result(engine)) == ["deploy the service", "deployment notes"]
+    
+    engine.submit("deploym")
+    refined = _wait_result(engine)
+    assert refined.source == 'refined'
+    assert _contents(refined) == ["deployment notes"]
+    
+    # A refinement without matches falls back to a full search
+    engine.submit("deploymx")
+    assert _wait_result(engine).clips == []
+    assert engine.get_stats()['refined'] == 2
+
+
+def test_storage_prefix_search(storage):
+    """Test literal prefix matching used while typing"""
+    results = storage.search("histor", prefix=True)
+    assert sorted(clip['content'] for clip in results) == ["historical data", "history page"]
+    assert storage.search("histor") == []
+    # FTS syntax characters are taken literally
+    assert storage.search('page"', prefix=True)[0]['content'] == "history page"
+
+
+def test_search_can_be_cancelled(storage):
+    """Test that should_cancel aborts a running query"""
+    storage.conn.executemany(
+        "INSERT INTO clipboard_history (content_fp, content) VALUES (?, ?)",
+        [(-i - 1, f"bulk clip number {i}") for i in range(2000)]
+    )
+    storage.conn.commit()
+    
+    with pytest.raises(SearchCancelled):
+        storage.search("clip", should_cancel=lambda: True)
+    
+    # The connection is usable afterwards
+    assert len(storage.search("clip", limit=5)) == 5
+
+
+def test_fuzzy_mode(storage):
+    """Test that fuzzy mode matches subsequences and refines like words"""
+    engine = SearchEngine(storage, debounce=0.01, fuzzy=True)
+    engine.start()
+    try:
+        engine.submit("dply")
+        assert _contents(_wait_result(engine)) == ["deploy the service", "deployment notes"]
+        
+        engine.submit("dplymnt")
+        refined = _wait_result(engine)
+        assert refined.source == 'refined'
+        assert _contents(refined) == ["deployment notes"]
+    finally:
+        engine.stop()
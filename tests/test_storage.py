@@ -0,0 +1,781 @@
+"""
+Tests for ClipboardStorage
+"""
+import hashlib
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.storage import (
+    BLOB_PREFIX_LENGTH, BLOB_THRESHOLD, LISTING_COLUMNS, PREVIEW_LENGTH,
+    SCHEMA_VERSION, ClipboardStorage, UPSERT_SUPPORTED, fingerprint
+)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Path to a fresh database file"""
+    return str(tmp_path / "clipboard.db")
+
+
+def _committed_count(db_path):
+    """Count rows visible to another connection"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM clipboard_history").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("use_upsert", [True, False])
+def test_save_and_deduplicate(db_path, use_upsert):
+    """Test that saving the same content twice bumps the existing row"""
+    if use_upsert and not UPSERT_SUPPORTED:
+        pytest.skip("SQLite too old for RETURNING")
+    
+    storage = ClipboardStorage(db_path)
+    storage.use_upsert = use_upsert
+    
+    first = storage.save_clip("test content", "text")
+    other = storage.save_clip("other content", "text")
+    again = storage.save_clip("test content", "text")
+    
+    assert first is not None
+    assert other != first
+    assert again == first
+    
+    history = {clip['id']: clip for clip in storage.get_history()}
+    assert len(history) == 2
+    assert history[first]['use_count'] == 1
+    assert history[other]['use_count'] == 0
+    storage.close()
+
+
+def test_empty_content_is_not_saved(db_path):
+    """Test that whitespace-only content is ignored"""
+    storage = ClipboardStorage(db_path)
+    assert storage.save_clip("   \n") is None
+    assert storage.get_history() == []
+    storage.close()
+
+
+def test_write_behind_commits_per_batch(db_path):
+    """Test that write-behind saves are committed in batches"""
+    storage = ClipboardStorage(
+        db_path, write_behind=True, flush_interval=60, flush_batch_size=3
+    )
+    assert storage.conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    
+    storage.save_clip("one")
+    storage.save_clip("two")
+    assert _committed_count(db_path) == 0
+    # Readers only see committed saves
+    assert storage.get_history() == []
+    
+    storage.save_clip("three")
+    assert _committed_count(db_path) == 3
+    
+    storage.save_clip("four")
+    storage.flush()
+    assert _committed_count(db_path) == 4
+    storage.close()
+
+
+def test_write_behind_commits_after_interval(db_path):
+    """Test that a partial batch is committed after flush_interval"""
+    storage = ClipboardStorage(
+        db_path, write_behind=True, flush_interval=0.05, flush_batch_size=100
+    )
+    storage.save_clip("one")
+    
+    deadline = time.time() + 2
+    while _committed_count(db_path) == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert _committed_count(db_path) == 1
+    storage.close()
+
+
+def test_close_flushes_pending_saves(db_path):
+    """Test that closing storage commits pending saves"""
+    storage = ClipboardStorage(
+        db_path, write_behind=True, flush_interval=60, flush_batch_size=100
+    )
+    storage.save_clip("one")
+    storage.close()
+    assert _committed_count(db_path) == 1
+
+
+def test_close_waits_for_a_flush_timer_that_fired(db_path, monkeypatch):
+    """Test that a flush timer racing close() neither fails nor loses saves"""
+    errors = []
+    monkeypatch.setattr(threading, 'excepthook', errors.append)
+    storage = ClipboardStorage(
+        db_path, write_behind=True, flush_interval=0.01, flush_batch_size=100
+    )
+    with storage._lock:
+        storage.save_clip("one")
+        timer = storage._flush_timer
+        # The timer fires and waits for the lock
+        time.sleep(0.1)
+    storage.close()
+    assert not timer.is_alive()
+    assert _committed_count(db_path) == 1
+    
+    # A timer that fires once the connection is gone does nothing
+    storage.flush()
+    assert errors == []
+
+
+def test_retention_evicts_oldest_past_high_water(db_path):
+    """Test that retention trims to max_entries only above the high-water mark"""
+    storage = ClipboardStorage(db_path)
+    ids = [storage.save_clip(f"clip {i}") for i in range(12)]
+    storage.toggle_favorite(ids[0])
+    assert storage.live_count == 11
+    
+    assert storage.enforce_retention(max_entries=8, high_water=11) == []
+    
+    storage.save_clip("clip 12")
+    evicted = storage.enforce_retention(max_entries=8, high_water=11, batch_size=3)
+    
+    # The favorite is kept even though it is the oldest clip
+    assert evicted == ids[1:5]
+    assert storage.live_count == 8
+    remaining = {clip['id'] for clip in storage.get_history()}
+    assert ids[0] in remaining
+    assert len(remaining) == 9
+    storage.close()
+
+
+def test_live_count_tracks_writes(db_path):
+    """Test that the live count follows saves, favorites and deletes"""
+    storage = ClipboardStorage(db_path)
+    first = storage.save_clip("one")
+    storage.save_clip("two")
+    storage.save_clip("one")
+    assert storage.live_count == 2
+    
+    storage.toggle_favorite(first)
+    assert storage.live_count == 1
+    storage.delete_clip(first)
+    assert storage.live_count == 1
+    storage.close()
+    
+    # Reopening recounts from the table
+    storage = ClipboardStorage(db_path)
+    assert storage.live_count == 1
+    storage.close()
+
+
+def test_reads_do_not_wait_for_open_write_transaction(db_path):
+    """Test that readers see committed data while a write is in flight"""
+    storage = ClipboardStorage(
+        db_path, write_behind=True, flush_interval=60, flush_batch_size=100
+    )
+    storage.save_clip("committed")
+    storage.flush()
+    storage.save_clip("pending")
+    
+    results = []
+    with storage._lock:
+        # The writer lock is held and its transaction is open
+        reader = threading.Thread(
+            target=lambda: results.append(storage.get_history())
+        )
+        reader.start()
+        reader.join(timeout=2)
+        assert not reader.is_alive()
+    
+    assert [clip['content'] for clip in results[0]] == ["committed"]
+    storage.close()
+
+
+def test_concurrent_reads_and_writes(db_path):
+    """Stress test: several threads reading while others write"""
+    storage = ClipboardStorage(
+        db_path, write_behind=True, flush_interval=0.01, flush_batch_size=10
+    )
+    errors = []
+    stop = threading.Event()
+    
+    def writer(prefix):
+        try:
+            for i in range(300):
+                clip_id = storage.save_clip(f"{prefix} clip {i % 200}", 'text')
+                if i % 25 == 0:
+                    storage.toggle_favorite(clip_id)
+                if i % 40 == 0:
+                    storage.delete_clip(clip_id)
+                storage.enforce_retention(max_entries=150, batch_size=10)
+        except Exception as e:
+            errors.append(e)
+    
+    def reader():
+        try:
+            while not stop.is_set():
+                for clip in storage.get_history(limit=50):
+                    assert clip['content']
+                storage.search("clip")
+                storage.get_favorites()
+                storage.get_stats()
+        except Exception as e:
+            errors.append(e)
+    
+    writers = [threading.Thread(target=writer, args=(name,)) for name in "ab"]
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in writers + readers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+    
+    assert errors == []
+    storage.flush()
+    stats = storage.get_stats()
+    assert storage.live_count == stats['total'] - stats['favorites']
+    assert storage.live_count <= 150 + 7
+    storage.close()
+
+
+def test_readers_open_paths_with_uri_characters(tmp_path):
+    """Test that reader connections find a database named like a URI"""
+    storage = ClipboardStorage(str(tmp_path / "odd?name#1%20" / "clipboard.db"))
+    clip_id = storage.save_clip("hello")
+    result = []
+    thread = threading.Thread(target=lambda: result.append(storage.get_history()))
+    thread.start()
+    thread.join()
+    assert [clip['id'] for clip in result[0]] == [clip_id]
+    storage.close()
+
+
+def test_memory_database_uses_single_connection():
+    """Test that ':memory:' databases work without shared readers"""
+    storage = ClipboardStorage(":memory:")
+    storage.save_clip("test content", "text")
+    history = storage.get_history()
+    assert len(history) == 1
+    assert history[0]["content"] == "test content"
+    storage.close()
+
+
+def test_migrates_md5_hash_schema(db_path):
+    """Test upgrading a database that keyed rows by MD5 hex digests"""
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE clipboard_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content_hash TEXT UNIQUE NOT NULL,
+            content TEXT NOT NULL,
+            content_type TEXT,
+            app_name TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            is_favorite INTEGER DEFAULT 0,
+            use_count INTEGER DEFAULT 0,
+            metadata TEXT
+        );
+        CREATE INDEX idx_content_hash ON clipboard_history(content_hash);
+        CREATE VIRTUAL TABLE clipboard_fts 
+        USING fts5(content, content=clipboard_history, content_rowid=id);
+        CREATE TRIGGER clipboard_ai AFTER INSERT ON clipboard_history BEGIN
+            INSERT INTO clipboard_fts(rowid, content) VALUES (new.id, new.content);
+        END;
+    """)
+    for i, content in enumerate(["alpha text", "beta text", "gamma text"]):
+        conn.execute(
+            "INSERT INTO clipboard_history (content_hash, content, is_favorite) "
+            "VALUES (?, ?, ?)",
+            (hashlib.md5(content.encode('utf-8')).hexdigest(), content, int(i == 1))
+        )
+    conn.commit()
+    conn.close()
+    
+    storage = ClipboardStorage(db_path)
+    columns = storage._table_columns('clipboard_history')
+    assert 'content_hash' not in columns
+    assert 'content_fp' in columns
+    
+    indexes = {row['name'] for row in storage.conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index'"
+    )}
+    assert 'idx_content_hash' not in indexes
+    
+    history = {clip['content']: clip for clip in storage.get_history()}
+    assert set(history) == {"alpha text", "beta text", "gamma text"}
+    assert history["beta text"]['is_favorite'] == 1
+    assert history["alpha text"]['content_fp'] == fingerprint("alpha text")
+    
+    # Deduplication and search work on migrated rows
+    assert storage.save_clip("gamma text") == history["gamma text"]['id']
+    assert [clip['content'] for clip in storage.search("beta")] == ["beta text"]
+    storage.close()
+
+
+def test_fingerprint_scheme_change_recomputes(db_path):
+    """Test that fingerprints are recomputed when the algorithm changes"""
+    storage = ClipboardStorage(db_path)
+    clip_id = storage.save_clip("some text")
+    storage.conn.execute(
+        "UPDATE storage_meta SET value = 'old_scheme' WHERE key = 'fingerprint'"
+    )
+    storage.conn.execute("UPDATE clipboard_history SET content_fp = 1")
+    storage.conn.commit()
+    storage.close()
+    
+    storage = ClipboardStorage(db_path)
+    assert storage.save_clip("some text") == clip_id
+    storage.close()
+
+
+def _log_text(lines, tag="app"):
+    """Generate log-like text of the given number of lines"""
+    return "".join(f"2024-01-01 12:00:{i % 60:02d} INFO {tag} request {i} done\n"
+                   for i in range(lines))
+
+
+def test_large_clip_stored_as_blob(db_path):
+    """Test that large clips keep a prefix inline and stream back in full"""
+    storage = ClipboardStorage(db_path)
+    content = _log_text(5000)
+    assert len(content) > BLOB_THRESHOLD
+    
+    clip_id = storage.save_clip(content)
+    clip = storage.get_history()[0]
+    assert clip['is_blob'] == 1
+    assert clip['content'] == content[:BLOB_PREFIX_LENGTH]
+    assert clip['content_length'] == len(content)
+    
+    assert storage.get_clip(clip_id)['content'] == content
+    chunks = storage.conn.execute(
+        "SELECT COUNT(*) FROM clip_chunks WHERE clip_id = ?", (clip_id,)
+    ).fetchone()[0]
+    assert chunks > 1
+    
+    # Deduplication uses the full content, search the inline prefix
+    assert storage.save_clip(content) == clip_id
+    assert storage.save_clip(content[:-1]) != clip_id
+    assert storage.search("request")
+    assert storage.get_clip(12345) is None
+    storage.close()
+
+
+def test_blob_chunks_are_shared_and_collected(db_path):
+    """Test chunk deduplication across clips and cleanup on delete"""
+    storage = ClipboardStorage(db_path)
+    base = _log_text(5000)
+    first = storage.save_clip(base)
+    second = storage.save_clip(base + "one more line\n")
+    
+    def chunk_count():
+        return storage.conn.execute("SELECT COUNT(*) FROM blob_chunks").fetchone()[0]
+    
+    # Only the last chunk differs between the two clips
+    per_clip = storage.conn.execute(
+        "SELECT COUNT(*) FROM clip_chunks WHERE clip_id = ?", (first,)
+    ).fetchone()[0]
+    assert chunk_count() == per_clip + 1
+    
+    storage.delete_clip(first)
+    assert storage.get_clip(second)['content'] == base + "one more line\n"
+    assert chunk_count() == per_clip
+    
+    storage.delete_clip(second)
+    assert chunk_count() == 0
+    storage.close()
+
+
+def test_migrates_large_inline_clips(db_path):
+    """Test that clips stored inline by older versions move to the blob store"""
+    storage = ClipboardStorage(db_path)
+    storage.close()
+    
+    # Recreate the history table without the blob columns
+    content = _log_text(5000, tag="legacy")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        DROP TABLE clipboard_history;
+        CREATE TABLE clipboard_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content_fp INTEGER UNIQUE NOT NULL,
+            content TEXT NOT NULL,
+            content_type TEXT,
+            app_name TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            is_favorite INTEGER DEFAULT 0,
+            use_count INTEGER DEFAULT 0,
+            metadata TEXT
+        );
+        CREATE TRIGGER clipboard_ai AFTER INSERT ON clipboard_history BEGIN
+            INSERT INTO clipboard_fts(rowid, content) VALUES (new.id, new.content);
+        END;
+        INSERT INTO clipboard_fts(clipboard_fts) VALUES ('delete-all');
+    """)
+    conn.execute(
+        "INSERT INTO clipboard_history (content_fp, content) VALUES (?, ?)",
+        (fingerprint("small clip"), "small clip")
+    )
+    conn.execute(
+        "INSERT INTO clipboard_history (content_fp, content) VALUES (?, ?)",
+        (fingerprint(content), content)
+    )
+    conn.commit()
+    conn.close()
+    
+    storage = ClipboardStorage(db_path)
+    history = {clip['content_length']: clip for clip in storage.get_history()}
+    assert history[len("small clip")]['is_blob'] == 0
+    
+    large = history[len(content)]
+    assert large['is_blob'] == 1
+    assert len(large['content']) == BLOB_PREFIX_LENGTH
+    assert storage.get_clip(large['id'])['content'] == content
+    assert [clip['id'] for clip in storage.search("legacy")] == [large['id']]
+    
+    # Previews are backfilled for existing rows
+    listing = storage.get_history(preview_only=True)
+    assert {clip['preview'] for clip in listing} == {
+        "small clip", content[:PREVIEW_LENGTH].replace("\n", " ")
+    }
+    storage.close()
+
+
+def test_preview_only_listing(db_path):
+    """Test that listings return the stored preview instead of content"""
+    storage = ClipboardStorage(db_path)
+    long_text = "first line\r\nsecond line " + "x" * 10000
+    long_id = storage.save_clip(long_text, 'text')
+    url_id = storage.save_clip("https://example.com", 'url')
+    storage.toggle_favorite(url_id)
+    
+    expected = [column.strip() for column in LISTING_COLUMNS.split(',')]
+    listings = [
+        storage.get_history(preview_only=True),
+        storage.search("line", preview_only=True),
+        storage.get_favorites(preview_only=True),
+    ]
+    for listing in listings:
+        assert listing
+        for clip in listing:
+            assert list(clip) == expected
+    
+    history = {clip['id']: clip for clip in listings[0]}
+    preview = history[long_id]['preview']
+    assert preview.startswith("first line second line x")
+    assert len(preview) == PREVIEW_LENGTH - 1
+    assert history[long_id]['content_length'] == len(long_text)
+    assert history[url_id]['preview'] == "https://example.com"
+    assert history[url_id]['is_favorite'] == 1
+    
+    # Content is only loaded on demand
+    assert storage.get_clip(long_id)['content'].endswith("x" * 10000)
+    storage.close()
+
+
+def test_cursor_pagination(db_path):
+    """Test that cursor pages cover entries sharing a timestamp exactly once"""
+    storage = ClipboardStorage(db_path)
+    for i in range(25):
+        storage.save_clip(f"clip {i}", 'url' if i % 3 == 0 else 'text')
+    # Three copies per second
+    storage.conn.execute(
+        "UPDATE clipboard_history SET timestamp = datetime('2024-01-01', (id / 3) || ' seconds')"
+    )
+    storage.conn.commit()
+    newest_first = [row[0] for row in storage.conn.execute(
+        "SELECT id FROM clipboard_history ORDER BY timestamp DESC, id DESC"
+    )]
+    
+    pages, before = [], None
+    while True:
+        page = storage.get_history(limit=4, preview_only=True, before=before)
+        if not page:
+            break
+        pages.append([clip['id'] for clip in page])
+        before = storage.history_cursor(page[-1])
+    assert [clip_id for page in pages for clip_id in page] == newest_first
+    assert [len(page) for page in pages] == [4] * 6 + [1]
+    
+    # Offset pages follow the same order
+    assert [clip['id'] for clip in storage.get_history(limit=4, offset=8)] == newest_first[8:12]
+    
+    assert [clip['id'] for clip in storage.iter_history(batch_size=4)] == newest_first
+    urls = list(storage.iter_history(content_type='url', preview_only=True, batch_size=2))
+    assert [clip['preview'] for clip in urls] == [f"clip {i}" for i in range(24, -1, -3)]
+    storage.close()
+
+
+def test_iter_history_reads_large_clips_in_full(db_path):
+    """Test that streamed entries hold the whole content of blob clips"""
+    storage = ClipboardStorage(db_path, blob_threshold=1000)
+    large = _log_text(2000)
+    storage.save_clip(large, 'text')
+    storage.save_clip("small clip", 'text')
+    
+    assert [clip['content'] for clip in storage.iter_history(batch_size=1)] == [
+        "small clip", large
+    ]
+    assert len(storage.get_history()[1]['content']) == BLOB_PREFIX_LENGTH
+    storage.close()
+
+
+def test_get_clip_caches_and_invalidates(db_path):
+    """Test the get_clip() LRU cache and its invalidation on writes"""
+    storage = ClipboardStorage(db_path, clip_cache_size=2)
+    ids = [storage.save_clip(f"clip {i}") for i in range(4)]
+    large = _log_text(5000)
+    blob_id = storage.save_clip(large)
+    
+    assert storage.get_clip(blob_id)['content'] == large
+    assert storage.get_clip(12345) is None
+    
+    clip = storage.get_clip(ids[0])
+    assert clip['content'] == "clip 0"
+    clip['content'] = "changed by caller"
+    assert storage.get_clip(ids[0])['content'] == "clip 0"
+    assert storage.cache_hits == 1
+    
+    # Bounded: the blob clip was least recently used
+    storage.get_clip(ids[1])
+    assert list(storage._clip_cache) == [ids[0], ids[1]]
+    
+    storage.toggle_favorite(ids[0])
+    assert ids[0] not in storage._clip_cache
+    assert storage.get_clip(ids[0])['is_favorite'] == 1
+    
+    storage.delete_clip(ids[1])
+    assert storage.get_clip(ids[1]) is None
+    
+    storage.get_clip(ids[2])
+    assert storage.enforce_retention(max_entries=1, high_water=1) == [ids[2], ids[3]]
+    assert storage.get_clip(ids[2]) is None
+    
+    storage.get_clip(blob_id)
+    storage.clear_all()
+    assert storage.get_clip(blob_id) is None
+    storage.close()
+
+
+def test_get_clip_invalidates_on_commit(db_path):
+    """Test that changes pending in write-behind mode reach the cache on flush"""
+    storage = ClipboardStorage(db_path, write_behind=True, flush_interval=60)
+    clip_id = storage.save_clip("shared clip")
+    storage.flush()
+    assert storage.get_clip(clip_id)['use_count'] == 0
+    
+    storage.save_clip("shared clip")
+    # Readers still see the committed row, and so does the cache
+    assert storage.get_clip(clip_id)['use_count'] == 0
+    storage.flush()
+    assert storage.get_clip(clip_id)['use_count'] == 1
+    storage.close()
+
+
+def _check_fts(storage):
+    """Run the FTS5 integrity check against the history table"""
+    storage.conn.execute(
+        "INSERT INTO clipboard_fts(clipboard_fts, rank) VALUES ('integrity-check', 1)"
+    )
+
+
+def test_search_ranking(db_path):
+    """Test relevance ranking against recency ordering"""
+    storage = ClipboardStorage(db_path)
+    old_exact = storage.save_clip("deploy deploy deploy script")
+    recent_weak = storage.save_clip("notes mentioning deploy once among many other words here")
+    old_weak = storage.save_clip("another note that says deploy once with other words too")
+    storage.conn.execute(
+        "UPDATE clipboard_history SET timestamp = datetime('now', '-1 day') WHERE id = ?",
+        (old_exact,)
+    )
+    storage.conn.execute(
+        "UPDATE clipboard_history SET timestamp = datetime('now', '-90 days') WHERE id = ?",
+        (old_weak,)
+    )
+    storage.conn.commit()
+    
+    def ids(**kwargs):
+        return [clip['id'] for clip in storage.search("deploy", **kwargs)]
+    
+    assert ids(rank='recent') == [recent_weak, old_exact, old_weak]
+    assert ids() == [old_exact, recent_weak, old_weak]
+    assert ids(limit=1) == [old_exact]
+    
+    # Clips pasted often climb in relevance
+    storage.conn.execute(
+        "UPDATE clipboard_history SET use_count = 20, timestamp = datetime('now') "
+        "WHERE id = ?", (old_weak,)
+    )
+    storage.conn.commit()
+    assert ids()[0] == old_weak
+    
+    with pytest.raises(ValueError):
+        storage.search("deploy", rank='oldest')
+    storage.close()
+
+
+def test_fts_index_follows_updates_and_deletes(db_path):
+    """Test that the FTS index tracks content updates and deletes"""
+    storage = ClipboardStorage(db_path)
+    clip_id = storage.save_clip("original wording")
+    other_id = storage.save_clip("unrelated original")
+    
+    storage.conn.execute(
+        "UPDATE clipboard_history SET content = 'replacement text' WHERE id = ?",
+        (clip_id,)
+    )
+    storage.conn.commit()
+    assert [clip['id'] for clip in storage.search("original")] == [other_id]
+    assert [clip['id'] for clip in storage.search("replacement")] == [clip_id]
+    
+    storage.delete_clip(other_id)
+    assert storage.search("original") == []
+    _check_fts(storage)
+    storage.close()
+
+
+def test_migration_repairs_fts_index(db_path):
+    """Test that databases with the old delete trigger get a clean index"""
+    storage = ClipboardStorage(db_path)
+    storage.conn.executescript("""
+        DROP TRIGGER clipboard_ad;
+        DROP TRIGGER clipboard_au;
+        CREATE TRIGGER clipboard_ad AFTER DELETE ON clipboard_history BEGIN
+            DELETE FROM clipboard_fts WHERE rowid = old.id;
+        END;
+        PRAGMA user_version = 3;
+    """)
+    storage.save_clip("kept clip")
+    storage.delete_clip(storage.save_clip("deleted clip"))
+    storage.close()
+    
+    storage = ClipboardStorage(db_path)
+    _check_fts(storage)
+    assert [clip['content'] for clip in storage.search("clip")] == ["kept clip"]
+    assert storage.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    storage.close()
+
+
+def test_trigram_index_matches_fragments(db_path):
+    """Test substring search through the optional trigram index"""
+    storage = ClipboardStorage(db_path, trigram_index=True)
+    url = storage.save_clip("https://example.com/api/v2/users/42")
+    code = storage.save_clip("function renderHistoryPageView() {}")
+    commit = storage.save_clip("commit 9f3fa9c1d2e4b7 fixes the build")
+    words = storage.save_clip("history of the build")
+    
+    def ids(query):
+        return [clip['id'] for clip in storage.search(query)]
+    
+    assert ids("api/v2/us") == [url]
+    assert ids("HistoryPage") == [code]
+    assert ids("3fa9c1") == [commit]
+    # Whole words use the word index, partial words fall back to trigrams
+    assert set(ids("build")) == {words, commit}
+    assert set(ids("istor")) == {code, words}
+    assert ids("ab") == []
+    
+    storage.delete_clip(url)
+    assert ids("api/v2/us") == []
+    storage.close()
+
+
+def test_trigram_index_is_optional(db_path):
+    """Test creating, dropping and rebuilding the trigram index"""
+    storage = ClipboardStorage(db_path)
+    clip_id = storage.save_clip("see example.com/docs/setup")
+    # Without trigrams punctuation is matched as literal words
+    assert [clip['id'] for clip in storage.search("example.com/docs")] == [clip_id]
+    assert storage.search("ample.co") == []
+    storage.close()
+    
+    # Enabling builds the index for existing clips
+    storage = ClipboardStorage(db_path, trigram_index=True)
+    assert [clip['id'] for clip in storage.search("ample.co")] == [clip_id]
+    storage.rebuild_search_index()
+    assert [clip['id'] for clip in storage.search("ample.co")] == [clip_id]
+    storage.conn.execute(
+        "INSERT INTO clipboard_trigram(clipboard_trigram, rank) VALUES ('integrity-check', 1)"
+    )
+    storage.close()
+    
+    storage = ClipboardStorage(db_path)
+    assert storage._table_columns('clipboard_trigram') == []
+    assert storage.save_clip("another clip")
+    storage.close()
+
+
+def test_fuzzy_search_follows_writes(db_path):
+    """Test that the fuzzy index is kept in step with saves and evictions"""
+    storage = ClipboardStorage(db_path)
+    commit = storage.save_clip("git commit -m 'fix the build'")
+    checkout = storage.save_clip("git checkout main")
+    
+    def ids(query):
+        return [clip['id'] for clip in storage.fuzzy_search(query)]
+    
+    assert ids("gtcmt") == [commit]
+    assert ids("git") == [checkout, commit]
+    assert storage.get_stats()['fuzzy_index'] == 2
+    
+    # Added, bumped and deleted after the index was loaded
+    notes = storage.save_clip("release notes draft")
+    storage.save_clip("git commit -m 'fix the build'")
+    assert ids("git") == [commit, checkout]
+    assert ids("rlsnt") == [notes]
+    storage.delete_clip(checkout)
+    assert ids("chkout") == []
+    
+    for i in range(12):
+        storage.save_clip(f"filler clip {i}")
+    evicted = storage.enforce_retention(max_entries=10, high_water=10)
+    assert commit in evicted
+    assert ids("gtcmt") == []
+    assert storage.fuzzy_search("filler", limit=3, preview_only=True)[0]['preview'] == "filler clip 11"
+    
+    storage.cleanup_old_entries(max_entries=1)
+    assert ids("filler") == [storage.get_history(limit=1)[0]['id']]
+    storage.clear_all()
+    assert ids("filler") == []
+    storage.close()
+    
+    disabled = ClipboardStorage(db_path, fuzzy_index_size=0)
+    disabled.save_clip("git commit")
+    assert disabled.fuzzy_search("git") == []
+    disabled.close()
+
+
+def test_load_analyses_by_analyzer_version(db_path):
+    """Test that only clips saved by the current analyzer version load"""
+    storage = ClipboardStorage(db_path)
+    storage.save_clip("saved before versioning", content_type='text',
+                      metadata={'length': 23})
+    
+    # The first call records the version; earlier clips don't count
+    assert storage.load_analyses(1, 10) == []
+    storage.save_clip("https://example.com", content_type='url',
+                      metadata={'domain': 'example.com'})
+    storage.save_clip("untyped clip")
+    storage.save_clip("git status", content_type='text')
+    storage.close()
+    
+    storage = ClipboardStorage(db_path)
+    assert storage.load_analyses(1, 10) == [
+        (fingerprint("git status"), 'text', {}),
+        (fingerprint("https://example.com"), 'url', {'domain': 'example.com'}),
+    ]
+    assert len(storage.load_analyses(1, 1)) == 1
+    
+    # After an upgrade, nothing stored so far is reused
+    assert storage.load_analyses(2, 10) == []
+    storage.save_clip("git log", content_type='text')
+    assert storage.load_analyses(2, 10) == [(fingerprint("git log"), 'text', {})]
+    storage.close()
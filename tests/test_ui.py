@@ -0,0 +1,152 @@
+"""
+Tests for the UI's handling of clipboard updates
+
+These drive ClipboardUI without a window: the Tk root and the list
+widget are replaced by stand-ins, the pager and the update queue are real.
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.clipboard_backends import ClipboardBackend
+from src.clipboard_monitor import ClipboardManager
+from src.config import Config
+from src.content_analyzer import ContentAnalyzer
+from src.storage import ClipboardStorage
+from src.ui import ClipboardUI
+
+
+class MemoryBackend(ClipboardBackend):
+    """Clipboard backend holding content in memory"""
+
+    name = 'memory'
+
+    def paste(self):
+        return ""
+
+    def copy(self, content):
+        pass
+
+
+class FakeRoot:
+    """Visible Tk root that records scheduled callbacks"""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def winfo_viewable(self):
+        return True
+
+    def after(self, ms, callback):
+        self.scheduled.append(callback)
+
+
+class CountingList:
+    """VirtualClipList stand-in that counts repaints"""
+
+    def __init__(self, pager):
+        self.pager = pager
+        self.repaints = 0
+
+    def apply_deltas(self, deltas):
+        self.pager.apply_deltas(deltas)
+        self.repaints += 1
+
+
+class SelectingList:
+    """VirtualClipList stand-in that keeps a selection by index"""
+
+    def __init__(self):
+        self.pager = None
+        self.selected = None
+
+    def set_pager(self, pager, keep_position=False):
+        self.pager = pager
+        if not keep_position:
+            self.selected = None
+
+    def selected_clip(self):
+        return None if self.selected is None else self.pager.get(self.selected)
+
+    def ids(self):
+        return [row['id'] for row in self.pager.rows(0, len(self.pager))]
+
+
+def test_changes_reload_the_listing_on_screen(tmp_path, monkeypatch):
+    """Test that favoriting or deleting keeps showing favorites or results"""
+    config = Config(str(tmp_path / "config.json"))
+    storage = ClipboardStorage(str(tmp_path / "clipboard.db"))
+    ids = [storage.save_clip(f"clip {i}", 'text') for i in range(6)]
+    storage.toggle_favorite(ids[1])
+    storage.toggle_favorite(ids[3])
+    ui = ClipboardUI(storage, ContentAnalyzer(), None, config)
+    ui.clip_list = SelectingList()
+    monkeypatch.setattr('src.ui.messagebox.askyesno', lambda *args: True)
+
+    # Unfavoriting a clip from the favorites leaves the other favorites
+    ui._show_favorites()
+    assert ui.clip_list.ids() == [ids[3], ids[1]]
+    ui.clip_list.selected = 0
+    ui._toggle_favorite()
+    assert ui.clip_list.ids() == [ids[1]]
+    assert ui.clip_list.selected_clip()['id'] == ids[1]
+
+    # Search results stay on screen, less the deleted clip
+    ui._refresh_clips([storage.get_clip(clip_id) for clip_id in (ids[4], ids[2], ids[0])])
+    ui.clip_list.selected = 1
+    ui._delete_selected()
+    assert ui.clip_list.ids() == [ids[4], ids[0]]
+    assert storage.get_clip(ids[2]) is None
+    ui._toggle_favorite()
+    assert ui.clip_list.ids() == [ids[4], ids[0]]
+    assert ui.clip_list.selected_clip()['is_favorite']
+    storage.close()
+
+
+def test_burst_of_clips_is_one_repaint(tmp_path):
+    """Test that 1,000 clips saved meanwhile are patched in with one repaint"""
+    config = Config(str(tmp_path / "config.json"))
+    config.config['max_history'] = 300
+    # Keep every clip of the burst
+    config.config['ingest'] = {'overflow_policy': 'block'}
+    storage = ClipboardStorage(str(tmp_path / "clipboard.db"), write_behind=True)
+    for i in range(250):
+        storage.save_clip(f"old clip {i}", 'text')
+    storage.flush()
+
+    analyzer = ContentAnalyzer()
+    manager = ClipboardManager(storage, analyzer, config, backend=MemoryBackend())
+    ui = ClipboardUI(storage, analyzer, manager, config)
+    ui.root = FakeRoot()
+    ui.clip_list = CountingList(ui._history_pager())
+    manager.add_delta_callback(ui.updates.put)
+    # The list was scrolled through its first two pages
+    ui.clip_list.pager.rows(0, 200)
+
+    # New clips, clips copied again (bumped) and evictions past max_history
+    manager.pipeline.start()
+    for i in range(1000):
+        manager._on_clipboard_change(f"clip {i % 600}" if i % 3 else f"old clip {i % 250}")
+    manager.pipeline.stop()
+    storage.flush()
+    assert ui.updates.qsize() >= 1000
+
+    ui._apply_updates()
+    assert ui.clip_list.repaints == 1
+    assert ui.updates.empty()
+    assert ui.root.scheduled == [ui._apply_updates]
+
+    # The top of the list is patched, not fetched again
+    pager = ui.clip_list.pager
+    fetches = pager.fetches
+    history = [clip['id'] for clip in storage.iter_history(preview_only=True)]
+    assert [row['id'] for row in pager.rows(0, 100)] == history[:100]
+    assert pager.fetches == fetches
+    assert len(pager) == storage.count_history() == len(history)
+    assert [row['id'] for row in pager.rows(0, len(pager))] == history
+
+    ui._apply_updates()
+    assert ui.clip_list.repaints == 1
+    storage.close()
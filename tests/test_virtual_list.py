@@ -0,0 +1,197 @@
+"""
+Tests for the virtualized clip list
+
+The VirtualClipList test needs a display and is skipped without one.
+"""
+import sys
+import tkinter as tk
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.storage import ClipboardStorage
+from src.virtual_list import ClipPager, VirtualClipList
+
+
+def _numbers_pager(total, **kwargs):
+    """Pager over rows {'id': 0..total-1}, recording every fetch"""
+    fetched = []
+
+    def fetch(offset, limit):
+        fetched.append((offset, limit))
+        return [{'id': i} for i in range(offset, min(offset + limit, total))]
+
+    return ClipPager(fetch, lambda: total, **kwargs), fetched
+
+
+def test_pager_fetches_only_pages_looked_at():
+    """Test that rows come from the pages that hold them, fetched once"""
+    pager, fetched = _numbers_pager(100_000, page_size=100)
+    assert len(pager) == 100_000
+    assert fetched == []
+
+    assert [row['id'] for row in pager.rows(0, 15)] == list(range(15))
+    assert [row['id'] for row in pager.rows(90, 110)] == list(range(90, 110))
+    assert pager.get(99_999)['id'] == 99_999
+    assert pager.get(100_000) is None
+    assert pager.rows(99_990, 100_010)[-1]['id'] == 99_999
+    assert fetched == [(0, 100), (100, 100), (99_900, 100)]
+
+    pager.rows(0, 200)
+    assert pager.fetches == 3
+
+
+def test_pager_keeps_a_bounded_number_of_pages():
+    """Test that the least recently used pages are dropped"""
+    pager, fetched = _numbers_pager(1000, page_size=10, max_pages=2)
+    pager.get(0)
+    pager.get(10)
+    pager.get(0)
+    pager.get(20)
+    pager.get(0)
+    pager.get(10)
+    assert fetched == [(0, 10), (10, 10), (20, 10), (10, 10)]
+
+
+def test_pager_continues_from_previous_page():
+    """Test that a page after a cached one is fetched with fetch_after"""
+    after = []
+
+    def fetch_after(row, limit):
+        after.append(row['id'])
+        return [{'id': i} for i in range(row['id'] + 1, min(row['id'] + 1 + limit, 50))]
+
+    pager, fetched = _numbers_pager(50, page_size=10)
+    pager.fetch_after = fetch_after
+    assert [row['id'] for row in pager.rows(0, 50)] == list(range(50))
+    assert fetched == [(0, 10)]
+    assert after == [9, 19, 29, 39]
+    pager.get(45)
+    pager.reset()
+    pager.get(45)
+    assert fetched[-1] == (40, 10)
+
+
+def test_history_pager(tmp_path):
+    """Test paging through storage, filtered by type"""
+    storage = ClipboardStorage(str(tmp_path / "clipboard.db"))
+    for i in range(250):
+        storage.save_clip(f"clip {i}", 'url' if i % 5 == 0 else 'text')
+
+    def pager(content_type=None):
+        return ClipPager(
+            lambda offset, limit: storage.get_history(
+                limit=limit, offset=offset, content_type=content_type, preview_only=True
+            ),
+            lambda: storage.count_history(content_type)
+        )
+
+    everything = pager()
+    assert len(everything) == 250
+    assert len({row['id'] for row in everything.rows(0, 250)}) == 250
+    urls = pager('url')
+    assert len(urls) == 50
+    assert all(row['content_type'] == 'url' for row in urls.rows(0, 50))
+
+    storage.save_clip("one more", 'text')
+    everything.reset()
+    assert len(everything) == 251
+    storage.close()
+
+
+@pytest.fixture
+def tk_root():
+    """Hidden Tk root window, or skip without a display"""
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    root.withdraw()
+    yield root
+    root.destroy()
+
+
+def test_list_renders_only_visible_rows(tk_root):
+    """Test that scrolling redraws a window of rows and keeps the selection"""
+    selected = []
+    clip_list = VirtualClipList(tk_root, lambda row: f"row {row['id']}",
+                                on_select=lambda: selected.append(True), height=5)
+    pager, fetched = _numbers_pager(10_000, page_size=100)
+    clip_list.set_pager(pager)
+    assert clip_list.listbox.size() == 5
+    assert clip_list.listbox.get(0) == "row 0"
+
+    clip_list.listbox.selection_set(2)
+    clip_list.listbox.event_generate('<<ListboxSelect>>')
+    assert clip_list.selected_clip()['id'] == 2
+
+    clip_list.yview('moveto', 0.5)
+    assert clip_list.listbox.get(0) == "row 5000"
+    assert clip_list.listbox.size() == 5
+    assert clip_list.selected_clip()['id'] == 2
+    assert len(fetched) == 2
+
+    clip_list.yview('scroll', 1, 'pages')
+    assert clip_list.listbox.get(0) == "row 5005"
+    clip_list.yview('moveto', 1.0)
+    assert clip_list.listbox.get(4) == "row 9999"
+
+    clip_list.set_pager(ClipPager.from_list([{'id': 'a'}]))
+    assert clip_list.listbox.get(0, tk.END) == ("row a",)
+    assert clip_list.selected_clip() is None
+
+
+class Delta:
+    """ClipDelta stand-in"""
+
+    def __init__(self, kind, clip_id):
+        self.kind = kind
+        self.clip_id = clip_id
+        self.row = None if kind == 'evicted' else {'id': clip_id}
+
+
+def test_pager_counts_each_added_clip_once(tmp_path):
+    """Test that a clip counted before its delta arrives is not counted again"""
+    storage = ClipboardStorage(str(tmp_path / "clipboard.db"))
+    for i in range(250):
+        storage.save_clip(f"clip {i}", 'text')
+    counted_id = storage.save_clip("saved before counting", 'text')
+    pager = ClipPager(
+        lambda offset, limit: storage.get_history(limit=limit, offset=offset),
+        lambda: storage.count_history_snapshot(), page_size=100
+    )
+    assert len(pager) == 251
+    new_id = storage.save_clip("saved after counting", 'text')
+
+    # Neither clip is on a fetched page
+    pager.apply_deltas([Delta('added', counted_id), Delta('added', new_id)])
+    assert len(pager) == storage.count_history() == 252
+    assert [row['id'] for row in pager.rows(0, 2)] == [new_id, counted_id]
+    storage.close()
+
+
+def test_list_applies_deltas_in_one_render(tk_root):
+    """Test that a scrolled list keeps its rows in view as clips arrive"""
+    clip_list = VirtualClipList(tk_root, lambda row: f"row {row['id']}", height=5)
+    rows = [{'id': i} for i in range(1000, 0, -1)]
+    clip_list.set_pager(ClipPager(lambda offset, limit: rows[offset:offset + limit],
+                                  lambda: len(rows), page_size=10))
+    clip_list._scroll_to(3)
+    clip_list.selected = 4
+    renders = []
+    render = clip_list.render
+    clip_list.render = lambda: renders.append(True) or render()
+
+    # Two new clips, one bumped from below, one evicted from the bottom
+    clip_list.apply_deltas([Delta('added', 1001), Delta('bumped', 990),
+                            Delta('added', 1002), Delta('evicted', 1)])
+    assert renders == [True]
+    assert len(clip_list.pager) == 1001
+    assert clip_list.listbox.get(0) == "row 997"
+    assert clip_list.selected_clip()['id'] == 996
+
+    clip_list._scroll_to(0)
+    assert clip_list.listbox.get(0, 2) == ("row 1002", "row 990", "row 1001")